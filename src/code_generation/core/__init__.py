@@ -1,2 +1,5 @@
 from . import code_generator
 from . import code_style
+from . import code_sink
+from . import code_session
+from . import code_stream
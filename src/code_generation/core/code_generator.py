@@ -1,5 +1,7 @@
 import sys
+from itertools import islice
 from code_generation.core.code_style import ANSICodeStyle
+from code_generation.core.code_sink import open_sink
 
 __doc__ = """
 Simple and straightforward code generator that could be used for generating code 
@@ -43,6 +45,9 @@ Re-implement it if you wish to apply any other formatting style.
 
 """
 
+# Number of lines joined into a single block by CodeFile.write_lines()
+WRITE_LINES_CHUNK = 4096
+
 
 class CodeFile:
     """
@@ -79,35 +84,66 @@ class CodeFile:
     # Current formatting style (assigned as a class attribute to generate all files uniformly)
     Formatter = ANSICodeStyle
  
-    def __init__(self, filename, writer=None):
+    def __init__(self, filename, writer=None, buffered=False, flush_threshold=None, write_if_changed=False):
         """
         Creates a new source file
         @param: filename source file to create (rewrite if exists)
         @param: writer optional writer to write output to
+        @param: buffered accumulate output in memory and write it in large blocks
+        @param: flush_threshold optional size of the block in characters,
+        buffered output is written once on close() if not set
+        @param: write_if_changed render output to memory and rewrite the file
+        only if its content changed, so that its modification time is preserved otherwise
         """
         self.current_indent = 0
         self.last = None
         self.filename = filename
-        if writer:
-            self.out = writer
-        else:
-            self.out = open(filename, "w")
+        self.out_changed = None
+        self.out = open_sink(filename, writer, buffered, flush_threshold, write_if_changed)
 
     def close(self):
         """
         File created, just close the handle
+        In write-if-changed mode 'out_changed' shows whether the file has been rewritten
         """
         self.out.close()
+        self.out_changed = getattr(self.out, 'changed', None)
         self.out = None
+
+    def flush(self):
+        """
+        Pass the buffered output (if any) to the file or writer
+        """
+        self.out.flush()
  
     def write(self, text, indent=0, endline=True):
         """
         Write a new line with line ending
         """
-        self.out.write('{0}{1}{2}'.format(self.Formatter.indent * (self.current_indent+indent),
-                                          text,
-                                          self.Formatter.endline if endline else ''))
- 
+        formatter = self.Formatter
+        if text.__class__ is not str:
+            text = str(text)
+        self.out.write(formatter.indent_prefix(self.current_indent + indent) + text +
+                       (formatter.endline if endline else ''))
+ 
+    def write_lines(self, lines, indent=0, separator='', terminator=''):
+        """
+        Write a number of lines with the same indentation,
+        lines are joined into large blocks, so that the output is written by a few calls
+        @param: lines - iterable of strings, could be a generator
+        @param: separator - appended to every line except the last one, e.g. ','
+        @param: terminator - appended to the last line, e.g. ';'
+        """
+        formatter = self.Formatter
+        prefix = formatter.indent_prefix(self.current_indent + indent)
+        joiner = f'{separator}{formatter.endline}{prefix}'
+        lines = iter(lines)
+        chunk = list(islice(lines, WRITE_LINES_CHUNK))
+        while chunk:
+            next_chunk = list(islice(lines, WRITE_LINES_CHUNK))
+            self.out.write(prefix + joiner.join(chunk) + (separator if next_chunk else terminator) + formatter.endline)
+            chunk = next_chunk
+
     def append(self, x):
         """
         Append to the existing line without line ending
@@ -148,11 +184,11 @@ class CppFile(CodeFile):
     """
     This class extends CodeFile class with some specific C++ constructions
     """
-    def __init__(self, filename, writer=None):
+    def __init__(self, filename, writer=None, buffered=False, flush_threshold=None, write_if_changed=False):
         """
         Create C++ source file
         """
-        CodeFile.__init__(self, filename, writer)
+        CodeFile.__init__(self, filename, writer, buffered, flush_threshold, write_if_changed)
         
     def label(self, text):
         """
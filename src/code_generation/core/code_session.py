@@ -0,0 +1,199 @@
+import os
+import tempfile
+
+from code_generation.core.code_generator import CppFile
+from code_generation.core.code_sink import files_equal
+
+__doc__ = """Transactional generation of multiple files.
+GenerationSession owns a number of CodeFile objects. Every file is written
+to a temporary file in the same directory as the target, and all files
+are committed together at the end of the session:
+all temporary files are flushed to disk in a single batch, then atomically
+renamed to the target names, then the containing directories are synced.
+
+A crash in the middle of generation leaves targets untouched, never half-written.
+
+Example:
+# Python code
+with GenerationSession() as session:
+    header = session.open('my_class.h')
+    source = session.open('my_class.cpp')
+    my_class.render_to_string_declaration(header)
+    my_class.render_to_string_implementation(source)
+# all files are committed here, or none in case of exception
+"""
+
+
+def _current_umask():
+    """
+    @return: process umask, used to give committed files the same mode as open(filename, "w") does
+    os.umask() could only be read by setting it, so it is called once on import,
+    before rendering threads are started
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Process umask read on import
+PROCESS_UMASK = _current_umask()
+
+
+class SessionWriter:
+    """
+    Writer for the temporary file owned by GenerationSession.
+    CodeFile.close() does not close the file, it is closed by the session on commit or rollback
+    """
+
+    def __init__(self, filename, temp_filename, handle):
+        """
+        @param: filename - target file name
+        @param: temp_filename - temporary file the output is written to
+        @param: handle - file object of the temporary file
+        """
+        self.filename = filename
+        self.temp_filename = temp_filename
+        self.handle = handle
+
+    def write(self, text):
+        """
+        Write text to the temporary file
+        """
+        self.handle.write(text)
+
+    def flush(self):
+        """
+        Flush the temporary file
+        """
+        self.handle.flush()
+
+    def close(self):
+        """
+        Closing is deferred until the session is committed
+        """
+        self.handle.flush()
+
+
+class GenerationSession:
+    """
+    Set of generated files committed all at once.
+    Could be used with 'with' semantic: the session is committed on exit,
+    or rolled back if exception is raised
+    """
+
+    def __init__(self, durable=True, skip_unchanged=False):
+        """
+        @param: durable - fsync files and directories on commit
+        @param: skip_unchanged - do not replace targets which content is the same,
+        so that their modification time is preserved
+        """
+        self.durable = durable
+        self.skip_unchanged = skip_unchanged
+        self.files = []
+        self.writers = []
+        self.changed = []
+        self.unchanged = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def open(self, filename, file_class=CppFile, **kwargs):
+        """
+        Create a new file within the session
+        @param: filename - target file
+        @param: file_class - CodeFile, CppFile or HtmlFile
+        @param: kwargs - additional file_class arguments (e.g. buffered=True)
+        @return: file_class instance writing to the temporary file
+        """
+        directory, basename = os.path.split(os.path.abspath(filename))
+        fd, temp_filename = tempfile.mkstemp(dir=directory, prefix=f'.{basename}.', suffix='.tmp')
+        writer = SessionWriter(filename, temp_filename, os.fdopen(fd, 'w'))
+        code_file = file_class(filename, writer=writer, **kwargs)
+        self.files.append(code_file)
+        self.writers.append(writer)
+        return code_file
+
+    def _close_files(self):
+        """
+        Flush output of all files to the temporary files
+        """
+        for code_file in self.files:
+            if code_file.out is not None:
+                code_file.close()
+        self.files.clear()
+
+    def commit(self):
+        """
+        Replace all targets with generated files
+        If replacing fails, the remaining temporary files are removed and the error is raised,
+        targets replaced before the failure are listed in 'changed'
+        """
+        self._close_files()
+
+        directories = set()
+        try:
+            # single batched durability step for all files
+            for writer in self.writers:
+                writer.handle.flush()
+                if self.durable:
+                    os.fsync(writer.handle.fileno())
+                writer.handle.close()
+
+            for writer in self.writers:
+                if self.skip_unchanged and files_equal(writer.temp_filename, writer.filename):
+                    os.remove(writer.temp_filename)
+                    self.unchanged.append(writer.filename)
+                    continue
+                self._set_mode(writer)
+                os.replace(writer.temp_filename, writer.filename)
+                directories.add(os.path.dirname(os.path.abspath(writer.filename)))
+                self.changed.append(writer.filename)
+        except BaseException:
+            self.rollback()
+            raise
+        self.writers.clear()
+
+        if self.durable:
+            self._sync_directories(directories)
+
+    def rollback(self):
+        """
+        Discard all generated files, targets are left untouched
+        """
+        self.files.clear()
+        for writer in self.writers:
+            writer.handle.close()
+            if os.path.exists(writer.temp_filename):
+                os.remove(writer.temp_filename)
+        self.writers.clear()
+
+    def _set_mode(self, writer):
+        """
+        Temporary files are created with 0600 mode.
+        Preserve mode of the existing target, or use the default mode for the new one
+        """
+        try:
+            mode = os.stat(writer.filename).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o666 & ~PROCESS_UMASK
+        os.chmod(writer.temp_filename, mode)
+
+    @staticmethod
+    def _sync_directories(directories):
+        """
+        Make renames durable. Directories could not be opened on Windows, skip it there
+        """
+        if os.name == 'nt':
+            return
+        for directory in directories:
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
@@ -0,0 +1,187 @@
+import os
+import locale
+import hashlib
+
+__doc__ = """Output sinks for the generated code.
+CodeFile and HtmlFile write every generated line to their 'out' handle,
+which is either a plain file object or one of the sinks implemented here.
+
+BufferedSink accumulates the generated text in memory and passes it
+to the underlying writer in large blocks instead of line by line:
+
+# Python code
+cpp = CppFile('example.cpp', buffered=True, flush_threshold=1 << 20)
+
+WriteIfChangedSink renders the whole file to memory and replaces the file on disk
+only if its content differs, so unchanged files keep their modification time
+and do not trigger rebuild of the dependent C++ code:
+
+# Python code
+cpp = CppFile('example.h', write_if_changed=True)
+...
+cpp.close()
+print(cpp.out_changed)
+"""
+
+# Size of the block used for reading existing files
+READ_BLOCK_SIZE = 1 << 16
+
+
+def open_sink(filename, writer=None, buffered=False, flush_threshold=None, write_if_changed=False):
+    """
+    Create the output handle for CodeFile/HtmlFile
+    @param: filename - file to create (rewrite if exists), used if writer is not set
+    @param: writer - optional writer to write output to
+    @param: buffered - accumulate output in memory and write it in large blocks
+    @param: flush_threshold - number of characters accumulated before flushing,
+    if not set, buffered output is flushed once on close()
+    @param: write_if_changed - render output to memory and rewrite the file only if its content changed
+    """
+    if write_if_changed:
+        if writer:
+            raise ValueError('Write-if-changed mode is not applicable to the custom writer')
+        return WriteIfChangedSink(filename)
+    out = writer if writer else open(filename, "w")
+    if buffered or flush_threshold:
+        return BufferedSink(out, flush_threshold)
+    return out
+
+
+class BufferedSink:
+    """
+    In-memory builder on top of a file-like writer.
+    Written chunks are collected into a list and joined into a single
+    block when flush_threshold characters are accumulated, or on flush()/close()
+    """
+
+    def __init__(self, writer, flush_threshold=None):
+        """
+        @param: writer - file-like object receiving the joined blocks
+        @param: flush_threshold - block size in characters, None to flush on close() only
+        """
+        self.writer = writer
+        self.flush_threshold = flush_threshold
+        self.chunks = []
+        self.size = 0
+
+    def write(self, text):
+        """
+        Store text chunk, flush accumulated chunks if threshold is reached
+        """
+        self.chunks.append(text)
+        self.size += len(text)
+        if self.flush_threshold and self.size >= self.flush_threshold:
+            self.flush()
+
+    def flush(self):
+        """
+        Pass all accumulated chunks to the underlying writer as one block
+        """
+        if self.chunks:
+            self.writer.write(''.join(self.chunks))
+            self.chunks.clear()
+            self.size = 0
+
+    def close(self):
+        """
+        Flush the rest of the output and close the underlying writer
+        """
+        self.flush()
+        self.writer.close()
+
+
+def encode_text(text):
+    """
+    Encode text the same way as a file opened with open(filename, "w") does
+    @return: bytes to be written to the file
+    """
+    if os.linesep != '\n':
+        text = text.replace('\n', os.linesep)
+    return text.encode(locale.getpreferredencoding(False))
+
+
+def file_content_equals(filename, data):
+    """
+    Compare the file with the data to be written.
+    Sizes are compared first, the content digest is calculated only if sizes match
+    @param: filename - existing or missing file
+    @param: data - bytes
+    @return: True if the file exists and contains exactly the data
+    """
+    try:
+        if os.path.getsize(filename) != len(data):
+            return False
+        existing_digest = file_digest(filename)
+    except OSError:
+        return False
+    return existing_digest == hashlib.sha256(data).digest()
+
+
+def files_equal(filename, other_filename):
+    """
+    Compare content of two files, sizes first, then content digests
+    @return: True if both files exist and have the same content
+    """
+    try:
+        if os.path.getsize(filename) != os.path.getsize(other_filename):
+            return False
+        return file_digest(filename) == file_digest(other_filename)
+    except OSError:
+        return False
+
+
+def file_digest(filename):
+    """
+    @return: SHA-256 digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+class WriteIfChangedSink:
+    """
+    Accumulates the whole output in memory.
+    On close() the output is compared with the existing file,
+    which is rewritten only if the content is different.
+    Property 'changed' shows whether the file has been rewritten
+    """
+
+    def __init__(self, filename):
+        """
+        @param: filename - target file
+        """
+        self.filename = filename
+        self.chunks = []
+        self.changed = None
+
+    def write(self, text):
+        """
+        Store text chunk
+        """
+        self.chunks.append(text)
+
+    def flush(self):
+        """
+        Output is written only on close(), nothing to flush
+        """
+        pass
+
+    def getvalue(self):
+        """
+        @return: text written so far
+        """
+        return ''.join(self.chunks)
+
+    def close(self):
+        """
+        Rewrite the file if its content differs from the accumulated output
+        """
+        data = encode_text(self.getvalue())
+        self.chunks.clear()
+        self.changed = not file_content_equals(self.filename, data)
+        if self.changed:
+            with open(self.filename, 'wb') as f:
+                f.write(data)
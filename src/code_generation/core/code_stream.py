@@ -0,0 +1,161 @@
+import queue
+import threading
+
+from code_generation.core.code_generator import CppFile
+
+__doc__ = """Streaming rendering of the code elements.
+iter_render() renders an element (or any callable receiving a code file handle)
+and yields generated text as a sequence of chunks, so that the output could be piped
+into a socket, a compressor or another process without collecting the whole file in memory.
+
+Rendering is performed in the background thread, the number of chunks
+waiting for the consumer is bounded by max_pending. When the consumer stops iteration,
+the generator returns at once, the rendering thread stops on its next write.
+
+Example:
+# Python code
+with gzip.open('my_class.h.gz', 'wt') as f:
+    for chunk in iter_render(my_class.declaration()):
+        f.write(chunk)
+"""
+
+# Default size of the yielded chunks in characters
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+# Default number of rendered chunks waiting for the consumer
+DEFAULT_MAX_PENDING = 16
+
+# Interval to check if the consumer has stopped iteration while the queue is full, seconds
+_CANCEL_POLL_INTERVAL = 0.1
+
+
+class _RenderCancelled(Exception):
+    """
+    Raised in the rendering thread when the consumer stopped iteration
+    """
+    pass
+
+
+class _RenderFinished:
+    """
+    Last queue item, contains the rendering error if any
+    """
+
+    def __init__(self, error=None):
+        self.error = error
+
+
+class ChunkQueueWriter:
+    """
+    Writer passing generated chunks to the bounded queue
+    """
+
+    def __init__(self, max_pending):
+        """
+        @param: max_pending - maximal number of chunks in the queue
+        """
+        self.queue = queue.Queue(max_pending)
+        self.cancelled = threading.Event()
+
+    def write(self, text):
+        """
+        Put text chunk to the queue, wait while the queue is full
+        @raise: _RenderCancelled if the consumer has stopped iteration
+        """
+        while True:
+            if self.cancelled.is_set():
+                raise _RenderCancelled()
+            try:
+                self.queue.put(text, timeout=_CANCEL_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def cancel(self):
+        """
+        Stop accepting chunks, the queue is emptied to wake up the writer waiting for the free space
+        """
+        self.cancelled.set()
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def close(self):
+        """
+        The queue is finalized by the rendering thread
+        """
+        pass
+
+
+class _RenderThread:
+    """
+    Background thread rendering the element to ChunkQueueWriter
+    """
+
+    def __init__(self, render, file_class, chunk_size, max_pending):
+        """
+        @param: render - callable receiving the code file handle
+        See iter_render() for other parameters
+        """
+        self.writer = ChunkQueueWriter(max_pending)
+        self.thread = threading.Thread(target=self._produce, args=(render, file_class, chunk_size),
+                                       name='iter_render', daemon=True)
+        self.thread.start()
+
+    def _produce(self, render, file_class, chunk_size):
+        """
+        Render the element, the last queue item is _RenderFinished with the rendering error if any
+        """
+        try:
+            code_file = file_class(None, writer=self.writer, flush_threshold=chunk_size)
+            render(code_file)
+            code_file.close()
+            result = _RenderFinished()
+        except _RenderCancelled:
+            return
+        except BaseException as e:
+            result = _RenderFinished(e)
+        try:
+            self.writer.write(result)
+        except _RenderCancelled:
+            pass
+
+    def chunks(self):
+        """
+        @return: generator of the rendered chunks
+        @raise: rendering error
+        """
+        while True:
+            chunk = self.writer.queue.get()
+            if isinstance(chunk, _RenderFinished):
+                self.thread.join()
+                if chunk.error is not None:
+                    raise chunk.error
+                return
+            yield chunk
+
+    def cancel(self):
+        """
+        Stop rendering without waiting for the thread, it stops on its next write
+        """
+        self.writer.cancel()
+
+
+def iter_render(element, file_class=CppFile, chunk_size=DEFAULT_CHUNK_SIZE, max_pending=DEFAULT_MAX_PENDING):
+    """
+    Render the element and yield generated text by chunks
+    @param: element - object supporting render_to_string(cpp) interface,
+    e.g. CppClass, my_class.declaration(), or a callable receiving the code file handle
+    @param: file_class - CodeFile, CppFile or HtmlFile
+    @param: chunk_size - approximate size of yielded chunks in characters
+    @param: max_pending - maximal number of rendered chunks waiting for the consumer
+    @return: generator of text chunks
+    """
+    render = element.render_to_string if hasattr(element, 'render_to_string') else element
+    render_thread = _RenderThread(render, file_class, chunk_size, max_pending)
+    try:
+        yield from render_thread.chunks()
+    finally:
+        render_thread.cancel()
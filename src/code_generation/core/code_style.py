@@ -1,8 +1,40 @@
 __doc__ = """Formatters for different styles of code generation
 """
 
+# Indentation prefixes for every indent string used by formatters, e.g. {'\t': ['', '\t', '\t\t']}
+_indent_tables = {}
 
-class ANSICodeStyle:
+
+def _grow_indent_table(indent, depth):
+    """
+    Extend the table of indentation prefixes for the indent string up to the given depth
+    @return: indentation prefix for the depth
+    """
+    if depth <= 0:
+        return ''
+    table = _indent_tables.setdefault(indent, [''])
+    while len(table) <= depth:
+        table.append(table[-1] + indent)
+    return table[depth]
+
+
+class IndentPrefix:
+    """
+    Mixin of the formatters providing indentation prefixes of the indent string (class attribute 'indent')
+    """
+
+    @classmethod
+    def indent_prefix(cls, depth):
+        """
+        @return: indentation string for the nesting depth, taken from the lazily grown table
+        """
+        try:
+            return _indent_tables[cls.indent][depth] if depth > 0 else ''
+        except (KeyError, IndexError):
+            return _grow_indent_table(cls.indent, depth)
+
+
+class ANSICodeStyle(IndentPrefix):
     """
     Class represents C++ {} close and its formatting style.
     It supports ANSI C style with braces on the new lines, like that:
@@ -18,7 +50,7 @@ class ANSICodeStyle:
  
     # Tab (indentation) symbol
     indent = "\t"
- 
+
     def __init__(self, owner, text, postfix):
         """
         @param: owner - CodeFile where text is written to
@@ -32,18 +64,19 @@ class ANSICodeStyle:
         self.owner.write("".join(text))
         self.owner.last = self
         self.postfix = postfix
-        
-    def __enter__(self):
+
+    def open(self):
         """
-        Open code block
+        Open code block, for the blocks not fitting 'with' semantic
+        (e.g. opened and closed by different visitor events)
         """
         self.owner.write("{")
         self.owner.current_indent += 1
         self.owner.last = None
 
-    def __exit__(self, *_):
+    def close(self):
         """
-        Close code block
+        Close code block opened by open()
         """
         if self.owner.last is not None:
             with self.owner.last:
@@ -51,8 +84,20 @@ class ANSICodeStyle:
         self.owner.current_indent -= 1
         self.owner.write("}" + self.postfix)
 
+    def __enter__(self):
+        """
+        Open code block
+        """
+        self.open()
+
+    def __exit__(self, *_):
+        """
+        Close code block
+        """
+        self.close()
 
-class HTMLStyle:
+
+class HTMLStyle(IndentPrefix):
     """
     Class representing HTML close and its formatting style.
     It supports HTML DOM-tree style, like that:
@@ -84,20 +129,32 @@ class HTMLStyle:
         self.attributes = attributes
         self.owner.last = self
 
-    def __enter__(self):
+    def open(self):
         """
-        Open code block
+        Open code block, for the blocks not fitting 'with' semantic
         """
         self.owner.write(f"<{self.element}{self.attributes}>")
         self.owner.current_indent += 1
         self.owner.last = None
 
-    def __exit__(self, *_):
+    def close(self):
         """
-        Close code block
+        Close code block opened by open()
         """
         if self.owner.last is not None:
             with self.owner.last:
                 pass
         self.owner.current_indent -= 1
         self.owner.write(f"</{self.element}>")
+
+    def __enter__(self):
+        """
+        Open code block
+        """
+        self.open()
+
+    def __exit__(self, *_):
+        """
+        Close code block
+        """
+        self.close()
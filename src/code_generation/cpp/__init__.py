@@ -1,6 +1,15 @@
 from . import cpp_array
+from . import cpp_blob
 from . import cpp_class
+from . import cpp_dispatch
 from . import cpp_enum
 from . import cpp_function
 from . import cpp_generator
+from . import cpp_handles
+from . import cpp_layout
+from . import cpp_literal
+from . import cpp_perfect_hash
+from . import cpp_project
+from . import cpp_render_cache
 from . import cpp_variable
+from . import cpp_visitor
@@ -1,4 +1,95 @@
-from code_generation.cpp.cpp_generator import CppLanguageElement, CppDeclaration, CppImplementation
+from itertools import islice
+from collections import namedtuple
+
+from code_generation.cpp.cpp_generator import CppLanguageElement, CppDeclaration, CppImplementation, element_slots
+from code_generation.cpp.cpp_literal import literal_lines, DEFAULT_LITERAL_BYTES, LITERAL_TYPES, \
+    MAX_CONCATENATED_LITERAL_SIZE
+
+# Formats of the bulk data items, see CppArray.item_format
+ITEM_FORMATS = ('dec', 'hex', 'float')
+
+# Default number of digits after the decimal point for 'float' items format
+DEFAULT_FLOAT_PRECISION = 6
+
+# Number of bulk data values converted to Python objects at once
+FORMAT_BLOCK_SIZE = 1 << 16
+
+# Fixed-width integer types from the narrowest: (type, size in bytes, minimal value, maximal value)
+INTEGER_TYPES = (('uint8_t', 1, 0, 0xff),
+                 ('int8_t', 1, -0x80, 0x7f),
+                 ('uint16_t', 2, 0, 0xffff),
+                 ('int16_t', 2, -0x8000, 0x7fff),
+                 ('uint32_t', 4, 0, 0xffffffff),
+                 ('int32_t', 4, -0x80000000, 0x7fffffff),
+                 ('uint64_t', 8, 0, 0xffffffffffffffff),
+                 ('int64_t', 8, -0x8000000000000000, 0x7fffffffffffffff))
+
+# Integer type chosen for the array items (see CppArray.auto_type):
+# type - fixed-width integer type
+# size - size of the type in bytes
+# bias - value subtracted from every item
+IntegerEncoding = namedtuple('IntegerEncoding', ['type', 'size', 'bias'])
+
+
+def integer_type(minimum, maximum):
+    """
+    @return: (type, size) of the narrowest fixed-width integer type holding all values of the range
+    @raise: ValueError if the range does not fit 64-bit integers
+    """
+    for type_name, size, type_minimum, type_maximum in INTEGER_TYPES:
+        if type_minimum <= minimum and maximum <= type_maximum:
+            return type_name, size
+    raise ValueError(f'Range [{minimum}, {maximum}] does not fit 64-bit integer types')
+
+
+def _integer_value(item):
+    """
+    @return: integer value of the array item, e.g. 10 for '0xa'
+    """
+    return item if isinstance(item, int) else int(str(item), 0)
+
+
+def bulk_view(data):
+    """
+    Flat view of the bulk array data: NumPy array, array.array or any other object supporting buffer protocol
+    NumPy is not imported, arrays are recognized by their 'dtype' attribute
+    @return: one-dimensional memoryview, or None if data is not a buffer (e.g. list of strings)
+    """
+    if isinstance(data, (str, list, tuple)):
+        return None
+    if hasattr(data, 'dtype') and hasattr(data, 'ravel'):
+        # memoryview.tolist() supports native byte order only
+        data = data.ravel().astype(data.dtype.newbyteorder('='), copy=False)
+    try:
+        view = memoryview(data)
+    except TypeError:
+        return None
+    if view.ndim != 1:
+        view = view.cast('B').cast(view.format)
+    return view
+
+
+class LazyItems:
+    """
+    Iterable source of array items consumed once on rendering, see CppArray.add_lazy_items()
+    """
+    __slots__ = ('source', 'consumed')
+
+    def __init__(self, source):
+        """
+        @param: source - iterable of items, e.g. generator or database cursor
+        """
+        self.source = source
+        self.consumed = False
+
+    def __iter__(self):
+        """
+        @raise: RuntimeError if the source has been already consumed
+        """
+        if self.consumed:
+            raise RuntimeError('Lazy array items could be rendered only once')
+        self.consumed = True
+        return iter(self.source)
 
 
 # noinspection PyUnresolvedReferences
@@ -21,9 +112,39 @@ class CppArray(CppLanguageElement):
     type - string, variable type
     (is_)static - boolean, 'static' prefix
     (is_)const - boolean, 'const' prefix
+    is_constexpr - boolean, 'constexpr' prefix
     (is_)class_member - boolean, for appropriate definition/declaration rendering
     array_size - integer, size of array if required
-    newline_align - in the array definition rendering place every item on the new string
+    size_name - string, name of the generated size constant, also used as the array size.
+        If the size is not known before rendering (see add_lazy_items()),
+        the constant is rendered after the array definition
+    newline_align - in the array definition rendering place every item on the new string,
+        arrays with lazy items are always rendered this way, so that the items are streamed by lines
+    items_per_line - integer, number of items on every string if newline_align is set, 1 by default
+    item_format - string, format of the bulk data items: 'dec', 'hex' or 'float'.
+        By default floating point data is formatted as 'float', other data as 'dec'
+    float_precision - integer, number of digits after the decimal point for 'float' format, 6 by default
+    auto_type - boolean, use the narrowest fixed-width integer type holding all items instead of 'type'.
+        Items are scanned before rendering, the chosen type is rendered as a typedef
+        (e.g. 'typedef uint8_t table_type;') to be used by the array consumers
+    type_alias - string, name of the typedef for auto_type, '<name>_type' by default
+    bias_encoding - boolean, with auto_type store items minus the minimal item (bias),
+        so that the narrower unsigned type could be used. The bias is rendered as a constant '<name>_bias'
+    literal_encoding - boolean, initialize the byte array (e.g. 'unsigned char') by concatenated string literals
+        instead of the list of numbers, that is much faster to compile (see cpp_literal.py).
+        Items should be single-byte bulk data, items_per_line is a number of bytes in every literal.
+        NOTE: the literal has terminating NUL, so the array is one byte longer than the data (or array_size)
+    max_literal_size - integer, maximal size of the concatenated string literal with the terminating NUL,
+        MSVC limit (65535 bytes, error C1091) by default. Rendering of larger literal_encoding arrays raises ValueError,
+        set to None if the code is not compiled by MSVC
+
+    Besides strings, items could be added as bulk data: NumPy arrays, array.array
+    or any other objects supporting buffer protocol, they are formatted without
+    conversion of every value to a string. Multidimensional data is flattened
+    Example:
+    table = CppArray(name='table', type='uint16_t', is_const=True,
+                     newline_align=True, items_per_line=8, item_format='hex')
+    table.add_array_items(array.array('H', range(1024)))
 
     NOTE: versions 2.0+ of CodeGenerator support boolean properties without "is_" suffix,
     but old versions preserved for backward compatibility
@@ -33,26 +154,35 @@ class CppArray(CppLanguageElement):
                                 'static',
                                 'is_const',
                                 'const',
+                                'is_constexpr',
                                 'is_class_member',
                                 'class_member',
                                 'array_size',
-                                'newline_align'} | CppLanguageElement.availablePropertiesNames
+                                'size_name',
+                                'newline_align',
+                                'items_per_line',
+                                'item_format',
+                                'float_precision',
+                                'literal_encoding',
+                                'max_literal_size',
+                                'auto_type',
+                                'type_alias',
+                                'bias_encoding'} | CppLanguageElement.availablePropertiesNames
+    defaultPropertiesValues = {'is_static': False,
+                               'is_const': False,
+                               'is_constexpr': False,
+                               'is_class_member': False,
+                               'array_size': 0,
+                               'max_literal_size': MAX_CONCATENATED_LITERAL_SIZE}
+    # array elements, strings, bulk data objects or LazyItems
+    containerNames = ('items',)
+    # number of items written by the last rendering, IntegerEncoding used by the current rendering
+    cacheNames = CppLanguageElement.cacheNames + ('_rendered_size', '_encoding')
+    __slots__ = element_slots(availablePropertiesNames, CppLanguageElement, *containerNames,
+                              '_rendered_size', '_encoding')
 
     def __init__(self, **properties):
-        self.is_static = False
-        self.is_const = False
-        self.is_class_member = False
-        self.array_size = 0
-        self.newline_align = None
-
-        # array elements
-        self.items = []
-
-        input_property_names = set(properties.keys())
-        self.check_input_properties_names(input_property_names)
-        super(CppArray, self).__init__(properties)
-        self.init_class_properties(current_class_properties=self.availablePropertiesNames,
-                                   input_properties_dict=properties)
+        self._init_properties(properties)
 
     def _render_static(self):
         """
@@ -66,27 +196,208 @@ class CppArray(CppLanguageElement):
         """
         return 'const ' if self.is_const else ''
 
+    def _render_type(self):
+        """
+        @return: type of the array items, typedef name for auto_type
+        """
+        if self.auto_type:
+            return self.type_alias or f'{self.name}_type'
+        return self.type
+
+    def _value_range(self):
+        """
+        Scan the array items, bulk data is scanned by large blocks (NumPy arrays by a single vectorized operation)
+        @return: (minimum, maximum) of the items, None if there are no items
+        """
+        ranges = []
+        for item in self.items:
+            if isinstance(item, LazyItems):
+                raise RuntimeError(f'Type of the array {self.name} with lazy items could not be chosen automatically')
+            view = None if isinstance(item, str) else bulk_view(item)
+            if view is None:
+                value = _integer_value(item)
+                ranges.append((value, value))
+            elif view.format[-1] in 'efd':
+                raise ValueError(f'Floating point items of the array {self.name} could not have integer type')
+            elif hasattr(item, 'dtype'):
+                ranges.append((int(item.min()), int(item.max())))
+            else:
+                for start in range(0, len(view), FORMAT_BLOCK_SIZE):
+                    values = view[start:start + FORMAT_BLOCK_SIZE].tolist()
+                    ranges.append((min(values), max(values)))
+        if not ranges:
+            return None
+        return min(minimum for minimum, _ in ranges), max(maximum for _, maximum in ranges)
+
+    def integer_encoding(self):
+        """
+        Choose the narrowest integer type for the items, see auto_type and bias_encoding properties
+        @return: IntegerEncoding
+        """
+        value_range = self._value_range() or (0, 0)
+        bias = value_range[0] if self.bias_encoding else 0
+        type_name, size = integer_type(value_range[0] - bias, value_range[1] - bias)
+        return IntegerEncoding(type_name, size, bias)
+
+    def _render_type_definitions(self, cpp, encoding):
+        """
+        Render typedef of the automatically chosen type and the bias constant
+        """
+        if encoding is None:
+            return
+        cpp(f'typedef {encoding.type} {self._render_type()};')
+        if self.bias_encoding:
+            cpp(f'{self._render_static()}constexpr int64_t {self.name}_bias = {encoding.bias};')
+
+    def _render_constexpr(self):
+        """
+        @return: 'constexpr' prefix if required
+        """
+        return 'constexpr ' if self.is_constexpr else ''
+
+    def _render_specifiers(self):
+        """
+        @return: specifiers before the array type
+        """
+        return f'{self._render_static()}{self._render_constexpr()}{self._render_const()}'
+
+    def _has_items(self):
+        """
+        @return: True if the array has items to render
+        """
+        return bool(self.items)
+
+    def _has_lazy_items(self):
+        """
+        @return: True if some items are consumed on rendering (see add_lazy_items())
+        """
+        return any(isinstance(item, LazyItems) for item in self.items)
+
+    def _known_size(self):
+        """
+        @return: number of array items before rendering, None if the array has lazy items
+        """
+        if self.array_size:
+            return self.array_size
+        size = 0
+        for item in self.items:
+            if isinstance(item, LazyItems):
+                return None
+            view = None if isinstance(item, str) else bulk_view(item)
+            size += 1 if view is None else len(view)
+        return size
+
+    def rendered_size(self):
+        """
+        @return: number of items written by the last rendering, None if items have not been rendered
+        """
+        return getattr(self, '_rendered_size', None)
+
     def _render_size(self):
         """
-        @return: array size
+        @return: array size, size constant if any
+        String literal has terminating NUL, so the array is one byte longer
+        """
+        if self.size_name and self._known_size() is not None:
+            return f'{self.size_name} + 1' if self.literal_encoding else self.size_name
+        if not self.array_size:
+            return ''
+        if not self.literal_encoding:
+            return self.array_size
+        return self.array_size + 1 if isinstance(self.array_size, int) else f'{self.array_size} + 1'
+
+    def _render_size_constant(self, cpp, size):
+        """
+        Render the constant holding the array size
         """
-        return self.array_size if self.array_size else ''
+        cpp(f'{self._render_static()}constexpr size_t {self.size_name} = {size};')
 
     def _render_content(self):
         """
         @return: array items if any
         """
-        return ', '.join(self.items) if self.items else 'nullptr'
+        return ', '.join(self._item_lines()) if self._has_items() else 'nullptr'
 
     def _render_value(self, cpp):
         """
         Render to string array items
         """
-        if not self.items:
+        if not self._has_items():
             raise RuntimeError('Empty arrays do not supported')
-        for item in self.items[:-1]:
-            cpp('{0},'.format(item))
-        cpp('{0}'.format(self.items[-1]))
+        cpp.write_lines(self._item_lines(), separator=',')
+
+    def _value_format(self, view):
+        """
+        @return: printf-style format of a single bulk data value
+        """
+        item_format = self.item_format or ('float' if view.format[-1] in 'efd' else 'dec')
+        if item_format == 'dec':
+            return '%d'
+        if item_format == 'hex':
+            # e.g. 0x00ff for 2-byte values
+            item_size = self._encoding.size if self._encoding is not None else view.itemsize
+            return f'%#0{item_size * 2 + 2}x'
+        if item_format == 'float':
+            precision = DEFAULT_FLOAT_PRECISION if self.float_precision is None else self.float_precision
+            suffix = 'f' if self.type and self.type.split()[-1] == 'float' else ''
+            return f'%.{precision}f{suffix}'
+        raise ValueError(f'Unknown item format {item_format!r} of array {self.name}, expected one of {ITEM_FORMATS}')
+
+    def _bulk_lines(self, view, items_per_line):
+        """
+        Format bulk data, items_per_line values in every string
+        Values are converted to Python objects by large blocks, every string is formatted by a single operation
+        """
+        value_format = self._value_format(view)
+        line_format = ', '.join([value_format] * items_per_line)
+        block_size = items_per_line * max(1, FORMAT_BLOCK_SIZE // items_per_line)
+        bias = self._encoding.bias if self._encoding is not None else 0
+        for start in range(0, len(view), block_size):
+            values = view[start:start + block_size].tolist()
+            if bias:
+                values = [value - bias for value in values]
+            complete = len(values) - len(values) % items_per_line
+            for i in range(0, complete, items_per_line):
+                yield line_format % tuple(values[i:i + items_per_line])
+            if complete < len(values):
+                yield ', '.join([value_format] * (len(values) - complete)) % tuple(values[complete:])
+
+    def _item_lines(self):
+        """
+        Generate strings of array items, items_per_line items in every string
+        Every bulk data object starts from the new string
+        """
+        items_per_line = self.items_per_line or 1
+        bias = self._encoding.bias if self._encoding is not None else 0
+        self._rendered_size = None
+        count = 0
+        strings = []
+        for item in self.items:
+            view = None if isinstance(item, (str, LazyItems)) else bulk_view(item)
+            if view is None and not isinstance(item, LazyItems):
+                strings.append(str(_integer_value(item) - bias) if bias else str(item))
+                continue
+            for i in range(0, len(strings), items_per_line):
+                yield ', '.join(strings[i:i + items_per_line])
+            count += len(strings)
+            strings = []
+            if view is not None:
+                yield from self._bulk_lines(view, items_per_line)
+                count += len(view)
+                continue
+            # lazy items are consumed by lines, without materializing the whole source
+            iterator = iter(item)
+            while True:
+                line = [str(value) for value in islice(iterator, items_per_line)]
+                if not line:
+                    break
+                count += len(line)
+                yield ', '.join(line)
+        for i in range(0, len(strings), items_per_line):
+            yield ', '.join(strings[i:i + items_per_line])
+        if not count + len(strings):
+            raise RuntimeError(f'Lazy items of array {self.name} are empty, empty arrays are not supported')
+        self._rendered_size = count + len(strings)
 
     def declaration(self):
         """
@@ -112,9 +423,24 @@ class CppArray(CppLanguageElement):
     def add_array_items(self, items):
         """
         If variable is an array it could contain a number of items
-        @param: items - list of strings
+        @param: items - list of strings, or bulk data (NumPy array, array.array, bytes etc.)
+        Bulk data is stored by reference and formatted on rendering
         """
-        self.items.extend(items)
+        view = bulk_view(items)
+        if view is None:
+            self.items.extend(items)
+        elif len(view):
+            self.items.append(items)
+
+    def add_lazy_items(self, items):
+        """
+        Add the source of items consumed once on rendering, e.g. a generator or a database cursor,
+        so that the items are not stored in memory. Set array_size if the size should be known
+        before rendering (e.g. for the declaration), otherwise it is counted during rendering.
+        Rendering raises RuntimeError if the sources produce no items, as empty arrays are not supported
+        @param: items - iterable of items, or iterable of single-byte bulk data blocks with literal_encoding
+        """
+        self.items.append(LazyItems(items))
 
     def render_to_string(self, cpp):
         """
@@ -131,15 +457,14 @@ class CppArray(CppLanguageElement):
         if self.is_class_member and not (self.is_static and self.is_const):
             raise RuntimeError('For class member variables use definition() and declaration() methods')
 
-        # newline-formatting of array elements makes sense only if array is not empty
-        if self.newline_align and self.items:
-            with cpp.block(f'{self._render_static()}{self._render_const()}{self.type} '
-                           f'{self.name}[{self._render_size()}] = ', ';'):
-                # render array items
-                self._render_value(cpp)
-        else:
-            cpp(f'{self._render_static()}{self._render_const()}{self.type} '
-                f'{self.name}[{self._render_size()}] = {{{self._render_content()}}};')
+        encoding = self.integer_encoding() if self.auto_type else None
+        self._render_type_definitions(cpp, encoding)
+        size = self._known_size() if self.size_name else None
+        if size is not None:
+            self._render_size_constant(cpp, size)
+        self._render_definition(cpp, encoding)
+        if self.size_name and size is None:
+            self._render_size_constant(cpp, self._rendered_size)
 
     def render_to_string_declaration(self, cpp):
         """
@@ -151,7 +476,91 @@ class CppArray(CppLanguageElement):
         """
         if not self.is_class_member:
             raise RuntimeError('For automatic variable use its render_to_string() method')
-        cpp(f'{self._render_static()}{self._render_const()}{self.type} {self.name}[{self._render_size()}];')
+        self._render_type_definitions(cpp, self.integer_encoding() if self.auto_type else None)
+        if self.size_name:
+            size = self._known_size()
+            if size is None:
+                raise RuntimeError(f'Size of the array {self.name} with lazy items is unknown before rendering, '
+                                   f'set array_size')
+            self._render_size_constant(cpp, size)
+        cpp(f'{self._render_specifiers()}{self._render_type()} {self.name}[{self._render_size()}];')
+
+    def _literal_blocks(self):
+        """
+        @return: generator of bytes-like blocks encoded as string literals
+        """
+        self._rendered_size = None
+        count = 0
+        for item in self.items:
+            for block in item if isinstance(item, LazyItems) else (item,):
+                view = None if isinstance(block, str) else bulk_view(block)
+                if view is None or view.itemsize != 1:
+                    raise ValueError(f'Literal encoding of array {self.name} requires single-byte bulk data items')
+                count += len(view)
+                self._check_literal_size(count)
+                yield view.cast('B')
+        if not count:
+            raise RuntimeError(f'Lazy items of array {self.name} are empty, empty arrays are not supported')
+        self._rendered_size = count
+
+    def _check_literal_size(self, size):
+        """
+        @param: size - number of bytes encoded as the string literal
+        @raise: ValueError if the literal with the terminating NUL is longer than max_literal_size
+        """
+        if self.max_literal_size and size + 1 > self.max_literal_size:
+            raise ValueError(f'Array {self.name} of {size} bytes exceeds the string literal limit '
+                             f'of {self.max_literal_size} bytes (MSVC error C1091), '
+                             f'split the data or set max_literal_size=None if the code is not compiled by MSVC')
+
+    def _render_literal_definition(self, cpp):
+        """
+        Render array definition initialized by concatenated string literals
+        """
+        if ' '.join(str(self.type).split()) not in LITERAL_TYPES:
+            raise ValueError(f'Array {self.name} of type {self.type} could not be initialized by string literal')
+        size = self._known_size()
+        if size is not None:
+            self._check_literal_size(size)
+        definition = f'{self._render_specifiers()}{self._render_type()} {self.name}[{self._render_size()}] ='
+        if not self._has_items():
+            cpp(f'{definition} "";')
+            return
+        cpp(definition)
+        cpp.write_lines(literal_lines(self._literal_blocks(), self.items_per_line or DEFAULT_LITERAL_BYTES),
+                        indent=1, terminator=';')
+
+    def _render_definition(self, cpp, encoding=None):
+        """
+        Render array definition with items, common for automatic arrays and static class members
+        @param: encoding - IntegerEncoding for auto_type
+        """
+        self._rendered_size = 0
+        self._encoding = encoding
+        try:
+            self._render_items_definition(cpp)
+        finally:
+            self._encoding = None
+        rendered_size, array_size = self._rendered_size, self.array_size
+        if array_size and isinstance(array_size, int) and rendered_size is not None and rendered_size > array_size:
+            raise RuntimeError(f'Array {self.name} has {rendered_size} items, more than its size {array_size}')
+
+    def _render_items_definition(self, cpp):
+        """
+        Render array definition, items are formatted according to the current encoding
+        """
+        if self.literal_encoding:
+            self._render_literal_definition(cpp)
+        # newline-formatting of array elements makes sense only if array is not empty,
+        # lazy items are streamed by lines rather than joined into a single string
+        elif (self.newline_align or self._has_lazy_items()) and self._has_items():
+            with cpp.block(f'{self._render_specifiers()}{self._render_type()} '
+                           f'{self.name}[{self._render_size()}] = ', ';'):
+                # render array items
+                self._render_value(cpp)
+        else:
+            cpp(f'{self._render_specifiers()}{self._render_type()} '
+                f'{self.name}[{self._render_size()}] = {{{self._render_content()}}};')
 
     def render_to_string_implementation(self, cpp):
         """
@@ -174,12 +583,4 @@ class CppArray(CppLanguageElement):
         if not self.is_static:
             raise RuntimeError('Only static arrays as class members are supported')
 
-        # newline-formatting of array elements makes sense only if array is not empty
-        if self.newline_align and self.items:
-            with cpp.block(f'{self._render_static()}{self._render_const()}{self.type} '
-                           f'{self.name}[{self._render_size()}] = ', ';'):
-                # render array items
-                self._render_value(cpp)
-        else:
-            cpp(f'{self._render_static()}{self._render_const()}{self.type} '
-                f'{self.name}[{self._render_size()}] = {{{self._render_content()}}};')
+        self._render_definition(cpp, self.integer_encoding() if self.auto_type else None)
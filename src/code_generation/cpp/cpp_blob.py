@@ -0,0 +1,146 @@
+import os
+import mmap
+
+from code_generation.cpp.cpp_generator import element_slots
+from code_generation.cpp.cpp_array import CppArray, FORMAT_BLOCK_SIZE
+from code_generation.cpp.cpp_literal import DEFAULT_LITERAL_BYTES
+
+__doc__ = """Embedding of binary files (firmware images, fonts, model weights etc.) as C++ arrays.
+The file is memory-mapped and rendered by fixed-size chunks, so the memory consumption
+does not depend on the file size.
+
+Example:
+# Python code
+blob = CppBlob(name='firmware', filename='firmware.bin', alignment=16, size_name='firmware_size')
+blob.render_to_string(cpp)
+
+// Generated C++ code
+constexpr size_t firmware_size = 1024;
+alignas(16) const unsigned char firmware[firmware_size] =
+{
+    0x7f, 0x45, 0x4c, 0x46, 0x02, 0x01, 0x01, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
+    ...
+};
+"""
+
+
+class CppBlob(CppArray):
+    """
+    The Python class that generates C++ array with the content of a binary file
+    Supports the same declaration/definition interface as CppArray, array items could not be added
+    Available properties (besides CppArray ones):
+    filename - string, path to the embedded file, read on rendering
+    alignment - integer, 'alignas' specifier of the array
+    With literal_encoding the file is embedded as string literals, the size constant is the file size,
+    while the array has one more byte for the terminating NUL
+
+    By default the array is 'const unsigned char', 16 hexadecimal bytes per line
+    """
+    availablePropertiesNames = {'filename',
+                                'alignment'} | CppArray.availablePropertiesNames
+    defaultPropertiesValues = {**CppArray.defaultPropertiesValues,
+                               'type': 'unsigned char',
+                               'is_const': True,
+                               'newline_align': True,
+                               'items_per_line': 16,
+                               'item_format': 'hex'}
+    __slots__ = element_slots(availablePropertiesNames, CppArray)
+
+    def __init__(self, **properties):
+        self._init_properties(properties)
+
+    def add_array_item(self, item):
+        """
+        Content of the blob is read from the file
+        """
+        raise RuntimeError(f'Items could not be added to the binary blob {self.name}')
+
+    def add_array_items(self, items):
+        """
+        Content of the blob is read from the file
+        """
+        raise RuntimeError(f'Items could not be added to the binary blob {self.name}')
+
+    def add_lazy_items(self, items):
+        """
+        Content of the blob is read from the file
+        """
+        raise RuntimeError(f'Items could not be added to the binary blob {self.name}')
+
+    def file_size(self):
+        """
+        @return: size of the embedded file in bytes
+        """
+        return os.path.getsize(self.filename)
+
+    def external_content_token(self):
+        """
+        @return: string changed when the embedded file changes, used by the render cache (see cpp_render_cache.py)
+        """
+        stat = os.stat(self.filename)
+        return f'{stat.st_size}:{stat.st_mtime_ns}'
+
+    def _has_items(self):
+        """
+        @return: True if the embedded file is not empty
+        """
+        return self.file_size() > 0
+
+    def _render_specifiers(self):
+        """
+        @return: specifiers before the array type, alignment specifier goes first
+        """
+        alignment = f'alignas({self.alignment}) ' if self.alignment else ''
+        return f'{alignment}{super()._render_specifiers()}'
+
+    def _known_size(self):
+        """
+        @return: array size, file size by default
+        @raise: ValueError if the file is empty, as zero-size arrays are not allowed in C++.
+        Empty file could be embedded with literal_encoding, the array consists of the terminating NUL
+        """
+        size = self.file_size()
+        if not size and not self.literal_encoding:
+            raise ValueError(f'Could not embed empty file {self.filename} as array {self.name}, '
+                             f'use literal_encoding')
+        return self.array_size if self.array_size else size
+
+    def _render_size(self):
+        """
+        @return: array size, size constant if any
+        String literal has terminating NUL, so the array is one byte longer
+        """
+        if self.size_name:
+            return super()._render_size()
+        return self._known_size() + 1 if self.literal_encoding else self._known_size()
+
+    def _literal_blocks(self):
+        """
+        @return: generator of the file blocks encoded as string literals
+        """
+        bytes_per_literal = self.items_per_line or DEFAULT_LITERAL_BYTES
+        block_size = bytes_per_literal * max(1, FORMAT_BLOCK_SIZE // bytes_per_literal)
+        with open(self.filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for start in range(0, len(data), block_size):
+                yield data[start:start + block_size]
+            self._rendered_size = len(data)
+
+    def _item_lines(self):
+        """
+        Generate strings of file bytes, items_per_line bytes in every string
+        The file is mapped to memory and formatted by blocks
+        """
+        items_per_line = self.items_per_line or 1
+        block_size = items_per_line * max(1, FORMAT_BLOCK_SIZE // items_per_line)
+        with open(self.filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if (self.item_format or 'hex') != 'hex':
+                with memoryview(data) as view:
+                    yield from self._bulk_lines(view, items_per_line)
+            else:
+                # every byte is formatted as '0xNN, ' - 6 characters
+                line_width = 6 * items_per_line
+                for start in range(0, len(data), block_size):
+                    text = '0x' + data[start:start + block_size].hex(' ').replace(' ', ', 0x')
+                    for i in range(0, len(text), line_width):
+                        yield text[i:i + line_width - 2]
+            self._rendered_size = len(data)
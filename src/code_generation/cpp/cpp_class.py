@@ -1,8 +1,149 @@
-from code_generation.cpp.cpp_generator import CppLanguageElement, CppDeclaration, CppImplementation
-from code_generation.cpp.cpp_function import CppFunction
+from code_generation.cpp.cpp_generator import CppLanguageElement, CppDeclaration, CppImplementation, element_slots
+from code_generation.cpp.cpp_generator import flag_rules_table, flags_mask
+from code_generation.cpp.cpp_function import CppFunction, FunctionSignatures
+from code_generation.cpp.cpp_variable import CppVariable
+from code_generation.cpp.cpp_layout import DEFAULT_TYPE_LAYOUTS, DEFAULT_CACHE_LINE_SIZE, TypeLayout, LayoutReport
+from code_generation.cpp.cpp_layout import MemberLayout, CacheLineReport, type_layout, struct_size, optimal_order
+from code_generation.cpp.cpp_layout import align_offset
+from collections import namedtuple
+from functools import partial
 from textwrap import dedent
 
 
+# Non-static member variable or padding in the declaration order:
+# name - name of the member
+# variable - CppVariable, None for padding
+# layout - TypeLayout of the member
+# offset - estimated offset in bytes
+# alignment - alignment of the cache line group, None for other members
+DeclaredMember = namedtuple('DeclaredMember', ['name', 'variable', 'layout', 'offset', 'alignment'])
+
+
+def storage_type(type_name):
+    """
+    @return: type without top-level qualifiers, e.g. 'int' for 'const int', 'const char*' for 'const char* const'
+    """
+    words = type_name.replace('*', ' * ').replace('&', ' & ').split()
+    if '*' not in words and '&' not in words:
+        return ' '.join(word for word in words if word not in ('const', 'volatile', 'mutable'))
+    while words[-1] in ('const', 'volatile'):
+        words.pop()
+    return ' '.join(words).replace(' *', '*').replace(' &', '&')
+
+
+def soa_column_type(type_name):
+    """
+    @return: type of the struct-of-arrays column items for the member type.
+    'bool' is stored as 'uint8_t', as std::vector<bool> items could not be bound to references
+    """
+    stored_type = storage_type(type_name)
+    return 'uint8_t' if stored_type == 'bool' else stored_type
+
+
+# Prefix of the names of paddings between cache line groups, e.g. 'cache_line_padding_0'.
+# Member variables could not have names starting with it
+CACHE_LINE_PADDING_PREFIX = 'cache_line_padding_'
+
+# Names of the struct-of-arrays companion methods and proxies (see CppClass.soa_companion())
+SOA_RESERVED_NAMES = ('size', 'capacity', 'reserve', 'resize', 'clear', 'push_back', 'get', 'set',
+                      'Reference', 'ConstReference')
+
+
+# Bodies of the struct-of-arrays companion methods
+def _soa_size_body(_, cpp, columns, method):
+    cpp(f'return this->{columns[0]}.{method}();' if columns else 'return 0;')
+
+
+def _soa_columns_body(_, cpp, columns, statement):
+    for column in columns:
+        cpp(statement.format(column=column))
+
+
+def _soa_get_body(_, cpp, columns, value_type):
+    cpp(f'{value_type} value;')
+    _soa_columns_body(_, cpp, columns, 'value.{column} = this->{column}[index];')
+    cpp('return value;')
+
+
+def _soa_reference_body(_, cpp, columns):
+    cpp(f'return {{{", ".join(f"this->{column}[index]" for column in columns)}}};')
+
+
+# Serialized member variables (see CppClass.add_serialization_methods()):
+# kind - 'copy' for a run of adjacent trivially copyable members, 'string' or 'nested'
+# names - names of the members, the only member for 'string' and 'nested'
+SerializedRun = namedtuple('SerializedRun', ['kind', 'names'])
+
+
+def _run_size(class_name, names):
+    """
+    @return: expression of the total size of the members
+    """
+    return ' + '.join(f'sizeof({class_name}::{name})' for name in names)
+
+
+def _serialized_size_body(_, cpp, element):
+    class_name = element.fully_qualified_name()
+    cpp('size_t size = 0;')
+    for run in element.serialized_runs():
+        if run.kind == 'copy':
+            cpp(f'size += {_run_size(class_name, run.names)};')
+        elif run.kind == 'string':
+            cpp(f'size += sizeof(uint32_t) + this->{run.names[0]}.size();')
+        else:
+            cpp(f'size += this->{run.names[0]}.serialized_size();')
+    cpp('return size;')
+
+
+def _serialize_body(_, cpp, element):
+    class_name = element.fully_qualified_name()
+    runs = element.serialized_runs()
+    cpp('uint8_t* cursor = data;')
+    if any(run.kind == 'string' for run in runs):
+        cpp('uint32_t length = 0;')
+    for run in runs:
+        first = run.names[0]
+        if run.kind == 'copy':
+            size = _run_size(class_name, run.names)
+            if len(run.names) > 1:
+                last = run.names[-1]
+                cpp(f'static_assert(offsetof({class_name}, {last}) + sizeof({class_name}::{last}) - '
+                    f'offsetof({class_name}, {first}) == {size}, "Unexpected padding between serialized members");')
+            cpp(f'std::memcpy(cursor, &this->{first}, {size});')
+            cpp(f'cursor += {size};')
+        elif run.kind == 'string':
+            cpp(f'length = static_cast<uint32_t>(this->{first}.size());')
+            cpp('std::memcpy(cursor, &length, sizeof(length));')
+            cpp('cursor += sizeof(length);')
+            cpp(f'std::memcpy(cursor, this->{first}.data(), length);')
+            cpp('cursor += length;')
+        else:
+            cpp(f'cursor += this->{first}.serialize(cursor);')
+    cpp('return static_cast<size_t>(cursor - data);')
+
+
+def _deserialize_body(_, cpp, element):
+    class_name = element.fully_qualified_name()
+    runs = element.serialized_runs()
+    cpp('const uint8_t* cursor = data;')
+    if any(run.kind == 'string' for run in runs):
+        cpp('uint32_t length = 0;')
+    for run in runs:
+        first = run.names[0]
+        if run.kind == 'copy':
+            size = _run_size(class_name, run.names)
+            cpp(f'std::memcpy(&this->{first}, cursor, {size});')
+            cpp(f'cursor += {size};')
+        elif run.kind == 'string':
+            cpp('std::memcpy(&length, cursor, sizeof(length));')
+            cpp('cursor += sizeof(length);')
+            cpp(f'this->{first}.assign(reinterpret_cast<const char*>(cursor), length);')
+            cpp('cursor += length;')
+        else:
+            cpp(f'cursor += this->{first}.deserialize(cursor);')
+    cpp('return static_cast<size_t>(cursor - data);')
+
+
 class CppClass(CppLanguageElement):
     """
     The Python class that generates string representation for C++ class or struct.
@@ -10,6 +151,16 @@ class CppClass(CppLanguageElement):
     Available properties:
     is_struct - boolean, use 'struct' keyword for class declaration, 'class' otherwise
     documentation - string, '/// Example doxygen'
+    optimize_layout - boolean, reorder non-static member variables to minimize padding (see cpp_layout.py)
+    type_layouts - dict of type names to (size, alignment) tuples, added to DEFAULT_TYPE_LAYOUTS
+    assert_size - boolean, generate static_assert of the estimated class size after the declaration
+    cache_line_size - integer, DEFAULT_CACHE_LINE_SIZE by default. Members of every cache_line_group
+        (see CppVariable) are placed to separate cache lines: the first member is aligned by the cache line,
+        the last one is followed by explicit padding up to the end of the line.
+        Members without a group go first, groups follow in the order of the first member.
+        Paddings are named with CACHE_LINE_PADDING_PREFIX, member names starting with it are not allowed.
+        Classes with parent_class are supported, but members without a group are not padded,
+        as their offsets depend on the parent class layout
 
     Example of usage:
 
@@ -45,7 +196,19 @@ class CppClass(CppLanguageElement):
     """
     availablePropertiesNames = {'is_struct',
                                 'documentation',
-                                'parent_class'} | CppLanguageElement.availablePropertiesNames
+                                'parent_class',
+                                'optimize_layout',
+                                'type_layouts',
+                                'assert_size',
+                                'cache_line_size'} | CppLanguageElement.availablePropertiesNames
+    defaultPropertiesValues = {'is_struct': False}
+    # aggregated classes, class members, array class members, class methods, class enums
+    containerNames = ('internal_class_elements',
+                      'internal_variable_elements',
+                      'internal_array_elements',
+                      'internal_method_elements',
+                      'internal_enum_elements')
+    __slots__ = element_slots(availablePropertiesNames, CppLanguageElement, *containerNames)
 
     class CppMethod(CppFunction):
         """
@@ -85,28 +248,31 @@ class CppClass(CppLanguageElement):
                                     'is_final',
                                     'implementation_handle',
                                     'documentation'} | CppLanguageElement.availablePropertiesNames
+        defaultPropertiesValues = dict.fromkeys(('is_static', 'is_constexpr', 'is_virtual', 'is_inline',
+                                                 'is_pure_virtual', 'is_const', 'is_override', 'is_final'), False)
+        trackedPropertiesNames = availablePropertiesNames - CppLanguageElement.availablePropertiesNames
+        __slots__ = element_slots(availablePropertiesNames, CppFunction, tracked=trackedPropertiesNames)
+
+        # boolean properties checked by _flagErrors table
+        flagNames = ('is_static', 'is_constexpr', 'is_virtual', 'is_inline',
+                     'is_pure_virtual', 'is_const', 'is_override', 'is_final')
+        # incompatible combinations of flags in order of checking
+        _flagErrors = flag_rules_table(flagNames, [
+            ({'is_inline', 'is_virtual'}, (), 'Inline method {} could not be virtual'),
+            ({'is_inline', 'is_pure_virtual'}, (), 'Inline method {} could not be virtual'),
+            ({'is_constexpr', 'is_virtual'}, (), 'Constexpr method {} could not be virtual'),
+            ({'is_constexpr', 'is_pure_virtual'}, (), 'Constexpr method {} could not be virtual'),
+            ({'is_const', 'is_static'}, (), 'Static method {} could not be const'),
+            ({'is_const', 'is_virtual'}, (), 'Virtual method {} could not be const'),
+            ({'is_const', 'is_pure_virtual'}, (), 'Pure virtual method {} could not be const'),
+            ({'is_override'}, {'is_virtual'}, 'Override method {} should be virtual'),
+            ({'is_final'}, {'is_virtual'}, 'Final method {} should be virtual'),
+            ({'is_static', 'is_virtual'}, (), 'Static method {} could not be virtual'),
+            ({'is_pure_virtual'}, {'is_virtual'}, 'Pure virtual method {} is also a virtual method'),
+        ])
 
         def __init__(self, **properties):
-            # arguments are plain strings
-            # e.g. 'int* a', 'const string& s', 'size_t sz = 10'
-            self.is_static = False
-            self.is_constexpr = False
-            self.is_virtual = False
-            self.is_inline = False
-            self.is_pure_virtual = False
-            self.is_const = False
-            self.is_override = False
-            self.is_final = False
-            self.arguments = []
-            self.implementation_handle = properties.get('implementation_handle')
-            self.documentation = properties.get('documentation')
-
-            # check properties
-            input_property_names = set(properties.keys())
-            self.check_input_properties_names(input_property_names)
-            super().__init__(**properties)
-            self.init_class_properties(current_class_properties=self.availablePropertiesNames,
-                                       input_properties_dict=properties)
+            self._init_properties(properties)
 
         def _render_static(self):
             """
@@ -174,26 +340,9 @@ class CppClass(CppLanguageElement):
             """
             Check whether attributes compose a correct C++ code
             """
-            if self.is_inline and (self.is_virtual or self.is_pure_virtual):
-                raise ValueError(f'Inline method {self.name} could not be virtual')
-            if self.is_constexpr and (self.is_virtual or self.is_pure_virtual):
-                raise ValueError(f'Constexpr method {self.name} could not be virtual')
-            if self.is_const and self.is_static:
-                raise ValueError(f'Static method {self.name} could not be const')
-            if self.is_const and self.is_virtual:
-                raise ValueError(f'Virtual method {self.name} could not be const')
-            if self.is_const and self.is_pure_virtual:
-                raise ValueError(f'Pure virtual method {self.name} could not be const')
-            if self.is_override and not self.is_virtual:
-                raise ValueError(f'Override method {self.name} should be virtual')
-            if self.is_inline and (self.is_virtual or self.is_pure_virtual):
-                raise ValueError(f'Inline method {self.name} could not be virtual')
-            if self.is_final and not self.is_virtual:
-                raise ValueError(f'Final method {self.name} should be virtual')
-            if self.is_static and self.is_virtual:
-                raise ValueError(f'Static method {self.name} could not be virtual')
-            if self.is_pure_virtual and not self.is_virtual:
-                raise ValueError(f'Pure virtual method {self.name} is also a virtual method')
+            error = self._flagErrors[flags_mask(self, self.flagNames)]
+            if error is not None:
+                raise ValueError(error.format(self.name))
             if not self.ref_to_parent:
                 raise ValueError(f'Method {self.name} object must be a child of CppClass')
             if self.is_constexpr and self.implementation_handle is None:
@@ -201,11 +350,28 @@ class CppClass(CppLanguageElement):
             if self.is_pure_virtual and self.implementation_handle is not None:
                 raise ValueError(f'Pure virtual method {self.name} could not be implemented')
 
+        def _render_signatures(self):
+            """
+            @return: FunctionSignatures of the method
+            """
+            args = self.args()
+            postfix = f'{self._render_const()}{self._render_override()}{self._render_final()}{self._render_pure()}'
+            ret_type = self._render_ret_type()
+            qualified_name = self.fully_qualified_name()
+            return FunctionSignatures(
+                definition=f'{self._render_static()}{self._render_virtual()}{self._render_constexpr()}'
+                           f'{self._render_inline()}{ret_type} {qualified_name}({args}){postfix}',
+                declaration=f'{self._render_static()}{self._render_virtual()}{self._render_inline()}'
+                            f'{ret_type} {self.name}({args}){postfix};',
+                implementation=f'{self._render_virtual()}{self._render_constexpr()}{self._render_inline()}'
+                               f'{ret_type} {qualified_name}({args}){postfix}')
+
         def add_argument(self, argument):
             """
             @param: argument string representation of the C++ function argument ('int a', 'void p = NULL' etc)
             """
             self.arguments.append(argument)
+            self.invalidate_render_cache()
 
         def args(self):
             """
@@ -247,15 +413,10 @@ class CppClass(CppLanguageElement):
             }
             """
             # check all properties for the consistency
-            self._sanity_check()
+            self._check()
             if self.documentation:
                 cpp(dedent(self.documentation))
-            with cpp.block(f'{self._render_static()}{self._render_virtual()}{self._render_constexpr()}{self._render_inline()}'
-                           f'{self._render_ret_type()} {self.fully_qualified_name()}({self.args()})'
-                           f'{self._render_const()}'
-                           f'{self._render_override()}'
-                           f'{self._render_final()}'
-                           f'{self._render_pure()}'):
+            with cpp.block(self._signatures().definition):
                 self.implementation(cpp)
 
         def render_to_string_declaration(self, cpp):
@@ -266,18 +427,13 @@ class CppClass(CppLanguageElement):
             int GetX() const;
             """
             # check all properties for the consistency
-            self._sanity_check()
+            self._check()
             if self.is_constexpr:
                 if self.documentation:
                     cpp(dedent(self.documentation))
                 self.render_to_string(cpp)
             else:
-                cpp(f'{self._render_static()}{self._render_virtual()}{self._render_inline()}'
-                    f'{self._render_ret_type()} {self.name}({self.args()})'
-                    f'{self._render_const()}'
-                    f'{self._render_override()}'
-                    f'{self._render_final()}'
-                    f'{self._render_pure()};')
+                cpp(self._signatures().declaration)
 
         def render_to_string_implementation(self, cpp):
             """
@@ -291,45 +447,18 @@ class CppClass(CppLanguageElement):
             Generates method body if self.implementation_handle property exists
             """
             # check all properties for the consistency
-            self._sanity_check()
+            self._check()
 
             if self.implementation_handle is None:
                 raise RuntimeError(f'No implementation handle for the method {self.name}')
 
             if self.documentation and not self.is_constexpr:
                 cpp(dedent(self.documentation))
-            with cpp.block(f'{self._render_virtual()}{self._render_constexpr()}{self._render_inline()}'
-                           f'{self._render_ret_type()} {self.fully_qualified_name()}({self.args()})'
-                           f'{self._render_const()}'
-                           f'{self._render_override()}'
-                           f'{self._render_final()}'
-                           f'{self._render_pure()}'):
+            with cpp.block(self._signatures().implementation):
                 self.implementation(cpp)
 
     def __init__(self, **properties):
-        self.is_struct = False
-        self.documentation = None
-        self.parent_class = None
-        input_property_names = set(properties.keys())
-        self.check_input_properties_names(input_property_names)
-        super(CppClass, self).__init__(properties)
-        self.init_class_properties(current_class_properties=self.availablePropertiesNames,
-                                   input_properties_dict=properties)
-
-        # aggregated classes
-        self.internal_class_elements = []
-
-        # class members
-        self.internal_variable_elements = []
-
-        # array class members
-        self.internal_array_elements = []
-
-        # class methods
-        self.internal_method_elements = []
-
-        # class enums
-        self.internal_enum_elements = []
+        self._init_properties(properties)
 
     def _parent_class(self):
         """
@@ -384,6 +513,284 @@ class CppClass(CppLanguageElement):
         method.is_method = True
         self.internal_method_elements.append(method)
 
+    ########################################
+    # MEMBERS LAYOUT
+    def _type_layouts(self):
+        """
+        @return: table of type layouts, DEFAULT_TYPE_LAYOUTS with the class type_layouts
+        """
+        return {**DEFAULT_TYPE_LAYOUTS, **self.type_layouts} if self.type_layouts else DEFAULT_TYPE_LAYOUTS
+
+    def _is_polymorphic(self):
+        """
+        @return: True if the class has virtual methods, so that objects contain pointer to virtual table
+        """
+        return any(getattr(method, 'is_virtual', False) or getattr(method, 'is_pure_virtual', False)
+                   for method in self.internal_method_elements)
+
+    def _variable_layout(self, variable, layouts):
+        """
+        @return: TypeLayout of the member variable, alignment property is taken into account
+        """
+        layout = type_layout(variable.type, layouts)
+        return TypeLayout(layout.size, max(layout.alignment, variable.alignment or 1))
+
+    def _layout_origin(self, layouts):
+        """
+        @return: list of TypeLayout preceding member variables: pointer to virtual table if any
+        @raise: ValueError if the class has a parent class
+        """
+        if self.parent_class:
+            raise ValueError(f'Layout of the class {self.name} depends on the parent class {self.parent_class}, '
+                             f'its size and member offsets could not be estimated')
+        return [type_layout('void*', layouts)] if self._is_polymorphic() else []
+
+    def layout_report(self):
+        """
+        Estimate the class size with members in the declaration and in the optimized order
+        @return: LayoutReport, see cpp_layout.py
+        @raise: ValueError if the class has a parent class or a member of unknown type layout
+        """
+        layouts = self._type_layouts()
+        origin = self._layout_origin(layouts)
+
+        def layout(variable):
+            return self._variable_layout(variable, layouts)
+
+        members = [variable for variable in self.internal_variable_elements if not variable.is_static]
+        ordered = optimal_order(members, layout)
+        original_size, alignment = struct_size(origin + [layout(variable) for variable in members])
+        optimized_size, _ = struct_size(origin + [layout(variable) for variable in ordered])
+        return LayoutReport(original_size, optimized_size, alignment, [variable.name for variable in ordered])
+
+    def _has_cache_line_groups(self):
+        """
+        @return: True if any non-static member variable belongs to a cache line group
+        """
+        return any(variable.cache_line_group is not None
+                   for variable in self.internal_variable_elements if not variable.is_static)
+
+    def _ordered_variables(self):
+        """
+        @return: member variables in the order of declaration
+        With optimize_layout static variables go first, then non-static ones ordered by alignment
+        """
+        if not self.optimize_layout:
+            return self.internal_variable_elements
+        layouts = self._type_layouts()
+        static_variables = [variable for variable in self.internal_variable_elements if variable.is_static]
+        members = [variable for variable in self.internal_variable_elements if not variable.is_static]
+        return static_variables + optimal_order(members, lambda variable: self._variable_layout(variable, layouts))
+
+    def _cache_line_segments(self, layouts):
+        """
+        @return: lists of non-static member variables placed to separate cache lines,
+        the members without a group go first
+        """
+        segments = {}
+        for variable in self.internal_variable_elements:
+            if not variable.is_static:
+                segments.setdefault(variable.cache_line_group, []).append(variable)
+        ungrouped = segments.pop(None, [])
+        segments = ([ungrouped] if ungrouped else []) + list(segments.values())
+        if self.optimize_layout:
+            segments = [optimal_order(segment, lambda variable: self._variable_layout(variable, layouts))
+                        for segment in segments]
+        return segments
+
+    def _declared_members(self):
+        """
+        @return: list of DeclaredMember, non-static member variables and paddings in the declaration order.
+        With parent_class offsets are relative to the first member of the class
+        @raise: ValueError if a member has unknown type layout or a name reserved for paddings
+        """
+        layouts = self._type_layouts()
+        reserved = [variable.name for variable in self.internal_variable_elements
+                    if variable.name.startswith(CACHE_LINE_PADDING_PREFIX)]
+        if reserved:
+            raise ValueError(f'Members {reserved} of the class {self.name} conflict with cache line paddings, '
+                             f'names starting with {CACHE_LINE_PADDING_PREFIX!r} are reserved')
+        # groups are aligned by the cache line, so their paddings do not depend on the parent class size
+        offset = 0 if self.parent_class else sum(layout.size for layout in self._layout_origin(layouts))
+        if not self._has_cache_line_groups():
+            segments = [[variable for variable in self._ordered_variables() if not variable.is_static]]
+            line_size = None
+        else:
+            segments = self._cache_line_segments(layouts)
+            line_size = self.cache_line_size or DEFAULT_CACHE_LINE_SIZE
+        members = []
+        for index, segment in enumerate(segments):
+            for variable in segment:
+                layout = self._variable_layout(variable, layouts)
+                alignment = None
+                if line_size and variable is segment[0] and variable.cache_line_group is not None:
+                    alignment = max(line_size, layout.alignment)
+                    layout = TypeLayout(layout.size, alignment)
+                offset = align_offset(offset, layout.alignment)
+                members.append(DeclaredMember(variable.name, variable, layout, offset, alignment))
+                offset += layout.size
+            padding = -offset % line_size if line_size else 0
+            if self.parent_class and segment[0].cache_line_group is None:
+                padding = 0
+            if padding:
+                members.append(DeclaredMember(f'{CACHE_LINE_PADDING_PREFIX}{index}', None, TypeLayout(padding, 1),
+                                              offset, None))
+                offset += padding
+        return members
+
+    def cache_line_report(self):
+        """
+        Estimate the resulting layout of the class, members are placed in the declaration order
+        @return: CacheLineReport, see cpp_layout.py
+        @raise: ValueError if the class has a parent class or a member of unknown type layout
+        """
+        layouts = self._type_layouts()
+        members = self._declared_members()
+        size, alignment = struct_size(self._layout_origin(layouts) + [member.layout for member in members])
+        line_size = self.cache_line_size or DEFAULT_CACHE_LINE_SIZE
+        return CacheLineReport(size, alignment, line_size,
+                               [MemberLayout(member.name, member.offset, member.layout.size, member.offset // line_size)
+                                for member in members])
+
+    ########################################
+    # STRUCT OF ARRAYS
+    def soa_companion(self, name=None):
+        """
+        Generate struct-of-arrays companion of the class: one std::vector per non-static member variable
+        with the same name, methods size(), capacity(), reserve(), resize(), clear(), push_back(),
+        get() and set() converting to and from the class objects, operator[] returning proxy structures
+        Reference/ConstReference of references to the columns items. Columns of bool members are std::vector<uint8_t>.
+        The generated code requires <vector> and <cstdint> headers, the class should be default-constructible and assignable
+        @param: name - name of the companion, '<name>Array' by default
+        @return: CppClass of the companion struct, placed to the same scope as the class
+        @raise: ValueError if a member name conflicts with the companion methods (see SOA_RESERVED_NAMES)
+        """
+        name = name or f'{self.name}Array'
+        members = [variable for variable in self.internal_variable_elements if not variable.is_static]
+        columns = tuple(variable.name for variable in members)
+        reserved = set(columns) & set(SOA_RESERVED_NAMES)
+        if reserved:
+            raise ValueError(f'Members {sorted(reserved)} of the class {self.name} conflict '
+                             f'with struct-of-arrays companion methods')
+        companion = CppClass(name=name, is_struct=True,
+                             documentation=f'/// Struct-of-arrays companion of {self.name}')
+        for proxy_name, qualifier in (('Reference', ''), ('ConstReference', ' const')):
+            proxy = CppClass(name=proxy_name, is_struct=True)
+            for variable in members:
+                proxy.add_variable(CppVariable(name=variable.name,
+                                               type=f'{soa_column_type(variable.type)}{qualifier}&'))
+            companion.add_internal_class(proxy)
+        for variable in members:
+            companion.add_variable(CppVariable(name=variable.name,
+                                               type=f'std::vector<{soa_column_type(variable.type)}>'))
+
+        def add_method(method_name, ret_type, handle, arguments=(), is_const=False):
+            method = CppClass.CppMethod(name=method_name, ret_type=ret_type, is_const=is_const,
+                                        implementation_handle=handle)
+            for argument in arguments:
+                method.add_argument(argument)
+            companion.add_method(method)
+
+        add_method('size', 'size_t', partial(_soa_size_body, columns=columns, method='size'), is_const=True)
+        add_method('capacity', 'size_t', partial(_soa_size_body, columns=columns, method='capacity'),
+                   is_const=True)
+        add_method('reserve', 'void', partial(_soa_columns_body, columns=columns,
+                                              statement='this->{column}.reserve(capacity);'), ['size_t capacity'])
+        add_method('resize', 'void', partial(_soa_columns_body, columns=columns,
+                                             statement='this->{column}.resize(size);'), ['size_t size'])
+        add_method('clear', 'void', partial(_soa_columns_body, columns=columns, statement='this->{column}.clear();'))
+        add_method('push_back', 'void', partial(_soa_columns_body, columns=columns,
+                                                statement='this->{column}.push_back(value.{column});'),
+                   [f'const {self.name}& value'])
+        add_method('get', self.name, partial(_soa_get_body, columns=columns, value_type=self.name),
+                   ['size_t index'], is_const=True)
+        add_method('set', 'void', partial(_soa_columns_body, columns=columns,
+                                          statement='this->{column}[index] = value.{column};'),
+                   ['size_t index', f'const {self.name}& value'])
+        add_method('operator[]', f'{name}::Reference', partial(_soa_reference_body, columns=columns),
+                   ['size_t index'])
+        add_method('operator[]', f'{name}::ConstReference', partial(_soa_reference_body, columns=columns),
+                   ['size_t index'], is_const=True)
+        return companion
+
+    ########################################
+    # SERIALIZATION
+    def _serialization_kind(self, variable, layouts):
+        """
+        @return: 'copy' for trivially copyable types (found in the type layouts table),
+        'string' for std::string, 'nested' for other types having serialization methods
+        @raise: ValueError for pointers and references
+        """
+        stored_type = storage_type(variable.type)
+        if stored_type.endswith(('*', '&')):
+            raise ValueError(f'Member {variable.name} of the class {self.name} could not be serialized')
+        if stored_type in ('string', 'std::string'):
+            return 'string'
+        try:
+            type_layout(stored_type, layouts)
+        except ValueError:
+            return 'nested'
+        return 'copy'
+
+    def serialized_runs(self):
+        """
+        Split non-static member variables in the declaration order to serialized runs.
+        Adjacent trivially copyable members are copied by a single memcpy, if no padding could be
+        between them: the offset of every member in the run is aligned by its type
+        whenever the first member is aligned (see cpp_layout.py)
+        @return: list of SerializedRun
+        """
+        layouts = self._type_layouts()
+        if self._has_cache_line_groups():
+            members = [(member.variable, member.layout) for member in self._declared_members()
+                       if member.variable is not None]
+        else:
+            members = [(variable, None) for variable in self._ordered_variables() if not variable.is_static]
+        runs = []
+        run_alignment = position = 0
+        for variable, layout in members:
+            kind = self._serialization_kind(variable, layouts)
+            if kind == 'copy':
+                layout = layout or self._variable_layout(variable, layouts)
+                if (runs and runs[-1].kind == 'copy' and layout.alignment <= run_alignment
+                        and position % layout.alignment == 0):
+                    runs[-1].names.append(variable.name)
+                    position += layout.size
+                    continue
+                run_alignment, position = layout.alignment, layout.size
+            runs.append(SerializedRun(kind, [variable.name]))
+        return runs
+
+    def add_serialization_methods(self):
+        """
+        Add methods of binary serialization of non-static member variables:
+        size_t serialized_size() const - size of the serialized data in bytes
+        size_t serialize(uint8_t* data) const - write the data, return the number of bytes written
+        size_t deserialize(const uint8_t* data) - read the data, return the number of bytes read
+        Runs of trivially copyable members (types of the type layouts table) are copied by a single memcpy,
+        std::string is written as uint32_t length and characters, members of other types
+        should have the same methods. The data is in the native byte order.
+        Member arrays are static, so they are not serialized.
+        Methods are rendered from the members at rendering time,
+        the generated code requires <cstddef>, <cstdint> and <cstring> headers
+        """
+        methods = (('serialized_size', _serialized_size_body, (), True),
+                   ('serialize', _serialize_body, ('uint8_t* data',), True),
+                   ('deserialize', _deserialize_body, ('const uint8_t* data',), False))
+        for method_name, body, arguments, is_const in methods:
+            method = CppClass.CppMethod(name=method_name, ret_type='size_t', is_const=is_const,
+                                        implementation_handle=partial(body, element=self))
+            for argument in arguments:
+                method.add_argument(argument)
+            self.add_method(method)
+
+    def _render_size_assertion(self, cpp):
+        """
+        Generates static_assert of the estimated class size
+        """
+        name = self.fully_qualified_name()
+        cpp(f'static_assert(sizeof({name}) == {self.cache_line_report().size}, "Unexpected size of {name}");')
+
     ########################################
     # RENDER CLASS MEMBERS
     def _render_internal_classes_declaration(self, cpp):
@@ -409,9 +816,22 @@ class CppClass(CppLanguageElement):
         """
         Render to string all contained variable class members
         Method is protected as it is used by CppClass only
+        With cache line groups static variables go first, then non-static ones with paddings
         """
+        if not self._has_cache_line_groups():
+            for varItem in self._ordered_variables():
+                varItem.declaration().render_to_string(cpp)
+                cpp.newline()
+            return
         for varItem in self.internal_variable_elements:
-            varItem.declaration().render_to_string(cpp)
+            if varItem.is_static:
+                varItem.declaration().render_to_string(cpp)
+                cpp.newline()
+        for member in self._declared_members():
+            if member.variable is None:
+                cpp(f'char {member.name}[{member.layout.size}];')
+            else:
+                member.variable.render_to_string_declaration(cpp, member.alignment)
             cpp.newline()
 
     def _render_array_declaration(self, cpp):
@@ -506,7 +926,7 @@ class CppClass(CppLanguageElement):
         if self.documentation:
             cpp(dedent(self.documentation))
 
-        with cpp.block(f'{self._render_class_type()} {self.name} {self.inherits()}', postfix=';'):
+        with cpp.block(self.declaration_head(), postfix=';'):
 
             # in case of struct all members meant to be public
             if not self.is_struct:
@@ -518,13 +938,27 @@ class CppClass(CppLanguageElement):
             if not self.is_struct:
                 cpp.label('private')
             self.private_class_members(cpp)
+        self.render_declaration_tail(cpp)
 
-    def _render_class_type(self):
+    def class_keyword(self):
         """
         @return: 'class' or 'struct' keyword
         """
         return 'struct' if self.is_struct else 'class'
 
+    def declaration_head(self):
+        """
+        @return: text opening the class declaration block, e.g. 'class Derived  : public Base'
+        """
+        return f'{self.class_keyword()} {self.name} {self.inherits()}'
+
+    def render_declaration_tail(self, cpp):
+        """
+        Generates code following the class declaration block: static_assert of the class size if assert_size is set
+        """
+        if self.assert_size:
+            self._render_size_assertion(cpp)
+
     def render_to_string_implementation(self, cpp):
         """
         Render to string class definition.
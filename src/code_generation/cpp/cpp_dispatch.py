@@ -0,0 +1,281 @@
+import re
+import array
+from functools import partial
+from textwrap import dedent
+
+from code_generation.cpp.cpp_generator import CppLanguageElement, element_slots
+from code_generation.cpp.cpp_array import CppArray
+from code_generation.cpp.cpp_function import CppFunction
+
+__doc__ = """Dispatch of integer keys to code snippets.
+CppDispatch generates a function executing one of the bodies selected by the key argument.
+Emission strategy is chosen by the number of keys and their density (number of keys / range of keys):
+- 'switch' - switch statement, for a few keys;
+- 'jump_table' - array of pointers to the handler functions indexed by the key, for dense keys;
+- 'binary_search' - binary search in the sorted array of keys, for many sparse keys.
+With 'jump_table' and 'binary_search' every body becomes a separate handler function
+with the same arguments, generated in the anonymous namespace before the dispatch function.
+Keys of binary search are stored in the narrowest integer type, they are compared with the key argument
+as int64_t, so that the signedness of the types does not matter.
+Functions returning a value require default_body, as unknown keys must return something.
+
+Example:
+# Python code
+dispatch = CppDispatch(name='Handle', ret_type='int', default_body='return -1;')
+dispatch.add_argument('int id')
+dispatch.add_argument('const Message& message')
+dispatch.add_cases({1: 'return OnLogin(message);', 2: 'return OnLogout(message);'})
+dispatch.render_to_string(cpp)
+"""
+
+# Dispatch strategies, see CppDispatch.strategy
+DISPATCH_STRATEGIES = ('auto', 'switch', 'jump_table', 'binary_search')
+
+# Minimal number of keys to use a table instead of switch
+MIN_TABLE_KEYS = 8
+
+# Minimal density of keys for jump table
+MIN_JUMP_TABLE_DENSITY = 0.5
+
+# Minimal number of sparse keys for binary search
+MIN_BINARY_SEARCH_KEYS = 64
+
+
+def choose_strategy(keys):
+    """
+    @param: keys - sorted list of integer keys
+    @return: the best dispatch strategy for the keys
+    """
+    if len(keys) < MIN_TABLE_KEYS:
+        return 'switch'
+    if len(keys) / (keys[-1] - keys[0] + 1) >= MIN_JUMP_TABLE_DENSITY:
+        return 'jump_table'
+    if len(keys) >= MIN_BINARY_SEARCH_KEYS:
+        return 'binary_search'
+    return 'switch'
+
+
+def argument_name(argument):
+    """
+    @param: argument - C++ function argument, e.g. 'const string& s' or 'size_t sz = 10'
+    @return: name of the argument, e.g. 's' or 'sz'
+    """
+    match = re.search(r'(\w+)\s*(\[[^\]]*\]\s*)*$', argument.split('=')[0])
+    if match is None:
+        raise ValueError(f'Could not find the name of the argument {argument!r}')
+    return match.group(1)
+
+
+def _render_body(element, cpp, body):
+    """
+    Render the body: code snippet or a function receiving the element and C++ code generator handle
+    """
+    if body is None:
+        return
+    if callable(body):
+        body(element, cpp)
+        return
+    for line in dedent(str(body)).strip('\n').splitlines():
+        cpp(line)
+
+
+class CppDispatch(CppFunction):
+    """
+    The Python class that generates C++ function dispatching integer key to code snippets, see module description
+    Available properties (besides CppFunction ones, implementation_handle is not used):
+    key_name - string, name of the integer key argument, the first argument by default
+    default_body - code snippet (or handle) executed for unknown keys
+    strategy - string, 'auto' (default), 'switch', 'jump_table' or 'binary_search'
+    Bodies are code snippets, multiline strings are dedented, or functions receiving
+    'self' and C++ code generator handle, the same as implementation_handle
+    """
+    availablePropertiesNames = {'key_name',
+                                'default_body',
+                                'strategy'} | CppFunction.availablePropertiesNames
+    # (key, body) pairs
+    containerNames = CppFunction.containerNames + ('cases',)
+    trackedPropertiesNames = availablePropertiesNames - CppLanguageElement.availablePropertiesNames
+    __slots__ = element_slots(availablePropertiesNames, CppFunction, 'cases', tracked=trackedPropertiesNames)
+
+    def __init__(self, **properties):
+        self._init_properties(properties)
+
+    def add_case(self, key, body):
+        """
+        @param: key - integer key
+        @param: body - code snippet or handle
+        """
+        self.cases.append((int(key), body))
+        self.invalidate_render_cache()
+
+    def add_cases(self, mapping):
+        """
+        @param: mapping - dict or iterable of (key, body) pairs
+        """
+        pairs = mapping.items() if hasattr(mapping, 'items') else mapping
+        self.cases.extend((int(key), body) for key, body in pairs)
+        self.invalidate_render_cache()
+
+    def _sorted_cases(self):
+        """
+        @return: cases sorted by keys
+        @raise: ValueError if keys are not unique
+        """
+        cases = sorted(self.cases, key=lambda case: case[0])
+        for (key, _), (next_key, _) in zip(cases, cases[1:]):
+            if key == next_key:
+                raise ValueError(f'Duplicate key {key} of dispatch {self.name}')
+        return cases
+
+    def _sanity_check(self):
+        """
+        @raise: ValueError if table strategy is used without cases, or the function returning
+        a value has no default body
+        """
+        super()._sanity_check()
+        strategy = self.dispatch_strategy()
+        if strategy != 'switch' and not self.cases:
+            raise ValueError(f'Dispatch {self.name} with {strategy!r} strategy has no cases')
+        if self.default_body is None and (self.ret_type or 'void').strip() != 'void':
+            raise ValueError(f'Dispatch {self.name} returning {self.ret_type} must have default_body '
+                             f'executed for unknown keys')
+
+    def dispatch_strategy(self):
+        """
+        @return: strategy used for rendering
+        """
+        strategy = self.strategy or 'auto'
+        if strategy not in DISPATCH_STRATEGIES:
+            raise ValueError(f'Unknown strategy {strategy!r} of dispatch {self.name}, '
+                             f'expected one of {DISPATCH_STRATEGIES}')
+        if strategy == 'auto':
+            cases = self._sorted_cases()
+            return choose_strategy([key for key, _ in cases]) if cases else 'switch'
+        return strategy
+
+    def key_argument(self):
+        """
+        @return: name of the key argument
+        """
+        if self.key_name:
+            return self.key_name
+        if not self.arguments:
+            raise RuntimeError(f'Dispatch {self.name} has no key argument')
+        return argument_name(self.arguments[0])
+
+    def _handler_name(self, index):
+        """
+        @return: name of the handler function of the case
+        """
+        return f'{self.name}_case_{index}' if index is not None else f'{self.name}_default'
+
+    def _handler_call(self, function_name):
+        """
+        @return: statement calling the handler with all arguments of the dispatch function
+        """
+        arguments = ', '.join(argument_name(argument) for argument in self.arguments)
+        return f'return {function_name}({arguments});'
+
+    def _handlers(self, cases):
+        """
+        @return: list of CppFunction elements of the cases handlers, the default handler is the last one
+        """
+        handlers = []
+        for index, (_, body) in enumerate(cases + [(None, self.default_body)]):
+            handler = CppFunction(name=self._handler_name(index if index < len(cases) else None),
+                                  ret_type=self.ret_type,
+                                  implementation_handle=partial(_render_body, body=body))
+            for argument in self.arguments:
+                handler.add_argument(argument.split('=')[0].strip())
+            handlers.append(handler)
+        return handlers
+
+    def _render_handlers(self, cpp, strategy, cases):
+        """
+        Render handler functions and dispatch tables in the anonymous namespace
+        """
+        if strategy == 'switch':
+            return
+        with cpp.block('namespace'):
+            for handler in self._handlers(cases):
+                handler.render_to_string(cpp)
+            argument_types = ', '.join(argument.split('=')[0].strip() for argument in self.arguments)
+            cpp(f'typedef {self.ret_type} (*{self.name}_handler)({argument_types});')
+            handlers = CppArray(name=f'{self.name}_handlers', type=f'{self.name}_handler', is_const=True,
+                                newline_align=True, items_per_line=4)
+            if strategy == 'jump_table':
+                first_key = cases[0][0]
+                indices = {key - first_key: index for index, (key, _) in enumerate(cases)}
+                handlers.add_array_items([self._handler_name(indices.get(offset))
+                                          for offset in range(cases[-1][0] - first_key + 1)])
+            else:
+                keys = CppArray(name=f'{self.name}_keys', is_const=True, auto_type=True,
+                                newline_align=True, items_per_line=16)
+                keys.add_array_items(array.array('q', [key for key, _ in cases]))
+                keys.render_to_string(cpp)
+                handlers.add_array_items([self._handler_name(index) for index in range(len(cases))])
+            handlers.render_to_string(cpp)
+        cpp.newline()
+
+    def _render_switch(self, cpp, cases):
+        """
+        Render switch statement with the bodies
+        """
+        with cpp.block(f'switch ({self.key_argument()})'):
+            for key, body in cases:
+                with cpp.block(f'case {key}:'):
+                    _render_body(self, cpp, body)
+                    cpp('break;')
+            with cpp.block('default:'):
+                _render_body(self, cpp, self.default_body)
+                cpp('break;')
+
+    def implementation(self, cpp):
+        """
+        Render the body of the dispatch function according to the strategy
+        """
+        strategy = self.dispatch_strategy()
+        cases = self._sorted_cases()
+        key = self.key_argument()
+        if strategy == 'switch':
+            self._render_switch(cpp, cases)
+        elif not cases:
+            cpp(self._handler_call(self._handler_name(None)))
+        elif strategy == 'jump_table':
+            first_key, last_key = cases[0][0], cases[-1][0]
+            cpp(f'if ({key} < {first_key} || {key} > {last_key})')
+            cpp(self._handler_call(self._handler_name(None)), 1)
+            index = f'{key} - {first_key}' if first_key else key
+            cpp(self._handler_call(f'{self.name}_handlers[{index}]'))
+        else:
+            key = f'static_cast<int64_t>({key})'
+            cpp('size_t low = 0;')
+            cpp(f'size_t high = {len(cases)};')
+            with cpp.block('while (low < high)'):
+                cpp('const size_t middle = low + (high - low) / 2;')
+                cpp(f'if (static_cast<int64_t>({self.name}_keys[middle]) < {key})')
+                cpp('low = middle + 1;', 1)
+                cpp('else')
+                cpp('high = middle;', 1)
+            cpp(f'if (low < {len(cases)} && static_cast<int64_t>({self.name}_keys[low]) == {key})')
+            cpp(self._handler_call(f'{self.name}_handlers[low]'), 1)
+            cpp(self._handler_call(self._handler_name(None)))
+
+    def render_to_string(self, cpp):
+        """
+        Generates handlers (if required by the strategy) and the dispatch function
+        """
+        self._check()
+        self._render_handlers(cpp, self.dispatch_strategy(), self._sorted_cases())
+        super().render_to_string(cpp)
+
+    def render_to_string_implementation(self, cpp):
+        """
+        Generates handlers (if required by the strategy) and the dispatch function implementation
+        """
+        self._check()
+        self._render_handlers(cpp, self.dispatch_strategy(), self._sorted_cases())
+        if self.documentation:
+            cpp(dedent(self.documentation))
+        with cpp.block(self._signatures().implementation):
+            self.implementation(cpp)
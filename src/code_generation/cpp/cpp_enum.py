@@ -1,4 +1,10 @@
-from code_generation.cpp.cpp_generator import CppLanguageElement
+import array
+from functools import partial
+
+from code_generation.cpp.cpp_generator import CppLanguageElement, CppDeclaration, CppImplementation, element_slots
+from code_generation.cpp.cpp_array import CppArray
+from code_generation.cpp.cpp_function import CppFunction
+from code_generation.cpp.cpp_perfect_hash import CppPerfectHash
 
 __doc__ = """The module encapsulates C++ code generation logics for main C++ language primitives:
 classes, methods and functions, variables, enums.
@@ -53,6 +59,93 @@ cpp.newline(2)
 For detailed information see code_generator.py documentation.
 """
 
+# Methods of the name lookup in the generated from_string function, see CppEnum.from_string_method
+FROM_STRING_METHODS = ('perfect_hash', 'binary_search')
+
+
+def _packed_names(names):
+    """
+    @param: names - list of bytes
+    @return: (blob, offsets) - names separated by NUL, offsets of every name and the end of the blob
+    """
+    offsets = array.array('q', [0])
+    for name in names:
+        offsets.append(offsets[-1] + len(name) + 1)
+    return b'\0'.join(names), offsets
+
+
+def _name_tables(names, offsets_alias):
+    """
+    @return: function-local static CppArray elements of the packed names and their offsets
+    """
+    blob, offsets = _packed_names(names)
+    names_table = CppArray(name='names', type='char', is_static=True, is_const=True,
+                           literal_encoding=True, items_per_line=64)
+    names_table.add_array_items(blob)
+    offsets_table = CppArray(name='offsets', is_static=True, is_const=True, auto_type=True,
+                             type_alias=offsets_alias, newline_align=True, items_per_line=16)
+    offsets_table.add_array_items(offsets)
+    return names_table, offsets_table
+
+
+def _to_string_body(_, cpp, element):
+    """
+    Implementation of to_string function: names are packed into a single string
+    """
+    names = element.item_names()
+    if names:
+        for table in _name_tables(names, 'offset_type'):
+            table.render_to_string(cpp)
+    cpp('const size_t index = static_cast<size_t>(value);')
+    cpp(f'if (index >= {len(names)})')
+    cpp('return "";', 1)
+    cpp('return names + offsets[index];' if names else 'return "";')
+
+
+def _from_string_body(_, cpp, element):
+    """
+    Implementation of from_string function with binary search of the name in the sorted packed names
+    """
+    enum_type = element.fully_qualified_name()
+    order = sorted(range(len(element.enum_items)), key=element.item_names().__getitem__)
+    if not order:
+        cpp('return false;')
+        return
+    for table in _name_tables([element.item_names()[index] for index in order], 'offset_type'):
+        table.render_to_string(cpp)
+    values = CppArray(name='values', is_static=True, is_const=True, auto_type=True, type_alias='value_type',
+                      newline_align=True, items_per_line=16)
+    values.add_array_items(array.array('q', order))
+    values.render_to_string(cpp)
+    cpp('size_t low = 0;')
+    cpp(f'size_t high = {len(order)};')
+    with cpp.block('while (low < high)'):
+        cpp('const size_t middle = low + (high - low) / 2;')
+        cpp('const size_t candidate_length = offsets[middle + 1] - offsets[middle] - 1;')
+        cpp('int result = std::memcmp(names + offsets[middle], name, '
+            'candidate_length < length ? candidate_length : length);')
+        cpp('if (result == 0)')
+        cpp('result = candidate_length < length ? -1 : (candidate_length > length ? 1 : 0);', 1)
+        with cpp.block('if (result == 0)'):
+            cpp(f'value = static_cast<{enum_type}>(values[middle]);')
+            cpp('return true;')
+        cpp('if (result < 0)')
+        cpp('low = middle + 1;', 1)
+        cpp('else')
+        cpp('high = middle;', 1)
+    cpp('return false;')
+
+
+def _from_string_hash_body(_, cpp, element):
+    """
+    Implementation of from_string function calling the perfect hash lookup
+    """
+    cpp(f'const int index = {element.name}Index(name, length);')
+    cpp('if (index < 0)')
+    cpp('return false;', 1)
+    cpp(f'value = static_cast<{element.fully_qualified_name()}>(index);')
+    cpp('return true;')
+
 
 class CppEnum(CppLanguageElement):
     """
@@ -62,6 +155,17 @@ class CppEnum(CppLanguageElement):
     Available properties:
     prefix - string, prefix added to every enum element, 'e' by default ('eItem1')
     add_counter - boolean, terminating value that shows count of enum elements added, 'True' by default.
+    add_to_string - boolean, generate 'const char* <name>ToString(<name> value)' function
+        returning the item name without prefix (e.g. "Chair"), or empty string for unknown values.
+        Names are packed into a single string, the function looks up offset of the name in the table
+    add_from_string - boolean, generate 'bool <name>FromString(const char* name, size_t length, <name>& value)'
+        function converting the item name without prefix to the value, returns false for unknown names
+    from_string_method - string, name lookup of from_string function: 'binary_search' in sorted packed names
+        (default), or 'perfect_hash', see cpp_perfect_hash.py. If the perfect hash could not be built,
+        binary search is used
+    Conversion functions are generated for namespace-level enums only, they require
+    <cstddef>, <cstdint> and <cstring> headers. Use declaration() to render the enum
+    with functions declarations (e.g. to the header), definition() to render functions implementation
 
     Example of usage:
     # Python code
@@ -80,20 +184,18 @@ class CppEnum(CppLanguageElement):
     """
     availablePropertiesNames = {'prefix',
                                 'enum_class',
-                                'add_counter'} | CppLanguageElement.availablePropertiesNames
+                                'add_counter',
+                                'add_to_string',
+                                'add_from_string',
+                                'from_string_method'} | CppLanguageElement.availablePropertiesNames
+    defaultPropertiesValues = {'enum_class': False,
+                               'from_string_method': 'binary_search'}
+    # place enum items here
+    containerNames = ('enum_items',)
+    __slots__ = element_slots(availablePropertiesNames, CppLanguageElement, *containerNames)
 
     def __init__(self, **properties):
-        self.enum_class = False
-        # check properties
-        input_property_names = set(properties.keys())
-        self.check_input_properties_names(input_property_names)
-        super(CppEnum, self).__init__(properties)
-
-        self.init_class_properties(current_class_properties=self.availablePropertiesNames,
-                                   input_properties_dict=properties)
-
-        # place enum items here
-        self.enum_items = []
+        self._init_properties(properties)
 
     def _render_class(self):
         return 'class ' if self.enum_class else ''
@@ -110,8 +212,94 @@ class CppEnum(CppLanguageElement):
         """
         self.enum_items.extend(items)
 
-    # noinspection PyUnresolvedReferences
+    def item_names(self):
+        """
+        @return: list of the items names as bytes, as returned by the generated to_string function
+        """
+        return [str(item).encode('utf-8') for item in self.enum_items]
+
+    def _perfect_hash_index(self):
+        """
+        @return: CppPerfectHash of the items indices, None if there are no items or the perfect hash could not be built
+        """
+        if not self.enum_items:
+            return None
+        index = CppPerfectHash(name=f'{self.name}Index', value_type='int', default_value='-1')
+        index.add_items(zip(self.item_names(), range(len(self.enum_items))))
+        try:
+            index.tables()
+        except ValueError:
+            return None
+        return index
+
+    def _conversion_functions(self):
+        """
+        @return: list of elements rendering name conversion functions
+        """
+        functions = []
+        if not (self.add_to_string or self.add_from_string):
+            return functions
+        if isinstance(self.ref_to_parent, CppLanguageElement):
+            raise RuntimeError(f'Name conversion functions of the nested enum {self.name} are not supported')
+        if self.add_to_string:
+            to_string = CppFunction(name=f'{self.name}ToString', ret_type='const char*',
+                                    implementation_handle=partial(_to_string_body, element=self))
+            to_string.add_argument(f'{self.name} value')
+            functions.append(to_string)
+        if self.add_from_string:
+            method = self.from_string_method or 'binary_search'
+            if method not in FROM_STRING_METHODS:
+                raise ValueError(f'Unknown from_string method {method!r} of enum {self.name}, '
+                                 f'expected one of {FROM_STRING_METHODS}')
+            index = self._perfect_hash_index() if method == 'perfect_hash' else None
+            if index is not None:
+                functions.append(index)
+                body = partial(_from_string_hash_body, element=self)
+            else:
+                body = partial(_from_string_body, element=self)
+            from_string = CppFunction(name=f'{self.name}FromString', ret_type='bool', implementation_handle=body)
+            for argument in ('const char* name', 'size_t length', f'{self.name}& value'):
+                from_string.add_argument(argument)
+            functions.append(from_string)
+        return functions
+
+    def declaration(self):
+        """
+        @return: CppDeclaration wrapper rendering the enum and declarations of name conversion functions
+        """
+        return CppDeclaration(self)
+
+    def definition(self):
+        """
+        @return: CppImplementation wrapper rendering implementation of name conversion functions
+        """
+        return CppImplementation(self)
+
+    def render_to_string_declaration(self, cpp):
+        """
+        Generates the enum and declarations of name conversion functions
+        """
+        self._render_enum(cpp)
+        for function in self._conversion_functions():
+            if isinstance(function, CppFunction):
+                function.render_to_string_declaration(cpp)
+
+    def render_to_string_implementation(self, cpp):
+        """
+        Generates implementation of name conversion functions
+        """
+        for function in self._conversion_functions():
+            function.render_to_string(cpp)
+
     def render_to_string(self, cpp):
+        """
+        Generates the enum and name conversion functions, if required
+        """
+        self._render_enum(cpp)
+        self.render_to_string_implementation(cpp)
+
+    # noinspection PyUnresolvedReferences
+    def _render_enum(self, cpp):
         """
         Generates a string representation for the enum
         It always contains a terminating value that shows count of enum elements
@@ -1,7 +1,15 @@
-from code_generation.cpp.cpp_generator import CppLanguageElement, CppDeclaration, CppImplementation
+from code_generation.cpp.cpp_generator import CppLanguageElement, CppDeclaration, CppImplementation, element_slots
+from collections import namedtuple
 from textwrap import dedent
 
 
+# Rendered signatures of the function or method:
+# definition - complete definition header (render_to_string)
+# declaration - declaration terminated by ';' (render_to_string_declaration)
+# implementation - implementation header (render_to_string_implementation)
+FunctionSignatures = namedtuple('FunctionSignatures', ['definition', 'declaration', 'implementation'])
+
+
 class CppFunction(CppLanguageElement):
     """
     The Python class that generates string representation for C++ function (not method!)
@@ -30,22 +38,36 @@ class CppFunction(CppLanguageElement):
                                 'is_constexpr',
                                 'implementation_handle',
                                 'documentation'} | CppLanguageElement.availablePropertiesNames
+    defaultPropertiesValues = {'is_constexpr': False}
+    # arguments are plain strings
+    # e.g. 'int* a', 'const string& s', 'size_t sz = 10'
+    containerNames = ('arguments',)
+    # signatures are cached until any of these properties is changed
+    trackedPropertiesNames = availablePropertiesNames - CppLanguageElement.availablePropertiesNames
+    # 'is_method' is set by CppClass.add_method()
+    __slots__ = element_slots(availablePropertiesNames, CppLanguageElement, *containerNames, 'is_method',
+                              tracked=trackedPropertiesNames)
 
     def __init__(self, **properties):
-        # arguments are plain strings
-        # e.g. 'int* a', 'const string& s', 'size_t sz = 10'
-        self.arguments = []
-        self.ret_type = None
-        self.implementation_handle = None
-        self.documentation = None
-        self.is_constexpr = False
-
-        # check properties
-        input_property_names = set(properties.keys())
-        self.check_input_properties_names(input_property_names)
-        super(CppFunction, self).__init__(properties)
-        self.init_class_properties(current_class_properties=self.availablePropertiesNames,
-                                   input_properties_dict=properties)
+        self._init_properties(properties)
+
+    def _render_signatures(self):
+        """
+        @return: FunctionSignatures, all signatures of the function are the same
+        """
+        definition = f'{self._render_constexpr()}{self.ret_type} {self.name}({self.args()})'
+        return FunctionSignatures(definition, f'{definition};', definition)
+
+    def _signatures(self):
+        """
+        @return: FunctionSignatures, rendered once and cached until a property is changed or an argument is added
+        """
+        cache = self.render_cache()
+        signatures = cache.get('signatures')
+        if signatures is None or cache['arguments'] != self.arguments:
+            signatures = cache['signatures'] = self._render_signatures()
+            cache['arguments'] = list(self.arguments)
+        return signatures
 
     def _sanity_check(self):
         """
@@ -72,6 +94,7 @@ class CppFunction(CppLanguageElement):
         @param: argument string representation of the C++ function argument ('int a', 'void p = NULL' etc)
         """
         self.arguments.append(argument)
+        self.invalidate_render_cache()
 
     def implementation(self, cpp):
         """
@@ -103,10 +126,10 @@ class CppFunction(CppLanguageElement):
         }
         """
         # check all properties for the consistency
-        self._sanity_check()
+        self._check()
         if self.documentation:
             cpp(dedent(self.documentation))
-        with cpp.block(f'{self._render_constexpr()}{self.ret_type} {self.name}({self.args()})'):
+        with cpp.block(self._signatures().definition):
             self.implementation(cpp)
 
     def render_to_string_declaration(self, cpp):
@@ -122,7 +145,7 @@ class CppFunction(CppLanguageElement):
                 cpp(dedent(self.documentation))
             self.render_to_string(cpp)
         else:
-            cpp(f'{self._render_constexpr()}{self.ret_type} {self.name}({self.args()});')
+            cpp(self._signatures().declaration)
 
     def render_to_string_implementation(self, cpp):
         """
@@ -141,5 +164,5 @@ class CppFunction(CppLanguageElement):
         # check all properties for the consistency
         if self.documentation and not self.is_constexpr:
             cpp(dedent(self.documentation))
-        with cpp.block(f'{self._render_constexpr()}{self.ret_type} {self.name}({self.args()})'):
+        with cpp.block(self._signatures().implementation):
             self.implementation(cpp)
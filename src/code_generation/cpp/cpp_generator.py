@@ -1,3 +1,9 @@
+import threading
+import warnings
+from collections import deque
+from itertools import chain, repeat
+from operator import attrgetter
+
 __doc__ = """The module encapsulates C++ code generation logics for main C++ language primitives:
 classes, methods and functions, variables, enums.
 Every C++ element could render its current state to a string that could be evaluated as 
@@ -52,6 +58,132 @@ For detailed information see code_generator.py documentation.
 """
 
 
+# Incremented on every change of an element name or parent,
+# qualified names cached before the change are considered outdated.
+# Invalidation is coarse: a change of any element drops the caches of all elements,
+# renaming is expected to be rare compared to rendering
+_structure_epoch = 0
+
+# Guards _structure_epoch increments, elements could be changed by several rendering threads
+_structure_lock = threading.Lock()
+
+
+def _structure_property(storage_name):
+    """
+    Property affecting qualified names of the element and its children (name, ref_to_parent)
+    Reading is as fast as reading a slot, setting invalidates all cached qualified names
+    @param: storage_name - slot storing the property value
+    """
+    def setter(self, value):
+        global _structure_epoch
+        with _structure_lock:
+            setattr(self, storage_name, value)
+            _structure_epoch += 1
+
+    return property(attrgetter(storage_name), setter)
+
+
+def _tracked_property(storage_name):
+    """
+    Property affecting rendered output of the element (see CppLanguageElement.render_cache())
+    Reading is as fast as reading a slot, setting drops the element render cache
+    @param: storage_name - slot storing the property value
+    """
+    def setter(self, value):
+        setattr(self, storage_name, value)
+        self._render_cache = None
+
+    return property(attrgetter(storage_name), setter)
+
+
+def _flag_property(bit):
+    """
+    Boolean property stored as a bit of the element '_flags' slot (see is_flag_property())
+    Setting drops the element render cache, as for the tracked properties
+    @param: bit - mask of the property bit
+    """
+    def getter(self):
+        return bool(self._flags & bit)
+
+    def setter(self, value):
+        self._flags = self._flags | bit if value else self._flags & ~bit
+        self._render_cache = None
+
+    return property(getter, setter)
+
+
+# Validation policies of the element sanity checks, see CppLanguageElement.set_validation_policy()
+# check properties consistency on every rendering
+VALIDATE_ALWAYS = 'always'
+# check once, check again only after the element is changed
+VALIDATE_ON_CHANGE = 'on_change'
+# never check
+VALIDATE_NEVER = 'never'
+
+VALIDATION_POLICIES = (VALIDATE_ALWAYS, VALIDATE_ON_CHANGE, VALIDATE_NEVER)
+
+
+def flag_rules_table(flag_names, rules):
+    """
+    Precompute error messages for all combinations of boolean properties,
+    so that the combination is checked by a single table lookup
+    @param: flag_names - names of boolean properties, i-th property is i-th bit of the mask
+    @param: rules - sequence of (required, forbidden, message) tuples, where required and forbidden
+    are sets of property names. Combination violates the rule if all required properties are set
+    and none of forbidden ones. Messages are formatted with the element name
+    @return: list of error messages (first violated rule) or None, indexed by mask
+    """
+    bits = {name: 1 << i for i, name in enumerate(flag_names)}
+    compiled_rules = [(sum(bits[name] for name in required), sum(bits[name] for name in forbidden), message)
+                      for required, forbidden, message in rules]
+    return [next((message for required, forbidden, message in compiled_rules
+                  if mask & required == required and not mask & forbidden), None)
+            for mask in range(1 << len(flag_names))]
+
+
+def flags_mask(element, flag_names):
+    """
+    @return: bit mask of the element boolean properties, see flag_rules_table()
+    """
+    mask = 0
+    for i, name in enumerate(flag_names):
+        if getattr(element, name):
+            mask |= 1 << i
+    return mask
+
+
+def storage_name(property_name):
+    """
+    @return: name of the slot storing value of the tracked property
+    """
+    return f'_{property_name}'
+
+
+def is_flag_property(property_name):
+    """
+    @return: True for the boolean properties with 'is_' prefix (e.g. is_static),
+    all of them are packed to the single '_flags' slot of the element
+    """
+    return property_name.startswith('is_')
+
+
+def element_slots(property_names, base_class, *attributes, tracked=()):
+    """
+    Generate __slots__ for the C++ element class, so that elements do not carry per-instance __dict__
+    @param: property_names - availablePropertiesNames of the class
+    @param: base_class - direct base class, its slots are not repeated
+    @param: attributes - additional instance attributes (e.g. lists of child elements)
+    @param: tracked - trackedPropertiesNames of the class, stored in the slots with '_' prefix
+    Boolean flags (see is_flag_property()) do not have their own slots
+    @return: tuple of slot names
+    """
+    inherited = {slot for cls in base_class.__mro__ for slot in getattr(cls, '__slots__', ())}
+    inherited.update(getattr(base_class, 'storageNames', ()))
+    names = {name for name in property_names if not is_flag_property(name)}.union(attributes)
+    names = {storage_name(name) if name in tracked else name for name in names}
+    return tuple(sorted(names - inherited))
+
+
 ###########################################################################
 # declaration/Implementation helpers
 class CppDeclaration(object):
@@ -70,6 +202,7 @@ class CppDeclaration(object):
     That could be necessary to use unified render_to_string() interface, that is impossible for
     C++ primitives having two string representations (i.e. declaration and definition)
     """
+    __slots__ = ('cpp_element',)
 
     def __init__(self, cpp_element):
         self.cpp_element = cpp_element
@@ -82,6 +215,7 @@ class CppImplementation(object):
     """
     See declaration description
     """
+    __slots__ = ('cpp_element',)
 
     def __init__(self, cpp_element):
         self.cpp_element = cpp_element
@@ -96,9 +230,135 @@ class CppLanguageElement(object):
     The base class for all C++ language elements.
     Contains dynamic storage for element properties
     (e.g. is_static for the variable is_virtual for the class method etc)
+    Properties are stored in __slots__ (see element_slots()) to keep elements compact,
+    boolean flags with 'is_' prefix are packed to bits of a single integer slot
+
+    For every subclass the properties storage slots and default values are collected on class creation,
+    so that _init_properties(properties) validates property names and assigns all properties and containers at once
+
+    Qualified names are cached, the cache is invalidated when name or parent of any element is changed.
+    Values computed during rendering (e.g. function signatures) could be cached in render_cache(),
+    the cache is dropped when any of trackedPropertiesNames is changed
     """
     availablePropertiesNames = {'name', 'ref_to_parent'}
 
+    # Properties which changes drop the render cache, see element_slots()
+    trackedPropertiesNames = frozenset()
+
+    # Slots storing properties implemented as Python properties
+    storageNames = {'name': '_name', 'ref_to_parent': '_ref_to_parent'}
+
+    # Cached values, not a part of the element state (not pickled)
+    cacheNames = ('_qualifier_cache', '_render_cache')
+
+    __slots__ = ('_name', '_ref_to_parent', '_flags') + cacheNames
+
+    name = _structure_property('_name')
+    ref_to_parent = _structure_property('_ref_to_parent')
+
+    # Values of properties not passed to the constructor, None if not listed.
+    # Subclasses extend the dict of the base class
+    defaultPropertiesValues = {}
+
+    # Instance attributes initialized with empty lists by the constructor (e.g. child elements)
+    containerNames = ()
+
+    # When _sanity_check() is called, see set_validation_policy()
+    validationPolicy = VALIDATE_ON_CHANGE
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Precompute (property name, storage slot, default value) of all properties of the class,
+        and (property name, bit) of the boolean flags
+        """
+        super().__init_subclass__(**kwargs)
+        for property_name in cls.availablePropertiesNames:
+            if not property_name.isidentifier():
+                raise ValueError(f'{cls.__name__} property {property_name!r} is not a valid identifier')
+        defaults = cls.property_defaults()
+        flag_names = sorted(name for name in cls.availablePropertiesNames if is_flag_property(name))
+        cls._flag_bits = tuple((property_name, 1 << i) for i, property_name in enumerate(flag_names))
+        cls._default_flags = sum(bit for property_name, bit in cls._flag_bits if defaults[property_name])
+        for property_name, bit in cls._flag_bits:
+            setattr(cls, property_name, _flag_property(bit))
+        for property_name in cls.trackedPropertiesNames:
+            if property_name not in cls.storageNames and not is_flag_property(property_name):
+                cls.storageNames = {**cls.storageNames, property_name: storage_name(property_name)}
+                setattr(cls, property_name, _tracked_property(storage_name(property_name)))
+        cls._property_storage = tuple((property_name, cls.storageNames.get(property_name, property_name), default)
+                                      for property_name, default in sorted(defaults.items())
+                                      if not is_flag_property(property_name))
+        cls._state_names = tuple(slot for klass in cls.__mro__ for slot in getattr(klass, '__slots__', ())
+                                 if slot not in cls.cacheNames)
+        cls._row_plans = {}
+
+    def __getstate__(self):
+        """
+        Element state for pickling, without cached values
+        """
+        return None, {name: getattr(self, name) for name in self._state_names if hasattr(self, name)}
+
+    @classmethod
+    def property_defaults(cls):
+        """
+        @return: dict of default values for all available properties
+        """
+        return {name: cls.defaultPropertiesValues.get(name) for name in cls.availablePropertiesNames}
+
+    @classmethod
+    def from_rows(cls, columns, rows):
+        """
+        Bulk factory creating a number of elements from tuples of property values
+        Ex.
+        variables = CppVariable.from_rows(('name', 'type', 'initialization_value'),
+                                          [('m_a', 'int', '0'), ('m_b', 'double', '1.0')])
+        @param: columns - property names in the tuple order
+        @param: rows - iterable of tuples
+        @return: list of elements
+        """
+        columns = tuple(columns)
+        plan = cls._row_plans.get(columns)
+        if plan is None:
+            plan = cls._row_plans[columns] = cls._row_plan(columns)
+        slots, defaults, containers = plan
+        width = len(columns)
+        new = object.__new__
+        elements = []
+        for row in rows:
+            if len(row) != width:
+                raise ValueError(f'Row {row!r} does not match columns {columns!r}')
+            element = new(cls)
+            # assign all slots by a single C-level loop, consuming the map
+            deque(map(setattr, repeat(element), slots, chain(defaults, row)), 0)
+            for container_name in containers:
+                setattr(element, container_name, [])
+            elements.append(element)
+        return elements
+
+    @classmethod
+    def _row_plan(cls, columns):
+        """
+        Assignment plan of from_rows(): the same as _init_properties(), but computed once per columns tuple
+        @param: columns - property names in the tuple order
+        @return: (slots of other properties, flags and caches followed by the storage slots of the columns,
+        values of other properties, flags and caches, container names).
+        Flags columns are assigned through their properties, after the default flags
+        """
+        unknown_properties = set(columns).difference(cls.availablePropertiesNames)
+        if unknown_properties:
+            raise AttributeError(
+                f'Error: try to initialize {cls.__name__} with unknown property: {repr(unknown_properties)}')
+        if len(set(columns)) != len(columns):
+            raise ValueError(f'Duplicate properties in columns {columns!r}')
+        storage = {property_name: slot for property_name, slot, _ in cls._property_storage}
+        defaults = [(slot, default) for property_name, slot, default in cls._property_storage
+                    if property_name not in columns]
+        defaults.append(('_flags', cls._default_flags))
+        defaults.extend((cache_name, None) for cache_name in cls.cacheNames)
+        slots = tuple(slot for slot, _ in defaults) + tuple(storage.get(property_name, property_name)
+                                                            for property_name in columns)
+        return slots, tuple(default for _, default in defaults), cls.containerNames
+
     def __init__(self, properties):
         """
         @param: properties - Basic C++ element properties (name, ref_to_parent)
@@ -107,23 +367,37 @@ class CppLanguageElement(object):
         self.name = properties.get('name')
         self.ref_to_parent = properties.get('ref_to_parent')
 
-    def check_input_properties_names(self, input_property_names):
+    def _init_properties(self, properties):
         """
-        Ensure that all properties that passed to the CppLanguageElement are recognized.
-        Raise an exception otherwise
+        Validate property names and assign all properties, containers and caches of the new element.
+        New element could not be a parent of any other element yet,
+        so the properties tracked for cache invalidation are assigned directly to their storage
+        @param: properties - values of the properties, properties not listed get their default values
         """
-        unknown_properties = input_property_names.difference(self.availablePropertiesNames)
-        if unknown_properties:
-            raise AttributeError(
-                f'Error: try to initialize {self.__class__.__name__} with unknown property: {repr(unknown_properties)}')
+        if not properties.keys() <= self.availablePropertiesNames:
+            self.check_input_properties_names(set(properties))
+        for property_name, storage, default in self._property_storage:
+            setattr(self, storage, properties.get(property_name, default))
+        flags = self._default_flags
+        for property_name, bit in self._flag_bits:
+            value = properties.get(property_name)
+            if value is not None:
+                flags = flags | bit if value else flags & ~bit
+        self._flags = flags
+        for container_name in self.containerNames:
+            setattr(self, container_name, [])
+        for cache_name in self.cacheNames:
+            setattr(self, cache_name, None)
 
     def init_class_properties(self, current_class_properties, input_properties_dict, default_property_value=None):
         """
+        Deprecated, the elements are initialized by _init_properties()
         @param: current_class_properties - all available properties for the C++ element to be generated
         @param: input_properties_dict - values for the initialized properties (e.g. is_const=True)
         @param: default_property_value - value for properties that are not initialized
         (None by default, because of same as False semantic)
         """
+        warnings.warn('init_class_properties() is deprecated, use _init_properties()', DeprecationWarning, 2)
         # Set all available properties to DefaultValue
         for propertyName in current_class_properties:
             if propertyName not in CppLanguageElement.availablePropertiesNames:
@@ -137,7 +411,9 @@ class CppLanguageElement(object):
     def process_boolean_properties(self, properties):
         """
         For every boolean property starting from 'is_' prefix generate a property without 'is_' prefix
+        Deprecated, not used by the package elements
         """
+        warnings.warn('process_boolean_properties() is deprecated', DeprecationWarning, 2)
         res = {**properties}
         for prop in self.availablePropertiesNames:
             if prop.startswith("is_"):
@@ -148,7 +424,9 @@ class CppLanguageElement(object):
         """
         Check if input properties contain either 'is_' prefixed properties or non-prefixed properties
         If so, initialize prefixed properties with non-prefixed values
+        Deprecated, not used by the package elements
         """
+        warnings.warn('init_boolean_properties() is deprecated', DeprecationWarning, 2)
         for prop in self.availablePropertiesNames:
             if prop.startswith("is_"):
                 non_prefixed = prop.replace("is_", "")
@@ -156,6 +434,67 @@ class CppLanguageElement(object):
                     setattr(self, prop, input_properties_dict[non_prefixed])
         current_class_properties.update(input_properties_dict)
 
+    def render_cache(self):
+        """
+        @return: dict for the values computed during rendering.
+        The dict is reset when any of trackedPropertiesNames is changed,
+        or name or parent of any element is changed
+        """
+        epoch = _structure_epoch
+        cache = getattr(self, '_render_cache', None)
+        if cache is None or cache[0] != epoch:
+            cache = self._render_cache = (epoch, {})
+        return cache[1]
+
+    @classmethod
+    def set_validation_policy(cls, policy):
+        """
+        Set validation policy for the class and its subclasses not having their own policy
+        CppLanguageElement.set_validation_policy(VALIDATE_NEVER) disables checks of all elements
+        @param: policy - VALIDATE_ALWAYS, VALIDATE_ON_CHANGE or VALIDATE_NEVER
+        """
+        if policy not in VALIDATION_POLICIES:
+            raise ValueError(f'Unknown validation policy {policy!r}, expected one of {VALIDATION_POLICIES}')
+        cls.validationPolicy = policy
+
+    def _sanity_check(self):
+        """
+        Check whether properties compose a correct C++ code
+        @raise: ValueError, if some properties are not valid
+        """
+        pass
+
+    def _check(self):
+        """
+        Run _sanity_check() according to the validation policy.
+        With VALIDATE_ON_CHANGE policy successful result is cached in render_cache()
+        """
+        policy = self.validationPolicy
+        if policy == VALIDATE_ON_CHANGE:
+            cache = self.render_cache()
+            if 'checked' not in cache:
+                self._sanity_check()
+                cache['checked'] = True
+        elif policy == VALIDATE_ALWAYS:
+            self._sanity_check()
+
+    def invalidate_render_cache(self):
+        """
+        Drop values cached during rendering,
+        should be called if the element is changed bypassing its properties
+        """
+        self._render_cache = None
+
+    def check_input_properties_names(self, input_property_names):
+        """
+        Ensure that all properties that passed to the CppLanguageElement are recognized.
+        Raise an exception otherwise
+        """
+        unknown_properties = input_property_names.difference(self.availablePropertiesNames)
+        if unknown_properties:
+            raise AttributeError(
+                f'Error: try to initialize {self.__class__.__name__} with unknown property: {repr(unknown_properties)}')
+
     def render_to_string(self, cpp):
         """
         @param: cpp - handle that supports code generation interface (see code_generator.py)
@@ -174,13 +513,7 @@ class CppLanguageElement(object):
         Supports for nested classes, e.g.
         void MyClass::NestedClass::
         """
-        full_parent_qualifier = ''
-        parent = self.ref_to_parent
-        # walk through all existing parents
-        while parent:
-            full_parent_qualifier = f'{parent.name}::{full_parent_qualifier}'
-            parent = parent.ref_to_parent
-        return full_parent_qualifier
+        return self._qualified_names()[0]
 
     def fully_qualified_name(self):
         """
@@ -188,4 +521,29 @@ class CppLanguageElement(object):
         Ex.
         MyClass::NestedClass::Method()
         """
-        return f'{self.parent_qualifier()}{self.name}'
+        return self._qualified_names()[1]
+
+    def _qualified_names(self):
+        """
+        @return: pair of parent qualifier and fully qualified name,
+        cached until name or parent of any element is changed
+        """
+        # epoch is read before the names are computed, so that names computed concurrently
+        # with a structure change are not cached as up-to-date
+        epoch = _structure_epoch
+        cache = getattr(self, '_qualifier_cache', None)
+        if cache is not None and cache[0] == epoch:
+            return cache[1]
+
+        parent = self.ref_to_parent
+        if isinstance(parent, CppLanguageElement):
+            full_parent_qualifier = f'{parent.fully_qualified_name()}::'
+        else:
+            full_parent_qualifier = ''
+            # walk through all existing parents
+            while parent:
+                full_parent_qualifier = f'{parent.name}::{full_parent_qualifier}'
+                parent = parent.ref_to_parent
+        names = (full_parent_qualifier, f'{full_parent_qualifier}{self.name}')
+        self._qualifier_cache = (epoch, names)
+        return names
@@ -0,0 +1,99 @@
+import importlib
+
+__doc__ = """Registry of implementation handles.
+Functions registered here could be referenced by name as 'implementation_handle'
+of CppFunction and CppClass.CppMethod. Named handles survive pickling,
+so elements using them could be rendered in worker processes (see cpp_project.py)
+even if the handle itself is a nested function or a lambda.
+
+Example:
+# Python code
+@register_handle(name='return_zero')
+def return_zero(self, cpp):
+    cpp('return 0;')
+
+f = CppFunction(name='f', ret_type='int', implementation_handle=return_zero)
+g = CppFunction(name='g', ret_type='int', implementation_handle=NamedHandle('return_zero'))
+"""
+
+# Registered handles by name
+_handles = {}
+
+
+def register_handle(func=None, name=None):
+    """
+    Register implementation handle, could be used either as a function or as a decorator
+    @register_handle
+    @register_handle(name='my_handle')
+    @param: func - function receiving 'self' and C++ code generator handle
+    @param: name - handle name, '<module>.<qualified function name>' by default
+    @return: NamedHandle referencing the registered function
+    """
+    def register(f):
+        handle_name = name if name is not None else f'{f.__module__}.{f.__qualname__}'
+        if _handles.get(handle_name, f) is not f:
+            raise ValueError(f'Implementation handle {handle_name} is already registered')
+        _handles[handle_name] = f
+        return NamedHandle(handle_name, f.__module__)
+
+    return register(func) if func is not None else register
+
+
+def unregister_handle(name):
+    """
+    Remove handle from the registry
+    """
+    _handles.pop(name, None)
+
+
+def resolve_handle(name, module=None):
+    """
+    @param: name - registered handle name
+    @param: module - module registering the handle, imported if the handle is not registered yet
+    (e.g. in a worker process started by 'spawn' method)
+    @return: registered function
+    @raise: KeyError if handle is not registered
+    """
+    if name not in _handles and module is not None:
+        importlib.import_module(module)
+    try:
+        return _handles[name]
+    except KeyError:
+        raise KeyError(f'Implementation handle {name} is not registered') from None
+
+
+class NamedHandle:
+    """
+    Picklable reference to the registered implementation handle.
+    Could be used as 'implementation_handle' property value
+    """
+    __slots__ = ('name', 'module')
+
+    def __init__(self, name, module=None):
+        """
+        @param: name - registered handle name
+        @param: module - module registering the handle
+        """
+        self.name = name
+        self.module = module
+
+    def __call__(self, element, cpp):
+        """
+        Call the registered function
+        """
+        resolve_handle(self.name, self.module)(element, cpp)
+
+    def __getstate__(self):
+        return self.name, self.module
+
+    def __setstate__(self, state):
+        self.name, self.module = state
+
+    def __eq__(self, other):
+        return isinstance(other, NamedHandle) and self.name == other.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __repr__(self):
+        return f'NamedHandle({self.name!r})'
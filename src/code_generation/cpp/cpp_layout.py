@@ -0,0 +1,119 @@
+from collections import namedtuple
+
+__doc__ = """Estimation of C++ class layouts and reordering of members to minimize padding.
+Every member is placed at the offset aligned by its type alignment, the size of the class
+is aligned by the largest alignment of its members. Ordering members by alignment
+(the largest first) removes all the padding between them.
+
+Sizes and alignments of the types are taken from the table, DEFAULT_TYPE_LAYOUTS
+corresponds to 64-bit Linux (LP64) ABI. Pointers and references have the layout of 'void*',
+'const'/'volatile'/'mutable' qualifiers and 'std::' prefix are ignored.
+Types of other platforms or user-defined types should be added to the table.
+
+Members accessed by different threads could be isolated to separate cache lines to avoid false sharing,
+see CppVariable.cache_line_group and CppClass.cache_line_size.
+
+Example:
+# Python code
+members = [('flag', 'bool'), ('id', 'uint64_t'), ('port', 'uint16_t')]
+original_size, _ = struct_size([type_layout(member_type) for _, member_type in members])  # 24
+members = optimal_order(members, lambda member: type_layout(member[1]))  # id, port, flag
+optimized_size, _ = struct_size([type_layout(member_type) for _, member_type in members])  # 16
+"""
+
+# Default size of the cache line in bytes
+DEFAULT_CACHE_LINE_SIZE = 64
+
+# Size and alignment of a C++ type in bytes
+TypeLayout = namedtuple('TypeLayout', ['size', 'alignment'])
+
+# Result of the layout pass (see CppClass.layout_report()):
+# original_size - estimated size of the class with members in the declaration order
+# optimized_size - estimated size of the class with reordered members
+# alignment - alignment of the class
+# members - names of non-static member variables in the optimized order
+LayoutReport = namedtuple('LayoutReport', ['original_size', 'optimized_size', 'alignment', 'members'])
+
+# Placement of a member variable or padding (see CppClass.cache_line_report()):
+# name - name of the member
+# offset - estimated offset in bytes
+# size - size in bytes
+# cache_line - index of the cache line of the first byte
+MemberLayout = namedtuple('MemberLayout', ['name', 'offset', 'size', 'cache_line'])
+
+# Resulting layout of the class (see CppClass.cache_line_report()):
+# size - estimated size of the class
+# alignment - alignment of the class
+# cache_line_size - size of the cache line
+# members - MemberLayout of non-static member variables and paddings in the declaration order
+CacheLineReport = namedtuple('CacheLineReport', ['size', 'alignment', 'cache_line_size', 'members'])
+
+
+def _layouts(size, alignment, *type_names):
+    """
+    @return: dict of the same layout for all type names
+    """
+    return {type_name: TypeLayout(size, alignment) for type_name in type_names}
+
+
+DEFAULT_TYPE_LAYOUTS = {
+    **_layouts(1, 1, 'bool', 'char', 'signed char', 'unsigned char', 'int8_t', 'uint8_t', 'char8_t', 'byte'),
+    **_layouts(2, 2, 'short', 'unsigned short', 'int16_t', 'uint16_t', 'char16_t'),
+    **_layouts(4, 4, 'int', 'unsigned', 'unsigned int', 'int32_t', 'uint32_t', 'float', 'char32_t', 'wchar_t'),
+    **_layouts(8, 8, 'long', 'unsigned long', 'long long', 'unsigned long long', 'int64_t', 'uint64_t',
+               'double', 'size_t', 'ssize_t', 'ptrdiff_t', 'intptr_t', 'uintptr_t', 'void*'),
+    **_layouts(16, 16, 'long double'),
+    **_layouts(32, 8, 'string'),
+}
+
+# Type qualifiers not affecting the layout
+_QUALIFIERS = {'const', 'volatile', 'mutable'}
+
+
+def type_layout(type_name, layouts=None):
+    """
+    @param: type_name - C++ type, e.g. 'const std::uint32_t' or 'char*'
+    @param: layouts - dict of type names to (size, alignment), DEFAULT_TYPE_LAYOUTS by default
+    @return: TypeLayout of the type
+    @raise: ValueError if the type is not found in the table
+    """
+    layouts = DEFAULT_TYPE_LAYOUTS if layouts is None else layouts
+    words = type_name.replace('*', ' * ').replace('&', ' & ').split()
+    name = ' '.join(word for word in words if word not in _QUALIFIERS)
+    if name.endswith(('*', '&')):
+        name = 'void*'
+    elif name not in layouts and name.startswith('std::'):
+        name = name[len('std::'):]
+    if name not in layouts:
+        raise ValueError(f'Unknown layout of the type {type_name!r}, add it to the type layouts table')
+    return TypeLayout(*layouts[name])
+
+
+def align_offset(offset, alignment):
+    """
+    @return: the nearest offset not less than the given one, aligned by the alignment
+    """
+    return -(-offset // alignment) * alignment
+
+
+def struct_size(layouts):
+    """
+    @param: layouts - TypeLayout of the members in the declaration order
+    @return: (size, alignment) of the structure, empty structure has size 1
+    """
+    offset = 0
+    alignment = 1
+    for member in layouts:
+        offset = align_offset(offset, member.alignment) + member.size
+        alignment = max(alignment, member.alignment)
+    return max(1, align_offset(offset, alignment)), alignment
+
+
+def optimal_order(members, layout):
+    """
+    Order members by alignment, the largest first. The order of members of the same alignment is kept
+    @param: members - list of members
+    @param: layout - function returning TypeLayout of the member
+    @return: reordered list of members
+    """
+    return sorted(members, key=lambda member: -layout(member).alignment)
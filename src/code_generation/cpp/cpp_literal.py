@@ -0,0 +1,83 @@
+__doc__ = """Encoding of binary data as C++ string literals.
+Large byte arrays initialized by string literals are compiled much faster
+than brace-enclosed lists of numbers. Long data is split to a number of
+concatenated literals, so that every literal fits the compilers limits.
+MSVC also limits the length of the concatenated literal (see MAX_CONCATENATED_LITERAL_SIZE),
+CppArray.max_literal_size checks it on rendering.
+
+Non-printable bytes are encoded with 3-digit octal escapes: unlike hexadecimal ones,
+they could not absorb the next character of the literal.
+Question marks are escaped to avoid trigraphs.
+
+Example:
+# Python code
+for line in literal_lines([b'Hello\\0World?'], 8):
+    cpp(line)
+
+// Generated C++ code
+"Hello\\000Wo"
+"rld\\?"
+"""
+
+# Maximal length of a single string literal accepted by all major compilers (MSVC limit)
+MAX_LITERAL_LENGTH = 16380
+
+# Maximal length in bytes of the concatenated string literal with the terminating NUL (MSVC error C1091),
+# GCC and Clang do not limit it. Larger data could not be embedded as a single literal for MSVC
+MAX_CONCATENATED_LITERAL_SIZE = 65535
+
+# Longest escape sequence, characters per byte
+MAX_ESCAPE_LENGTH = 4
+
+# Maximal number of bytes encoded in a single literal
+MAX_LITERAL_BYTES = MAX_LITERAL_LENGTH // MAX_ESCAPE_LENGTH
+
+# Default number of bytes encoded in a single literal
+DEFAULT_LITERAL_BYTES = 128
+
+# Types of arrays that could be initialized by a string literal
+LITERAL_TYPES = {'char', 'signed char', 'unsigned char', 'int8_t', 'uint8_t', 'std::int8_t', 'std::uint8_t'}
+
+
+def _escape_table():
+    """
+    @return: str.translate() table of escape sequences for bytes decoded as latin-1
+    """
+    table = {ord('"'): '\\"', ord('\\'): '\\\\', ord('?'): '\\?', ord('\n'): '\\n', ord('\t'): '\\t'}
+    for code in range(256):
+        if code not in table and not 0x20 <= code < 0x7f:
+            table[code] = f'\\{code:03o}'
+    return table
+
+
+_ESCAPES = _escape_table()
+
+
+def escape_bytes(data):
+    """
+    @param: data - bytes-like object
+    @return: content of C++ string literal without quotes
+    """
+    return bytes(data).decode('latin-1').translate(_ESCAPES)
+
+
+def check_literal_bytes(bytes_per_literal):
+    """
+    @raise: ValueError if literals of the given number of bytes could exceed compilers limits
+    """
+    if not 0 < bytes_per_literal <= MAX_LITERAL_BYTES:
+        raise ValueError(f'Number of bytes in a string literal should be in range 1..{MAX_LITERAL_BYTES}, '
+                         f'got {bytes_per_literal}')
+
+
+def literal_lines(blocks, bytes_per_literal=DEFAULT_LITERAL_BYTES):
+    """
+    Encode data as a sequence of string literals
+    @param: blocks - iterable of bytes-like objects, every block starts a new literal
+    @param: bytes_per_literal - maximal number of bytes in a literal
+    @return: generator of quoted literals
+    """
+    check_literal_bytes(bytes_per_literal)
+    for block in blocks:
+        for start in range(0, len(block), bytes_per_literal):
+            yield f'"{escape_bytes(block[start:start + bytes_per_literal])}"'
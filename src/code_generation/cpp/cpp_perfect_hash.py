@@ -0,0 +1,333 @@
+import array
+from collections import namedtuple
+from functools import partial
+
+from code_generation.cpp.cpp_generator import CppLanguageElement, CppDeclaration, CppImplementation, element_slots
+from code_generation.cpp.cpp_array import CppArray
+from code_generation.cpp.cpp_function import CppFunction
+from code_generation.cpp.cpp_literal import escape_bytes
+
+__doc__ = """Perfect hash lookup tables generated from Python mappings.
+Keys are placed to the table by 'hash and displace' algorithm: keys are distributed to buckets
+by seeded hash, then for every bucket (starting from the largest ones) a seed of the hash is found,
+so that all keys of the bucket get free slots of the table. Buckets of a single key
+are placed to the remaining free slots directly. The table has no collisions and no empty slots,
+the lookup takes two hash calculations and a single key comparison at most.
+
+The hash is 32-bit FNV-1a with the offset basis mixed with the seed by MurmurHash3 finalizer,
+the result is mixed by the finalizer again, so that the hashes of different seeds are independent. Seed search is limited,
+if some bucket could not be placed, keys are distributed to buckets with another seed.
+
+The generated code requires <cstddef>, <cstdint> and <cstring> headers.
+
+Example:
+# Python code
+colors = CppPerfectHash(name='color_code', value_type='int', default_value='-1')
+colors.add_items({'red': 1, 'green': 2, 'blue': 3})
+colors.render_to_string(cpp)
+
+// Generated C++ code
+namespace
+{
+    uint32_t color_code_hash(uint32_t seed, const char* key, size_t length) ...
+    constexpr int32_t color_code_displacements[] = {...};
+    constexpr const char* color_code_keys[] = {"green", "red", "blue"};
+    constexpr size_t color_code_key_lengths[] = {5, 3, 4};
+    constexpr int color_code_values[] = {2, 1, 3};
+}
+
+int color_code(const char* key, size_t length)
+{
+    ...
+}
+"""
+
+# Maximal number of seeds tried to place a bucket
+MAX_SEED_ATTEMPTS = 1 << 12
+
+# Maximal number of seeds tried to distribute keys to buckets
+MAX_REHASH_ATTEMPTS = 16
+
+# 32-bit FNV-1a parameters
+FNV_OFFSET_BASIS = 0x811c9dc5
+FNV_PRIME = 0x01000193
+
+# Tables of the perfect hash, see perfect_hash():
+# seed - seed of the hash distributing keys to buckets
+# displacements - seed of the bucket hash, or -slot - 1 for buckets of a single key
+# slots - slots[i] is the index of the key placed to the slot i
+PerfectHashTables = namedtuple('PerfectHashTables', ['seed', 'displacements', 'slots'])
+
+
+def fmix32(value):
+    """
+    MurmurHash3 finalizer
+    @param: value - 32-bit unsigned integer
+    @return: 32-bit unsigned integer, every bit of the value affects every bit of the result
+    """
+    value ^= value >> 16
+    value = (value * 0x85ebca6b) & 0xffffffff
+    value ^= value >> 13
+    value = (value * 0xc2b2ae35) & 0xffffffff
+    return value ^ (value >> 16)
+
+
+def seeded_hash(key, seed):
+    """
+    32-bit FNV-1a hash with the offset basis mixed with the seed, followed by MurmurHash3 finalizer
+    The seed is mixed before it is combined with the basis, otherwise it would cancel out the first byte of the key
+    @param: key - bytes
+    @param: seed - 32-bit unsigned integer
+    @return: 32-bit unsigned hash
+    """
+    value = FNV_OFFSET_BASIS ^ fmix32(seed)
+    for byte in key:
+        value = ((value ^ byte) * FNV_PRIME) & 0xffffffff
+    return fmix32(value)
+
+
+def key_bytes(key):
+    """
+    @return: key as bytes, strings are encoded as UTF-8
+    """
+    return key.encode('utf-8') if isinstance(key, str) else bytes(key)
+
+
+def _displace(keys, seed, max_seeds):
+    """
+    Place keys distributed to buckets by the seed
+    @return: (displacements, slots), None if some bucket could not be placed within max_seeds attempts
+    """
+    size = len(keys)
+    buckets = [[] for _ in range(size)]
+    for index, key in enumerate(keys):
+        buckets[seeded_hash(key, seed) % size].append(index)
+    displacements = [0] * size
+    slots = [-1] * size
+    order = sorted(range(size), key=lambda bucket: len(buckets[bucket]), reverse=True)
+    singles = []
+    for bucket in order:
+        indices = buckets[bucket]
+        if len(indices) == 1:
+            singles.append(bucket)
+            continue
+        if not indices:
+            break
+        for displacement in range(1, max_seeds + 1):
+            positions = []
+            for index in indices:
+                position = seeded_hash(keys[index], displacement) % size
+                if slots[position] >= 0 or position in positions:
+                    break
+                positions.append(position)
+            else:
+                break
+        else:
+            return None
+        displacements[bucket] = displacement
+        for index, position in zip(indices, positions):
+            slots[position] = index
+    free_slots = (position for position in range(size) if slots[position] < 0)
+    for bucket, position in zip(singles, free_slots):
+        slots[position] = buckets[bucket][0]
+        displacements[bucket] = -position - 1
+    return displacements, slots
+
+
+def perfect_hash(keys, max_seeds=MAX_SEED_ATTEMPTS, max_rehashes=MAX_REHASH_ATTEMPTS):
+    """
+    Build minimal perfect hash of the keys, see the module description
+    Lookup of the key: displacement = displacements[hash(key, seed) % n],
+    slot = -displacement - 1 if displacement < 0 else hash(key, displacement) % n
+    @param: keys - list of unique bytes
+    @param: max_seeds - maximal number of seeds tried to place a bucket
+    @param: max_rehashes - maximal number of seeds tried to distribute keys to buckets
+    @return: PerfectHashTables
+    @raise: ValueError if the keys could not be placed
+    """
+    for seed in range(max_rehashes):
+        tables = _displace(keys, seed, max_seeds)
+        if tables is not None:
+            return PerfectHashTables(seed, *tables)
+    raise ValueError(f'Could not build perfect hash of {len(keys)} keys '
+                     f'with {max_rehashes} bucket seeds and {max_seeds} displacements')
+
+
+def _render_fmix32(cpp):
+    """
+    Implementation of fmix32() applied to 'hash' variable
+    """
+    cpp('hash ^= hash >> 16;')
+    cpp('hash *= 0x85ebca6bu;')
+    cpp('hash ^= hash >> 13;')
+    cpp('hash *= 0xc2b2ae35u;')
+    cpp('hash ^= hash >> 16;')
+
+
+def _hash_body(_, cpp):
+    """
+    Implementation of the hash with seed, the same as seeded_hash(key, seed)
+    """
+    cpp('uint32_t hash = seed;')
+    _render_fmix32(cpp)
+    cpp(f'hash ^= {FNV_OFFSET_BASIS:#010x}u;')
+    cpp('for (size_t i = 0; i < length; ++i)')
+    cpp(f'hash = (hash ^ static_cast<unsigned char>(key[i])) * {FNV_PRIME:#010x}u;', 1)
+    _render_fmix32(cpp)
+    cpp('return hash;')
+
+
+def _lookup_body(_, cpp, element):
+    """
+    Implementation of the lookup function
+    """
+    name = element.name
+    size = len(element.items)
+    seed = element.tables().seed
+    cpp(f'const int32_t displacement = {name}_displacements[{name}_hash({seed}, key, length) % {size}];')
+    cpp(f'const uint32_t index = displacement < 0 ? static_cast<uint32_t>(-displacement - 1) : '
+        f'{name}_hash(static_cast<uint32_t>(displacement), key, length) % {size};')
+    cpp(f'if ({name}_key_lengths[index] != length || std::memcmp({name}_keys[index], key, length) != 0)')
+    cpp(f'return {element.default_value};', 1)
+    cpp(f'return {name}_values[index];')
+
+
+class CppPerfectHash(CppLanguageElement):
+    """
+    The Python class that generates constant-time lookup function of string keys
+    with constexpr tables of collision-free perfect hash (see module description)
+    Generated function has signature '<value_type> <name>(const char* key, size_t length)'
+    Available properties:
+    value_type - string, C++ type of the values
+    default_value - string, value returned for unknown keys
+    documentation - string, '/// Example doxygen'
+
+    Keys are strings (encoded as UTF-8) or bytes, values are C++ expressions (e.g. numbers or quoted strings)
+    The tables are built once and cached until items are added
+    """
+    availablePropertiesNames = {'value_type',
+                                'default_value',
+                                'documentation'} | CppLanguageElement.availablePropertiesNames
+    # (key bytes, value) pairs
+    containerNames = ('items',)
+    # built perfect hash tables
+    cacheNames = CppLanguageElement.cacheNames + ('_tables',)
+    __slots__ = element_slots(availablePropertiesNames, CppLanguageElement, *containerNames, '_tables')
+
+    def __init__(self, **properties):
+        self._init_properties(properties)
+
+    def add_item(self, key, value):
+        """
+        @param: key - string or bytes
+        @param: value - C++ expression of the value
+        """
+        self.items.append((key_bytes(key), value))
+        self._tables = None
+
+    def add_items(self, mapping):
+        """
+        @param: mapping - dict or iterable of (key, value) pairs
+        """
+        pairs = mapping.items() if hasattr(mapping, 'items') else mapping
+        self.items.extend((key_bytes(key), value) for key, value in pairs)
+        self._tables = None
+
+    def tables(self):
+        """
+        Build the perfect hash, it is cached until items are added
+        @return: PerfectHashTables, see perfect_hash()
+        @raise: ValueError if keys are not unique or could not be placed, RuntimeError if there are no items
+        """
+        tables = getattr(self, '_tables', None)
+        if tables is None:
+            if not self.items:
+                raise RuntimeError(f'Perfect hash {self.name} has no items')
+            keys = [key for key, _ in self.items]
+            if len(set(keys)) != len(keys):
+                raise ValueError(f'Perfect hash {self.name} has duplicate keys')
+            tables = self._tables = perfect_hash(keys)
+        return tables
+
+    def lookup(self, key):
+        """
+        Python equivalent of the generated lookup function
+        @return: value of the key, default_value if not found
+        """
+        data = key_bytes(key)
+        seed, displacements, slots = self.tables()
+        displacement = displacements[seeded_hash(data, seed) % len(slots)]
+        if displacement < 0:
+            index = slots[-displacement - 1]
+        else:
+            index = slots[seeded_hash(data, displacement) % len(slots)]
+        stored_key, value = self.items[index]
+        return value if stored_key == data else self.default_value
+
+    def _table_elements(self):
+        """
+        @return: list of elements rendering lookup tables and the hash function
+        """
+        _, displacements, slots = self.tables()
+        hash_function = CppFunction(name=f'{self.name}_hash', ret_type='uint32_t', implementation_handle=_hash_body)
+        for argument in ('uint32_t seed', 'const char* key', 'size_t length'):
+            hash_function.add_argument(argument)
+        displacement_table = CppArray(name=f'{self.name}_displacements', type='int32_t', is_constexpr=True,
+                                      newline_align=True, items_per_line=16)
+        displacement_table.add_array_items(array.array('i', displacements))
+        keys = CppArray(name=f'{self.name}_keys', type='const char*', is_constexpr=True,
+                        newline_align=True, items_per_line=8)
+        keys.add_array_items([f'"{escape_bytes(self.items[index][0])}"' for index in slots])
+        key_lengths = CppArray(name=f'{self.name}_key_lengths', type='size_t', is_constexpr=True,
+                               newline_align=True, items_per_line=16)
+        key_lengths.add_array_items(array.array('Q', [len(self.items[index][0]) for index in slots]))
+        values = CppArray(name=f'{self.name}_values', type=self.value_type, is_constexpr=True,
+                          newline_align=True, items_per_line=8)
+        values.add_array_items([str(self.items[index][1]) for index in slots])
+        return [hash_function, displacement_table, keys, key_lengths, values]
+
+    def _lookup_function(self):
+        """
+        @return: CppFunction of the lookup
+        """
+        function = CppFunction(name=self.name, ret_type=self.value_type, documentation=self.documentation,
+                               implementation_handle=partial(_lookup_body, element=self))
+        function.add_argument('const char* key')
+        function.add_argument('size_t length')
+        return function
+
+    def declaration(self):
+        """
+        @return: CppDeclaration wrapper, that could be used
+        for declaration rendering using render_to_string(cpp) interface
+        """
+        return CppDeclaration(self)
+
+    def definition(self):
+        """
+        @return: CppImplementation wrapper, that could be used
+        for definition rendering using render_to_string(cpp) interface
+        """
+        return CppImplementation(self)
+
+    def render_to_string(self, cpp):
+        """
+        Generates lookup tables in the anonymous namespace and the lookup function
+        """
+        with cpp.block('namespace'):
+            for element in self._table_elements():
+                element.render_to_string(cpp)
+        cpp.newline()
+        self._lookup_function().render_to_string(cpp)
+
+    def render_to_string_declaration(self, cpp):
+        """
+        Generates declaration of the lookup function
+        """
+        self._lookup_function().render_to_string_declaration(cpp)
+
+    def render_to_string_implementation(self, cpp):
+        """
+        Generates lookup tables and the lookup function
+        """
+        self.render_to_string(cpp)
@@ -0,0 +1,137 @@
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from code_generation.core.code_generator import CppFile
+from code_generation.cpp.cpp_visitor import render_outputs
+
+__doc__ = """Parallel rendering of many C++ elements into header/source pairs.
+CppProject collects top-level elements (classes, functions, enums etc.) together with
+their target files and renders them across a pool of worker processes.
+
+Elements are pickled to be passed to the workers, so their implementation handles
+should be module-level functions or handles registered in cpp_handles.py
+
+Example:
+# Python code
+project = CppProject(processes=8, write_if_changed=True)
+for cpp_class in classes:
+    project.add(cpp_class,
+                header=f'{cpp_class.name}.h',
+                source=f'{cpp_class.name}.cpp',
+                header_preamble=['#pragma once'],
+                source_preamble=[f'#include "{cpp_class.name}.h"'])
+results = project.render()
+"""
+
+
+class RenderJob:
+    """
+    Element with its target files
+    If source is not set, the element is rendered to header using render_to_string(),
+    otherwise declaration is rendered to header and implementation to source
+    """
+
+    def __init__(self, element, header, source=None, header_preamble=(), source_preamble=()):
+        """
+        @param: element - C++ element to render
+        @param: header - header (or the only) target file
+        @param: source - optional source target file
+        @param: header_preamble - lines written to the header before the element
+        @param: source_preamble - lines written to the source before the element
+        """
+        self.element = element
+        self.header = header
+        self.source = source
+        self.header_preamble = list(header_preamble)
+        self.source_preamble = list(source_preamble)
+
+
+class RenderResult:
+    """
+    Result of the rendering job
+    header_changed/source_changed are None unless write-if-changed mode is used
+    """
+
+    def __init__(self, header, source=None, header_changed=None, source_changed=None):
+        self.header = header
+        self.source = source
+        self.header_changed = header_changed
+        self.source_changed = source_changed
+
+
+def _open(filename, preamble, write_if_changed):
+    """
+    Create output file and write preamble lines
+    """
+    cpp = CppFile(filename, buffered=True, write_if_changed=write_if_changed)
+    for line in preamble:
+        cpp(line)
+    return cpp
+
+
+def render_job(job, write_if_changed=False):
+    """
+    Render one job, executed in worker processes
+    @return: RenderResult
+    """
+    header = _open(job.header, job.header_preamble, write_if_changed)
+    if job.source is None:
+        job.element.render_to_string(header)
+        header.close()
+        return RenderResult(job.header, header_changed=header.out_changed)
+
+    source = _open(job.source, job.source_preamble, write_if_changed)
+    # declaration and implementation are rendered in a single traversal, see cpp_visitor.py
+    render_outputs([job.element], header=header, source=source)
+    header.close()
+    source.close()
+    return RenderResult(job.header, job.source, header.out_changed, source.out_changed)
+
+
+def _import_modules(modules):
+    """
+    Worker process initializer, imports modules registering implementation handles
+    """
+    for module in modules:
+        importlib.import_module(module)
+
+
+class CppProject:
+    """
+    Set of rendering jobs executed in parallel
+    """
+
+    def __init__(self, processes=None, write_if_changed=False, chunksize=1, initializer_modules=()):
+        """
+        @param: processes - number of worker processes, os.cpu_count() by default,
+        1 to render in the current process
+        @param: write_if_changed - rewrite only changed files, see code_sink.py
+        @param: chunksize - number of jobs sent to a worker at once
+        @param: initializer_modules - modules to be imported by every worker,
+        e.g. modules registering implementation handles
+        """
+        self.processes = processes
+        self.write_if_changed = write_if_changed
+        self.chunksize = chunksize
+        self.initializer_modules = list(initializer_modules)
+        self.jobs = []
+
+    def add(self, element, header, source=None, header_preamble=(), source_preamble=()):
+        """
+        Add element to render, see RenderJob
+        """
+        self.jobs.append(RenderJob(element, header, source, header_preamble, source_preamble))
+
+    def render(self):
+        """
+        Render all jobs
+        @return: list of RenderResult in order of adding
+        """
+        render = partial(render_job, write_if_changed=self.write_if_changed)
+        if self.processes == 1:
+            return [render(job) for job in self.jobs]
+        with ProcessPoolExecutor(max_workers=self.processes,
+                                 initializer=_import_modules,
+                                 initargs=(self.initializer_modules,)) as pool:
+            return list(pool.map(render, self.jobs, chunksize=self.chunksize))
@@ -0,0 +1,292 @@
+import io
+import os
+import types
+import hashlib
+import tempfile
+from collections import OrderedDict
+
+from code_generation.version import VERSION
+from code_generation.cpp.cpp_generator import CppLanguageElement
+from code_generation.cpp.cpp_array import bulk_view
+from code_generation.cpp.cpp_handles import NamedHandle, resolve_handle
+
+__doc__ = """Persistent content-addressed cache of rendered C++ elements.
+Rendered text of the element is stored on disk under its fingerprint,
+calculated from the element properties, its child elements, the rendering method,
+the output formatter and the indentation level. The fingerprint includes the library version,
+so the text rendered by other versions of the generator is never reused.
+Next run splices text of the unchanged elements from the cache instead of rendering them.
+
+Implementation handles are Python functions, so their output could not be fingerprinted.
+Elements with implementation handles are cached only if every handle has an explicit
+version token assigned by render_version() decorator; change the token whenever
+the handle output changes. Elements without tokens are always rendered.
+Bytecode, constants and names of the handle are fingerprinted as well, so that different
+lambdas with the same token are told apart; values captured in closures or default arguments are not.
+Elements reading external files provide external_content_token() method,
+e.g. size and modification time of the file.
+
+The cache has a bounded size, least recently used entries are evicted.
+
+Example:
+# Python code
+@render_version('1')
+def handle(self, cpp):
+    cpp('return 0;')
+
+cache = RenderCache('.codegen_cache', max_size=256 << 20)
+for cpp_class in classes:
+    cache.render(cpp_class.declaration(), header)
+    cache.render(cpp_class.definition(), source)
+"""
+
+# Change when the fingerprint format changes, the library version is added to the fingerprint as well
+FINGERPRINT_FORMAT = '2'
+
+# Default cache size limit, bytes
+DEFAULT_MAX_SIZE = 256 << 20
+
+# Cache entry file name suffix
+ENTRY_SUFFIX = '.render'
+
+
+def render_version(token):
+    """
+    Decorator assigning the version token to the implementation handle
+    @param: token - string, should be changed whenever the handle output changes
+    """
+    def assign(handle):
+        handle.render_version = str(token)
+        return handle
+
+    return assign
+
+
+class _Uncacheable(Exception):
+    """
+    Raised when the element could not be fingerprinted
+    """
+    pass
+
+
+def _code_tokens(code):
+    """
+    @return: generator of strings identifying the code object: bytecode, names and constants,
+    nested code objects (e.g. lambdas and comprehensions) are traversed recursively
+    """
+    yield code.co_code.hex()
+    yield repr(code.co_names)
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            yield from _code_tokens(constant)
+        elif isinstance(constant, frozenset):
+            # order of the set items depends on the string hash seed
+            yield f'frozenset:{sorted(map(repr, constant))!r}'
+        else:
+            yield f'{type(constant).__name__}:{constant!r}'
+
+
+def _handle_token(handle):
+    """
+    @return: fingerprint token of the implementation handle
+    @raise: _Uncacheable if the handle has no version token
+    """
+    function = resolve_handle(handle.name, handle.module) if isinstance(handle, NamedHandle) else handle
+    version = getattr(function, 'render_version', None)
+    if version is None:
+        raise _Uncacheable()
+    # code distinguishes different lambdas and nested functions with the same qualified name
+    code = getattr(function, '__code__', None)
+    code_digest = hashlib.sha256('\n'.join(_code_tokens(code)).encode()).hexdigest() if code is not None else ''
+    return (f'handle:{getattr(function, "__module__", "")}.{getattr(function, "__qualname__", "")}:'
+            f'{code_digest}:{version}')
+
+
+def _value_token(value):
+    """
+    @return: fingerprint token of the property value
+    @raise: _Uncacheable if the value could not be fingerprinted
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return f'{type(value).__name__}:{value!r}'
+    if isinstance(value, CppLanguageElement):
+        return f'element:{_element_digest(value)}'
+    if isinstance(value, (list, tuple)):
+        return f'list:[{",".join(_value_token(item) for item in value)}]'
+    view = bulk_view(value)
+    if view is not None:
+        return f'buffer:{view.format}:{hashlib.sha256(view.cast("B")).hexdigest()}'
+    if callable(value):
+        return _handle_token(value)
+    raise _Uncacheable()
+
+
+def _element_digest(element):
+    """
+    @return: hex digest of the element properties and child elements.
+    Parent element is represented by its qualified name only
+    """
+    digest = hashlib.sha256()
+    cls = type(element)
+    digest.update(f'{cls.__module__}.{cls.__qualname__}\n'.encode())
+    for property_name in sorted(cls.availablePropertiesNames):
+        if property_name == 'ref_to_parent':
+            token = f'parent:{element.parent_qualifier()!r}'
+        else:
+            token = _value_token(getattr(element, property_name, None))
+        digest.update(f'{property_name}={token}\n'.encode())
+    for container_name in cls.containerNames:
+        digest.update(f'{container_name}={_value_token(getattr(element, container_name))}\n'.encode())
+    # content of the external files used by the element, e.g. CppBlob
+    external_token = getattr(element, 'external_content_token', None)
+    if external_token is not None:
+        digest.update(f'external={external_token()}\n'.encode())
+    return digest.hexdigest()
+
+
+def fingerprint(element, cpp, method='render_to_string'):
+    """
+    Calculate the fingerprint of the rendered text
+    @param: element - C++ element, or its declaration()/definition() wrapper
+    @param: cpp - target code file, its formatter and current indentation affect the output
+    @param: method - rendering method name
+    @return: hex string, or None if the element could not be cached
+    """
+    if not isinstance(element, CppLanguageElement):
+        # declaration()/definition() wrappers
+        method = f'{type(element).__name__}.{method}'
+        element = element.cpp_element
+    formatter = cpp.Formatter
+    try:
+        element_digest = _element_digest(element)
+    except _Uncacheable:
+        return None
+    header = (f'{FINGERPRINT_FORMAT}\n{VERSION}\n{type(cpp).__name__}\n{method}\n'
+              f'{formatter.indent!r}\n{formatter.endline!r}\n{cpp.current_indent}\n')
+    return hashlib.sha256(header.encode() + element_digest.encode()).hexdigest()
+
+
+class RenderCache:
+    """
+    On-disk cache mapping fingerprints to the rendered text, with LRU eviction.
+    Recency of the entries is kept in their modification time, so it persists across runs
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        """
+        @param: directory - cache directory, created if missing
+        @param: max_size - cache size limit in bytes
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+        # entries from the least to the most recently used: fingerprint -> size
+        self.entries = OrderedDict()
+        self.size = 0
+        found = []
+        with os.scandir(directory) as scanner:
+            for entry in scanner:
+                if entry.name.endswith(ENTRY_SUFFIX) and entry.is_file():
+                    stat = entry.stat()
+                    found.append((stat.st_mtime_ns, entry.name[:-len(ENTRY_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.size += size
+
+    def _path(self, key):
+        """
+        @return: path to the cache entry file
+        """
+        return os.path.join(self.directory, f'{key}{ENTRY_SUFFIX}')
+
+    def get(self, key):
+        """
+        @return: cached text, or None if missing
+        """
+        try:
+            with open(self._path(key), 'rb') as f:
+                text = f.read().decode('utf-8')
+            os.utime(self._path(key))
+        except OSError:
+            self._forget(key)
+            return None
+        self.entries.move_to_end(key)
+        return text
+
+    def put(self, key, text):
+        """
+        Store the text, evict least recently used entries if the size limit is exceeded
+        """
+        data = text.encode('utf-8')
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, self._path(key))
+        self._forget(key)
+        self.entries[key] = len(data)
+        self.size += len(data)
+        self._evict()
+
+    def _forget(self, key):
+        """
+        Remove the entry from the index
+        """
+        size = self.entries.pop(key, None)
+        if size is not None:
+            self.size -= size
+
+    def _evict(self):
+        """
+        Remove least recently used entries until the cache fits the size limit
+        """
+        while self.size > self.max_size and self.entries:
+            key, size = self.entries.popitem(last=False)
+            self.size -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """
+        Remove all entries
+        """
+        for key in list(self.entries):
+            self._forget(key)
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def render(self, element, cpp, method='render_to_string'):
+        """
+        Render the element to cpp, or splice its text from the cache
+        @param: element - C++ element, or its declaration()/definition() wrapper
+        @param: cpp - target code file
+        @param: method - rendering method name
+        @return: True if the text was taken from the cache
+        """
+        key = fingerprint(element, cpp, method) if cpp.last is None else None
+        if key is None:
+            getattr(element, method)(cpp)
+            return False
+
+        text = self.get(key)
+        if text is not None:
+            self.hits += 1
+            cpp.append(text)
+            return True
+
+        self.misses += 1
+        writer = io.StringIO()
+        rendered = type(cpp)(None, writer=writer)
+        rendered.Formatter = cpp.Formatter
+        rendered.current_indent = cpp.current_indent
+        getattr(element, method)(rendered)
+        text = writer.getvalue()
+        self.put(key, text)
+        cpp.append(text)
+        return False
@@ -1,4 +1,5 @@
-from code_generation.cpp.cpp_generator import CppLanguageElement, CppDeclaration, CppImplementation
+from code_generation.cpp.cpp_generator import CppLanguageElement, CppDeclaration, CppImplementation, element_slots
+from code_generation.cpp.cpp_generator import flag_rules_table, flags_mask
 from textwrap import dedent
 
 __doc__ = """The module encapsulates C++ code generation logics for main C++ language primitives:
@@ -76,6 +77,9 @@ class CppVariable(CppLanguageElement):
         'a = initialization_value;' for automatic variables, 'a(initialization_value)' for the class member
     documentation - string, '/// Example doxygen'
     is_class_member - boolean, for appropriate definition/declaration rendering
+    alignment - integer, 'alignas' specifier
+    cache_line_group - name of the group of class members placed to a separate cache line
+        (see CppClass.cache_line_size), e.g. members modified by the same thread
     """
     availablePropertiesNames = {'type',
                                 'is_static',
@@ -84,25 +88,34 @@ class CppVariable(CppLanguageElement):
                                 'is_constexpr',
                                 'initialization_value',
                                 'documentation',
-                                'is_class_member'} | CppLanguageElement.availablePropertiesNames
+                                'is_class_member',
+                                'alignment',
+                                'cache_line_group'} | CppLanguageElement.availablePropertiesNames
+    defaultPropertiesValues = dict.fromkeys(('is_static', 'is_extern', 'is_const', 'is_constexpr',
+                                             'is_class_member'), False)
+    # sanity check result is cached until any of these properties is changed
+    trackedPropertiesNames = availablePropertiesNames - CppLanguageElement.availablePropertiesNames
+    __slots__ = element_slots(availablePropertiesNames, CppLanguageElement, tracked=trackedPropertiesNames)
+
+    # boolean properties checked by _flagErrors table
+    flagNames = ('is_const', 'is_constexpr', 'is_static', 'is_extern')
+    _flagErrors = flag_rules_table(flagNames, [
+        ({'is_const', 'is_constexpr'}, (), "Variable object can be either 'const' or 'constexpr', not both"),
+        ({'is_static', 'is_extern'}, (), "Variable object can be either 'extern' or 'static', not both"),
+    ])
 
     def __init__(self, **properties):
-        input_property_names = set(properties.keys())
-        self.check_input_properties_names(input_property_names)
-        super(CppVariable, self).__init__(properties)
-        self.init_class_properties(current_class_properties=self.availablePropertiesNames,
-                                   input_properties_dict=properties)
+        self._init_properties(properties)
 
     def _sanity_check(self):
         """
         @raise: ValueError, if some properties are not valid
         """
-        if self.is_const and self.is_constexpr:
-            raise ValueError("Variable object can be either 'const' or 'constexpr', not both")
+        error = self._flagErrors[flags_mask(self, self.flagNames)]
+        if error is not None:
+            raise ValueError(error)
         if self.is_constexpr and not self.initialization_value:
             raise ValueError("Variable object must be initialized when 'constexpr'")
-        if self.is_static and self.is_extern:
-            raise ValueError("Variable object can be either 'extern' or 'static', not both")
 
     def _render_static(self):
         """
@@ -128,6 +141,13 @@ class CppVariable(CppLanguageElement):
         """
         return 'constexpr ' if self.is_constexpr else ''
 
+    def _render_alignment(self, alignment=None):
+        """
+        @return: 'alignas' specifier of the alignment, the alignment property by default
+        """
+        alignment = alignment or self.alignment
+        return f'alignas({alignment}) ' if alignment else ''
+
     def _render_init_value(self):
         """
         @return: string, initialization_value to be initialized with
@@ -163,7 +183,7 @@ class CppVariable(CppLanguageElement):
         int a = 10;
         const double b = M_PI;
         """
-        self._sanity_check()
+        self._check()
         if self.is_class_member and not (self.is_static and self.is_const):
             raise RuntimeError('For class member variables use definition() and declaration() methods')
         elif self.is_extern:
@@ -171,20 +191,22 @@ class CppVariable(CppLanguageElement):
         else:
             if self.documentation:
                 cpp(dedent(self.documentation))
-            cpp(f'{self._render_static()}{self._render_const()}{self._render_constexpr()}'
+            cpp(f'{self._render_alignment()}{self._render_static()}{self._render_const()}{self._render_constexpr()}'
                 f'{self.type} {self.assignment(self._render_init_value())};')
 
-    def render_to_string_declaration(self, cpp):
+    def render_to_string_declaration(self, cpp, alignment=None):
         """
         Generates declaration for the class member variables, for example
         int m_var;
+        @param: alignment - overrides alignment property, used by CppClass for cache line groups
         """
         if not self.is_class_member:
             raise RuntimeError('For automatic variable use its render_to_string() method')
 
         if self.documentation and self.is_class_member:
             cpp(dedent(self.documentation))
-        cpp(f'{self._render_static()}{self._render_extern()}{self._render_const()}{self._render_constexpr()}'
+        cpp(f'{self._render_alignment(alignment)}{self._render_static()}{self._render_extern()}'
+            f'{self._render_const()}{self._render_constexpr()}'
             f'{self.type} {self.name if not self.is_constexpr else self.assignment(self._render_init_value())};')
 
     def render_to_string_implementation(self, cpp):
@@ -0,0 +1,372 @@
+from textwrap import dedent
+
+from code_generation.cpp.cpp_array import CppArray
+from code_generation.cpp.cpp_class import CppClass
+from code_generation.cpp.cpp_variable import CppVariable
+
+__doc__ = """Single-pass rendering of C++ elements into several outputs.
+walk() traverses the tree of elements once and dispatches every node to a number of visitors,
+e.g. header, source, documentation and symbols listing are generated in the same traversal.
+Classes are traversed in the order of their declaration: enums, nested classes, methods, then data members.
+
+Visitors derive from CppVisitor and override the events they are interested in, the events not
+overridden by any visitor are not dispatched at all.
+
+Output of HeaderVisitor is the same as render_to_string_declaration() of the elements,
+output of SourceVisitor is the same as render_to_string_implementation() for classes without nested classes.
+Unlike render_to_string_implementation(), methods and static members of nested classes are rendered exactly once.
+
+Top-level (non-member) variables are placed according to their linkage, see variable_placement():
+'extern int a;' in the header and 'int a = 0;' in the source for the plain variables,
+const, constexpr and extern variables in the header only, static variables in the source only.
+Top-level arrays should be static (rendered in the source) or constexpr (rendered in the header),
+other arrays are rejected by render_outputs() before rendering.
+
+Example:
+# Python code
+header = CppFile('my_class.h')
+source = CppFile('my_class.cpp')
+symbols = CodeFile('my_class.sym')
+render_outputs([my_class, my_function], header=header, source=source, symbols=symbols)
+
+// Generated my_class.sym
+class MyClass
+method MyClass::GetVar
+variable MyClass::m_var
+function my_function
+"""
+
+
+class CppVisitor:
+    """
+    Base class of the visitors, every event does nothing
+    Events receive the element and its parent class (None for top-level elements)
+    """
+
+    def enter_class(self, cpp_class, parent):
+        """
+        Class traversal is started, its members are visited next
+        """
+
+    def visit_enum(self, enum, parent):
+        """
+        Enum of the class
+        """
+
+    def visit_method(self, method, parent):
+        """
+        Method of the class
+        """
+
+    def enter_members(self, cpp_class, parent):
+        """
+        All enums, nested classes and methods of the class are visited, data members are visited next
+        """
+
+    def visit_variable(self, variable, parent):
+        """
+        Member variable of the class
+        """
+
+    def visit_array(self, array, parent):
+        """
+        Member array of the class
+        """
+
+    def leave_class(self, cpp_class, parent):
+        """
+        Class traversal is finished
+        """
+
+    def visit_element(self, element, parent):
+        """
+        Top-level element other than class: function, variable, enum etc.
+        """
+
+
+# Names of the visitor events
+VISITOR_EVENTS = ('enter_class', 'visit_enum', 'visit_method', 'enter_members',
+                  'visit_variable', 'visit_array', 'leave_class', 'visit_element')
+
+
+def _event_handlers(visitors, event):
+    """
+    @return: bound methods handling the event, visitors not overriding the event are skipped
+    """
+    default = getattr(CppVisitor, event)
+    return tuple(getattr(visitor, event) for visitor in visitors if getattr(type(visitor), event) is not default)
+
+
+def _dispatch(handlers, element, parent):
+    """
+    Call all handlers of the event
+    """
+    for handler in handlers:
+        handler(element, parent)
+
+
+def _dispatch_children(handlers, children, parent):
+    """
+    Call all handlers of the event for every child element, children are not iterated if there are no handlers
+    """
+    if handlers:
+        for child in children:
+            _dispatch(handlers, child, parent)
+
+
+def _walk_class(handlers, cpp_class, parent):
+    """
+    Traverse the class and its nested classes
+    @param: handlers - dict of the event name to its handlers
+    """
+    _dispatch(handlers['enter_class'], cpp_class, parent)
+    _dispatch_children(handlers['visit_enum'], cpp_class.internal_enum_elements, cpp_class)
+    for nested_class in cpp_class.internal_class_elements:
+        _walk_class(handlers, nested_class, cpp_class)
+    _dispatch_children(handlers['visit_method'], cpp_class.internal_method_elements, cpp_class)
+    _dispatch(handlers['enter_members'], cpp_class, parent)
+    _dispatch_children(handlers['visit_variable'], cpp_class.internal_variable_elements, cpp_class)
+    _dispatch_children(handlers['visit_array'], cpp_class.internal_array_elements, cpp_class)
+    _dispatch(handlers['leave_class'], cpp_class, parent)
+
+
+def walk(elements, *visitors):
+    """
+    Traverse elements once, dispatching every node to all visitors
+    @param: elements - iterable of top-level elements
+    @param: visitors - CppVisitor instances
+    """
+    handlers = {event: _event_handlers(visitors, event) for event in VISITOR_EVENTS}
+    for element in elements:
+        if isinstance(element, CppClass):
+            _walk_class(handlers, element, None)
+        else:
+            _dispatch(handlers['visit_element'], element, None)
+
+
+# Placement of top-level variables, see variable_placement()
+# complete definition in the header
+PLACE_HEADER = 'header'
+# complete definition in the source
+PLACE_SOURCE = 'source'
+# extern declaration in the header, definition in the source
+PLACE_EXTERN = 'extern'
+
+
+def variable_placement(element):
+    """
+    @param: element - top-level element
+    @return: PLACE_HEADER, PLACE_SOURCE or PLACE_EXTERN for non-member variables and arrays, None for other elements
+    @raise: ValueError for arrays with external linkage, their declaration could not be rendered in the header
+    """
+    if isinstance(element, CppVariable) and not element.is_class_member:
+        if element.is_extern or element.is_const or element.is_constexpr:
+            return PLACE_HEADER
+        return PLACE_SOURCE if element.is_static else PLACE_EXTERN
+    if isinstance(element, CppArray) and not element.is_class_member:
+        if element.is_constexpr:
+            return PLACE_HEADER
+        if element.is_static:
+            return PLACE_SOURCE
+        raise ValueError(f'Top-level array {element.name} could be rendered to header and source outputs '
+                         f'only if it is static or constexpr, use its render_to_string() method')
+    return None
+
+
+class HeaderVisitor(CppVisitor):
+    """
+    Renders declarations, the same as render_to_string_declaration() of the elements
+    """
+
+    def __init__(self, cpp):
+        """
+        @param: cpp - code file handle of the header
+        """
+        self.cpp = cpp
+        self.blocks = []
+
+    def enter_class(self, cpp_class, parent):
+        if cpp_class.documentation:
+            self.cpp(dedent(cpp_class.documentation))
+        block = self.cpp.block(cpp_class.declaration_head(), postfix=';')
+        block.open()
+        self.blocks.append(block)
+        if not cpp_class.is_struct:
+            self.cpp.label('public')
+
+    def visit_enum(self, enum, parent):
+        enum.render_to_string(self.cpp)
+        self.cpp.newline()
+
+    def visit_method(self, method, parent):
+        method.render_to_string_declaration(self.cpp)
+        self.cpp.newline()
+
+    def enter_members(self, cpp_class, parent):
+        # data members are rendered at once: their order and paddings depend on the class layout options
+        self.cpp.newline()
+        if not cpp_class.is_struct:
+            self.cpp.label('private')
+        cpp_class.private_class_members(self.cpp)
+
+    def leave_class(self, cpp_class, parent):
+        self.blocks.pop().close()
+        cpp_class.render_declaration_tail(self.cpp)
+        if parent is not None:
+            self.cpp.newline()
+
+    def visit_element(self, element, parent):
+        placement = variable_placement(element)
+        if placement is None:
+            element.render_to_string_declaration(self.cpp)
+        elif placement == PLACE_HEADER:
+            element.render_to_string(self.cpp)
+        elif placement == PLACE_EXTERN:
+            if element.documentation:
+                self.cpp(dedent(element.documentation))
+            CppVariable(name=element.name, type=element.type, is_extern=True).render_to_string(self.cpp)
+
+
+class SourceVisitor(CppVisitor):
+    """
+    Renders definitions: methods and static members of the classes, implementations of other elements
+    """
+
+    def __init__(self, cpp):
+        """
+        @param: cpp - code file handle of the source
+        """
+        self.cpp = cpp
+
+    def enter_class(self, cpp_class, parent):
+        # static members are defined before the methods, as by render_to_string_implementation()
+        if parent is None:
+            self.cpp.newline(2)
+        for variable in cpp_class.internal_variable_elements:
+            if variable.is_static:
+                variable.definition().render_to_string(self.cpp)
+                self.cpp.newline()
+        for array in cpp_class.internal_array_elements:
+            array.definition().render_to_string(self.cpp)
+            self.cpp.newline()
+
+    def visit_method(self, method, parent):
+        if not method.is_pure_virtual:
+            method.render_to_string_implementation(self.cpp)
+            self.cpp.newline()
+
+    def leave_class(self, cpp_class, parent):
+        if parent is not None:
+            self.cpp.newline()
+
+    def visit_element(self, element, parent):
+        placement = variable_placement(element)
+        if placement is None:
+            element.render_to_string_implementation(self.cpp)
+        elif placement != PLACE_HEADER:
+            element.render_to_string(self.cpp)
+
+
+def documentation_lines(documentation):
+    """
+    @return: lines of the documentation without comment markers, e.g. 'Example' for '/// Example'
+    """
+    lines = []
+    for line in dedent(documentation).splitlines():
+        line = line.strip()
+        for marker in ('///', '//!', '//', '/**', '/*!', '/*', '*/', '*'):
+            if line.startswith(marker):
+                line = line[len(marker):].strip()
+                break
+        if line.endswith('*/'):
+            line = line[:-2].strip()
+        lines.append(line)
+    return '\n'.join(lines).strip('\n').splitlines()
+
+
+class DocsVisitor(CppVisitor):
+    """
+    Renders Markdown documentation of the documented elements:
+    heading with the qualified name, then the documentation text
+    """
+
+    def __init__(self, cpp):
+        """
+        @param: cpp - code file handle of the documentation
+        """
+        self.cpp = cpp
+
+    def _render(self, element):
+        documentation = getattr(element, 'documentation', None)
+        if documentation:
+            self.cpp(f'## {element.fully_qualified_name()}')
+            self.cpp.newline()
+            for line in documentation_lines(documentation):
+                self.cpp(line)
+            self.cpp.newline()
+
+    def enter_class(self, cpp_class, parent):
+        self._render(cpp_class)
+
+    def visit_enum(self, enum, parent):
+        self._render(enum)
+
+    def visit_method(self, method, parent):
+        self._render(method)
+
+    def visit_variable(self, variable, parent):
+        self._render(variable)
+
+    def visit_array(self, array, parent):
+        self._render(array)
+
+    def visit_element(self, element, parent):
+        self._render(element)
+
+
+class SymbolsVisitor(CppVisitor):
+    """
+    Renders listing of the symbols, a line '<kind> <qualified name>' per element, e.g. 'method MyClass::GetVar'
+    """
+
+    def __init__(self, cpp):
+        """
+        @param: cpp - code file handle of the listing
+        """
+        self.cpp = cpp
+
+    def enter_class(self, cpp_class, parent):
+        self.cpp(f'{cpp_class.class_keyword()} {cpp_class.fully_qualified_name()}')
+
+    def visit_enum(self, enum, parent):
+        self.cpp(f'enum {enum.fully_qualified_name()}')
+
+    def visit_method(self, method, parent):
+        self.cpp(f'method {method.fully_qualified_name()}')
+
+    def visit_variable(self, variable, parent):
+        self.cpp(f'variable {variable.fully_qualified_name()}')
+
+    def visit_array(self, array, parent):
+        self.cpp(f'array {array.fully_qualified_name()}')
+
+    def visit_element(self, element, parent):
+        kind = type(element).__name__.replace('Cpp', '', 1).lower()
+        self.cpp(f'{kind} {element.fully_qualified_name()}')
+
+
+def render_outputs(elements, header=None, source=None, docs=None, symbols=None):
+    """
+    Render elements to several outputs in a single traversal, outputs set to None are not generated
+    @param: elements - iterable of top-level elements
+    @param: header - code file handle of declarations, see HeaderVisitor
+    @param: source - code file handle of definitions, see SourceVisitor
+    @param: docs - code file handle of Markdown documentation, see DocsVisitor
+    @param: symbols - code file handle of symbols listing, see SymbolsVisitor
+    """
+    elements = list(elements)
+    for element in elements:
+        # reject unsupported top-level arrays before anything is rendered
+        variable_placement(element)
+    outputs = ((header, HeaderVisitor), (source, SourceVisitor), (docs, DocsVisitor), (symbols, SymbolsVisitor))
+    walk(elements, *(visitor_class(cpp) for cpp, visitor_class in outputs if cpp is not None))
@@ -1,34 +1,43 @@
 import sys
 from code_generation.core.code_style import HTMLStyle
+from code_generation.core.code_sink import open_sink
 
 
 class HtmlFile:
 
     Formatter = HTMLStyle
 
-    def __init__(self, filename, writer=None):
+    def __init__(self, filename, writer=None, buffered=False, flush_threshold=None, write_if_changed=False):
         self.current_indent = 0
         self.last = None
         self.filename = filename
-        if writer:
-            self.out = writer
-        else:
-            self.out = open(filename, "w")
+        self.out_changed = None
+        self.out = open_sink(filename, writer, buffered, flush_threshold, write_if_changed)
 
     def close(self):
         """
         File created, just close the handle
+        In write-if-changed mode 'out_changed' shows whether the file has been rewritten
         """
         self.out.close()
+        self.out_changed = getattr(self.out, 'changed', None)
         self.out = None
 
+    def flush(self):
+        """
+        Pass the buffered output (if any) to the file or writer
+        """
+        self.out.flush()
+
     def write(self, text, indent=0, endline=True):
         """
         Write a new line with line ending
         """
-        self.out.write('{0}{1}{2}'.format(self.Formatter.indent * (self.current_indent+indent),
-                                          text,
-                                          self.Formatter.endline if endline else ''))
+        formatter = self.Formatter
+        if text.__class__ is not str:
+            text = str(text)
+        self.out.write(formatter.indent_prefix(self.current_indent + indent) + text +
+                       (formatter.endline if endline else ''))
 
     def append(self, x):
         """
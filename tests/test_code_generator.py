@@ -0,0 +1,242 @@
+import os
+import io
+import time
+import unittest
+import tempfile
+import threading
+
+from code_generation.core.code_generator import CppFile
+from code_generation.core.code_sink import BufferedSink
+from code_generation.core.code_session import GenerationSession
+from code_generation.core.code_style import ANSICodeStyle, HTMLStyle
+from code_generation.core.code_stream import iter_render
+from code_generation.cpp.cpp_function import CppFunction
+from code_generation.html.html_generator import HtmlFile
+
+__doc__ = """
+Unit tests for the core code generation primitives
+"""
+
+
+class TestIndentation(unittest.TestCase):
+    """
+    Test indentation prefixes of formatters
+    """
+
+    def test_indent_prefix(self):
+        self.assertEqual('', ANSICodeStyle.indent_prefix(-1))
+        self.assertEqual('', ANSICodeStyle.indent_prefix(0))
+        self.assertEqual('\t' * 7, ANSICodeStyle.indent_prefix(7))
+        self.assertEqual('\t\t', ANSICodeStyle.indent_prefix(2))
+        self.assertEqual('      ', HTMLStyle.indent_prefix(3))
+
+    def test_nested_blocks(self):
+        writer = io.StringIO()
+        cpp = CppFile(None, writer=writer)
+        with cpp.block('namespace a'):
+            with cpp.block('class A', ';'):
+                cpp.label('public')
+                cpp('int a;')
+        self.assertEqual('namespace a\n{\n\tclass A\n\t{\n\tpublic:\n\t\tint a;\n\t};\n}\n',
+                         writer.getvalue())
+
+    def test_open_close(self):
+        writer = io.StringIO()
+        cpp = CppFile(None, writer=writer)
+        outer = cpp.block('namespace a')
+        outer.open()
+        inner = cpp.block('class A', ';')
+        inner.open()
+        cpp('int a;')
+        inner.close()
+        outer.close()
+        self.assertEqual('namespace a\n{\n\tclass A\n\t{\n\t\tint a;\n\t};\n}\n', writer.getvalue())
+
+
+class TestBufferedOutput(unittest.TestCase):
+    """
+    Test buffered output of CodeFile and HtmlFile
+    """
+
+    def test_buffered_flush_on_close(self):
+        writer = io.StringIO()
+        cpp = CppFile(None, writer=writer, buffered=True)
+        with cpp.block('class A', ';'):
+            cpp('int a;')
+        self.assertEqual('', writer.getvalue())
+        cpp.flush()
+        self.assertEqual('class A\n{\n\tint a;\n};\n', writer.getvalue())
+
+    def test_flush_threshold(self):
+        writer = io.StringIO()
+        sink = BufferedSink(writer, flush_threshold=10)
+        sink.write('12345')
+        self.assertEqual('', writer.getvalue())
+        sink.write('67890')
+        self.assertEqual('1234567890', writer.getvalue())
+        sink.write('x')
+        sink.flush()
+        self.assertEqual('1234567890x', writer.getvalue())
+
+    def test_buffered_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'buffered.cpp')
+            cpp = CppFile(filename, flush_threshold=64)
+            for i in range(100):
+                cpp(f'int var{i} = {i};')
+            cpp.close()
+            with open(filename) as f:
+                lines = f.read().splitlines()
+            self.assertEqual(100, len(lines))
+            self.assertEqual('int var99 = 99;', lines[-1])
+
+    def test_buffered_html(self):
+        writer = io.StringIO()
+        html = HtmlFile(None, writer=writer, buffered=True)
+        with html.block(element='p'):
+            html('Text')
+        html.flush()
+        self.assertEqual('<p>\n  Text\n</p>\n', writer.getvalue())
+
+
+class TestWriteIfChanged(unittest.TestCase):
+    """
+    Test write-if-changed output mode
+    """
+
+    @staticmethod
+    def generate(filename, value):
+        cpp = CppFile(filename, write_if_changed=True)
+        cpp(f'int a = {value};')
+        cpp.close()
+        return cpp
+
+    def test_unchanged_file_is_not_rewritten(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'unchanged.h')
+            self.assertTrue(self.generate(filename, 1).out_changed)
+            os.utime(filename, (1000000000, 1000000000))
+            self.assertFalse(self.generate(filename, 1).out_changed)
+            self.assertEqual(1000000000, os.stat(filename).st_mtime)
+
+    def test_changed_file_is_rewritten(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'changed.h')
+            self.generate(filename, 1)
+            self.assertTrue(self.generate(filename, 2).out_changed)
+            self.assertTrue(self.generate(filename, 3).out_changed)
+            with open(filename) as f:
+                self.assertEqual('int a = 3;\n', f.read())
+
+    def test_custom_writer_raises(self):
+        self.assertRaises(ValueError, CppFile, None, writer=io.StringIO(), write_if_changed=True)
+
+
+class TestGenerationSession(unittest.TestCase):
+    """
+    Test transactional generation of multiple files
+    """
+
+    def test_commit(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            header = os.path.join(tmp, 'a.h')
+            source = os.path.join(tmp, 'a.cpp')
+            with GenerationSession() as session:
+                session.open(header)('int a();')
+                session.open(source, buffered=True)('int a() { return 0; }')
+                self.assertFalse(os.path.exists(header))
+            self.assertEqual(['a.cpp', 'a.h'], sorted(os.listdir(tmp)))
+            with open(header) as f:
+                self.assertEqual('int a();\n', f.read())
+            self.assertEqual(2, len(session.changed))
+
+    def test_rollback(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            header = os.path.join(tmp, 'a.h')
+            with open(header, 'w') as f:
+                f.write('original')
+            with self.assertRaises(RuntimeError):
+                with GenerationSession() as session:
+                    session.open(header)('int a();')
+                    raise RuntimeError('Generation failed')
+            self.assertEqual(['a.h'], os.listdir(tmp))
+            with open(header) as f:
+                self.assertEqual('original', f.read())
+
+    def test_failed_commit(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            header = os.path.join(tmp, 'a.h')
+            # target could not be replaced by a file
+            source = os.path.join(tmp, 'a.cpp')
+            os.makedirs(os.path.join(source, 'directory'))
+            third = os.path.join(tmp, 'b.h')
+            with self.assertRaises(OSError):
+                with GenerationSession(durable=False) as session:
+                    session.open(header)('int a();')
+                    session.open(source)('int a() { return 0; }')
+                    session.open(third)('int b();')
+            self.assertEqual([header], session.changed)
+            self.assertEqual(['a.cpp', 'a.h'], sorted(os.listdir(tmp)))
+
+    def test_skip_unchanged(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            header = os.path.join(tmp, 'a.h')
+            for _ in range(2):
+                with GenerationSession(durable=False, skip_unchanged=True) as session:
+                    session.open(header)('int a();')
+            self.assertEqual([header], session.unchanged)
+            self.assertEqual(['a.h'], os.listdir(tmp))
+
+
+class TestIterRender(unittest.TestCase):
+    """
+    Test streaming rendering
+    """
+
+    @staticmethod
+    def render_lines(cpp):
+        for i in range(1000):
+            cpp(f'int var{i} = {i};')
+
+    def test_chunks(self):
+        chunks = list(iter_render(self.render_lines, chunk_size=1024))
+        self.assertGreater(len(chunks), 1)
+        writer = io.StringIO()
+        self.render_lines(CppFile(None, writer=writer))
+        self.assertEqual(writer.getvalue(), ''.join(chunks))
+
+    def test_element(self):
+        func = CppFunction(name='f', ret_type='int', implementation_handle=lambda _, cpp: cpp('return 0;'))
+        self.assertEqual('int f()\n{\n\treturn 0;\n}\n', ''.join(iter_render(func)))
+        self.assertEqual('int f();\n', ''.join(iter_render(func.declaration())))
+
+    def test_early_close(self):
+        chunks = iter_render(self.render_lines, chunk_size=16, max_pending=1)
+        self.assertTrue(next(chunks).startswith('int var0 = 0;\n'))
+        chunks.close()
+
+    def test_prompt_close(self):
+        release = threading.Event()
+
+        def slow_render(cpp):
+            cpp('int a;')
+            cpp.flush()
+            release.wait(10)
+            cpp('int b;')
+
+        chunks = iter_render(slow_render, chunk_size=1)
+        self.assertEqual('int a;\n', next(chunks))
+        start = time.monotonic()
+        chunks.close()
+        self.assertLess(time.monotonic() - start, 1)
+        release.set()
+
+    def test_error(self):
+        def failed_render(cpp):
+            cpp('int a;')
+            raise ValueError('Render failed')
+        self.assertRaises(ValueError, list, iter_render(failed_render))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,1026 @@
+import io
+import os
+import array
+import pickle
+import timeit
+import tempfile
+import unittest
+import threading
+import tracemalloc
+from unittest import mock
+
+from code_generation.core.code_generator import CppFile
+
+from code_generation.cpp.cpp_variable import CppVariable
+from code_generation.cpp.cpp_array import CppArray, IntegerEncoding
+from code_generation.cpp.cpp_blob import CppBlob
+from code_generation.cpp.cpp_enum import CppEnum
+from code_generation.cpp.cpp_function import CppFunction
+from code_generation.cpp.cpp_class import CppClass, storage_type, soa_column_type
+from code_generation.cpp.cpp_layout import TypeLayout, type_layout, struct_size
+from code_generation.cpp.cpp_visitor import CppVisitor, walk, render_outputs, documentation_lines
+from code_generation.cpp.cpp_dispatch import CppDispatch, choose_strategy, argument_name
+from code_generation.cpp import cpp_perfect_hash
+from code_generation.cpp.cpp_perfect_hash import CppPerfectHash, perfect_hash, seeded_hash
+from code_generation.cpp.cpp_generator import VALIDATE_ALWAYS, VALIDATE_NEVER, VALIDATE_ON_CHANGE
+
+__doc__ = """
+Unit tests for the C++ element model
+"""
+
+
+# Memory allocated per element by version 2.4.0 storing properties in __dict__, bytes.
+# Measured by allocated_memory() for the elements of test_memory_benchmark(),
+# minimal values over Python 3.8 - 3.13 (3.12 for both)
+DICT_ELEMENT_SIZES = {'CppVariable': 160, 'CppMethod': 256}
+
+
+def allocated_memory(factory, count):
+    """
+    @return: memory allocated by creating 'count' objects
+    """
+    tracemalloc.start()
+    try:
+        objects = [factory(i) for i in range(count)]
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del objects
+    return size
+
+
+class TestCppElementMemory(unittest.TestCase):
+    """
+    Test compact representation of C++ elements
+    """
+
+    def test_no_instance_dict(self):
+        method = CppClass.CppMethod(name='f', ret_type='int')
+        CppClass(name='A').add_method(method)
+        for element in (CppVariable(name='a', type='int'),
+                        CppArray(name='a', type='int'),
+                        CppEnum(name='E'),
+                        CppFunction(name='f'),
+                        CppClass(name='A'),
+                        method):
+            self.assertFalse(hasattr(element, '__dict__'), element.__class__.__name__)
+
+    def test_unknown_attribute_raises(self):
+        var = CppVariable(name='a', type='int')
+        with self.assertRaises(AttributeError):
+            var.unknown_property = True
+
+    def test_memory_benchmark(self):
+        count = 10000
+        for cls, properties in ((CppVariable, {'name': 'm_var', 'type': 'int', 'is_class_member': True}),
+                                (CppClass.CppMethod, {'name': 'f', 'ret_type': 'int'})):
+            size = allocated_memory(lambda i: cls(**properties), count) / count
+            ratio = size / DICT_ELEMENT_SIZES[cls.__name__]
+            # about 0.75 for CppVariable and 0.69 for CppMethod
+            self.assertLess(ratio, 0.8, f'{cls.__name__} takes {size:.0f} bytes, {ratio:.0%} of __dict__ storage')
+
+    def test_flags(self):
+        method = CppClass.CppMethod(name='f', ret_type='int', is_const=True, is_virtual=None)
+        self.assertEqual((True, False, False), (method.is_const, method.is_virtual, method.is_static))
+        method.is_static = True
+        method.is_const = False
+        self.assertEqual((False, True), (method.is_const, method.is_static))
+        self.assertEqual(method.is_static, pickle.loads(pickle.dumps(method)).is_static)
+
+
+class TestCppElementConstruction(unittest.TestCase):
+    """
+    Test generated constructors and bulk factory
+    """
+
+    def test_defaults(self):
+        method = CppClass.CppMethod(name='f', ret_type='int', is_const=True)
+        self.assertEqual('f', method.name)
+        self.assertTrue(method.is_const)
+        self.assertIs(False, method.is_static)
+        self.assertIsNone(method.ref_to_parent)
+        self.assertEqual([], method.arguments)
+        cpp_class = CppClass(name='A')
+        self.assertEqual([], cpp_class.internal_method_elements)
+        self.assertIsNot(cpp_class.internal_method_elements, CppClass(name='B').internal_method_elements)
+        self.assertIs(False, cpp_class.is_struct)
+        self.assertEqual(0, CppArray(name='a').array_size)
+        self.assertIs(False, CppEnum(name='E').enum_class)
+
+    def test_unknown_property_raises(self):
+        self.assertRaises(AttributeError, CppVariable, name='a', is_virtual=True)
+        self.assertRaises(AttributeError, CppFunction, name='f', is_const=True)
+
+    def test_from_rows(self):
+        variables = CppVariable.from_rows(('name', 'type', 'initialization_value'),
+                                          [('a', 'int', '0'), ('b', 'double', '1.0')])
+        self.assertEqual(['a', 'b'], [var.name for var in variables])
+        self.assertEqual('double', variables[1].type)
+        self.assertIs(False, variables[1].is_static)
+        functions = CppFunction.from_rows(['name', 'ret_type'], [('f', 'int')])
+        self.assertEqual([], functions[0].arguments)
+
+    def test_from_rows_benchmark(self):
+        columns = ('name', 'type', 'initialization_value')
+        rows = [(f'm_{i}', 'int', str(i)) for i in range(10000)]
+
+        def constructors():
+            return [CppVariable(name=name, type=var_type, initialization_value=value)
+                    for name, var_type, value in rows]
+
+        constructors_time = min(timeit.repeat(constructors, number=1, repeat=9))
+        bulk = min(timeit.repeat(lambda: CppVariable.from_rows(columns, rows), number=1, repeat=9))
+        self.assertLess(bulk, constructors_time)
+
+    def test_deprecated_initializers(self):
+        variable = CppVariable(name='a', type='int')
+        with self.assertWarns(DeprecationWarning):
+            variable.init_class_properties(variable.availablePropertiesNames, {'is_static': True})
+        self.assertTrue(variable.is_static)
+        self.assertIsNone(variable.type)
+
+    def test_from_rows_invalid(self):
+        self.assertRaises(AttributeError, CppVariable.from_rows, ('name', 'is_virtual'), [])
+        self.assertRaises(ValueError, CppVariable.from_rows, ('name', 'type'), [('a', 'int', '0')])
+
+
+class TestQualifiedNames(unittest.TestCase):
+    """
+    Test cached qualified names
+    """
+
+    def setUp(self):
+        self.outer = CppClass(name='Outer')
+        self.inner = CppClass(name='Inner')
+        self.method = CppClass.CppMethod(name='Get', ret_type='int')
+        self.outer.add_internal_class(self.inner)
+        self.inner.add_method(self.method)
+
+    def test_qualified_name(self):
+        self.assertEqual('Outer::Inner::', self.method.parent_qualifier())
+        self.assertEqual('Outer::Inner::Get', self.method.fully_qualified_name())
+        self.assertEqual('Outer::Inner::Get', self.method.fully_qualified_name())
+        self.assertEqual('', self.outer.parent_qualifier())
+
+    def test_parent_renamed(self):
+        self.assertEqual('Outer::Inner::Get', self.method.fully_qualified_name())
+        self.outer.name = 'Renamed'
+        self.assertEqual('Renamed::Inner::Get', self.method.fully_qualified_name())
+
+    def test_reparenting(self):
+        self.assertEqual('Outer::Inner::Get', self.method.fully_qualified_name())
+        other = CppClass(name='Other')
+        other.add_method(self.method)
+        self.assertEqual('Other::Get', self.method.fully_qualified_name())
+        other.add_internal_class(self.inner)
+        self.assertEqual('Other::Inner::', self.inner.fully_qualified_name() + '::')
+
+    def test_pickling(self):
+        self.assertEqual('Outer::Inner::Get', self.method.fully_qualified_name())
+        method = pickle.loads(pickle.dumps(self.method))
+        self.assertIsNone(getattr(method, '_qualifier_cache', None))
+        method.ref_to_parent.ref_to_parent.name = 'Copy'
+        self.assertEqual('Copy::Inner::Get', method.fully_qualified_name())
+        self.assertEqual('Outer::Inner::Get', self.method.fully_qualified_name())
+
+    def test_threaded_renaming(self):
+        classes = [CppClass(name=f'Class{i}') for i in range(8)]
+
+        def rename(cpp_class, name):
+            for i in range(1000):
+                cpp_class.name = f'{name}_{i}'
+                self.method.fully_qualified_name()
+
+        threads = [threading.Thread(target=rename, args=(cpp_class, cpp_class.name)) for cpp_class in classes]
+        threads.append(threading.Thread(target=rename, args=(self.outer, 'Outer')))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual('Outer_999::Inner::Get', self.method.fully_qualified_name())
+        self.assertEqual(['Class0_999', 'Class7_999'], [classes[0].name, classes[-1].name])
+
+
+def render(element, method='render_to_string'):
+    """
+    @return: string rendered by the element method
+    """
+    writer = io.StringIO()
+    getattr(element, method)(CppFile(None, writer=writer))
+    return writer.getvalue()
+
+
+class TestSignatureCache(unittest.TestCase):
+    """
+    Test cached signatures of functions and methods
+    """
+
+    def setUp(self):
+        self.cpp_class = CppClass(name='A')
+        self.method = CppClass.CppMethod(name='Get', ret_type='int', is_const=True,
+                                         implementation_handle=lambda _, cpp: cpp('return 0;'))
+        self.method.add_argument('int a')
+        self.cpp_class.add_method(self.method)
+
+    def test_property_change(self):
+        self.assertEqual('int Get(int a) const;\n', render(self.method, 'render_to_string_declaration'))
+        self.method.ret_type = 'long'
+        self.assertEqual('long Get(int a) const;\n', render(self.method, 'render_to_string_declaration'))
+        self.method.is_const = False
+        self.method.is_static = True
+        self.assertEqual('static long Get(int a);\n', render(self.method, 'render_to_string_declaration'))
+
+    def test_arguments_change(self):
+        self.assertEqual('int Get(int a) const;\n', render(self.method, 'render_to_string_declaration'))
+        self.method.add_argument('int b')
+        self.assertEqual('int Get(int a, int b) const;\n', render(self.method, 'render_to_string_declaration'))
+        self.method.arguments.pop()
+        self.assertEqual('int Get(int a) const;\n', render(self.method, 'render_to_string_declaration'))
+
+    def test_parent_renamed(self):
+        self.assertTrue(render(self.method, 'render_to_string_implementation').startswith('int A::Get'))
+        self.cpp_class.name = 'B'
+        self.assertTrue(render(self.method, 'render_to_string_implementation').startswith('int B::Get'))
+
+    def test_validation_after_change(self):
+        render(self.method, 'render_to_string_declaration')
+        self.method.is_static = True
+        self.assertRaises(ValueError, render, self.method, 'render_to_string_declaration')
+
+    def test_function(self):
+        func = CppFunction(name='f', ret_type='int', implementation_handle=lambda _, cpp: cpp('return 0;'))
+        self.assertEqual('int f();\n', render(func, 'render_to_string_declaration'))
+        func.add_argument('int x')
+        func.name = 'g'
+        self.assertEqual('int g(int x);\n', render(func, 'render_to_string_declaration'))
+        func.is_constexpr = True
+        self.assertEqual('constexpr int g(int x)\n{\n\treturn 0;\n}\n', render(func))
+
+
+class TestValidationPolicy(unittest.TestCase):
+    """
+    Test validation policies and precomputed flag checks
+    """
+
+    def setUp(self):
+        self.cpp_class = CppClass(name='A')
+        self.method = CppClass.CppMethod(name='Get', ret_type='int')
+        self.cpp_class.add_method(self.method)
+
+    def tearDown(self):
+        CppClass.CppMethod.validationPolicy = VALIDATE_ON_CHANGE
+        CppVariable.validationPolicy = VALIDATE_ON_CHANGE
+
+    def test_flag_errors(self):
+        for properties, message in [({'is_inline': True, 'is_pure_virtual': True, 'is_virtual': True},
+                                     'Inline method Get could not be virtual'),
+                                    ({'is_const': True, 'is_static': True}, 'Static method Get could not be const'),
+                                    ({'is_final': True}, 'Final method Get should be virtual'),
+                                    ({'is_pure_virtual': True}, 'Pure virtual method Get is also a virtual method')]:
+            method = CppClass.CppMethod(name='Get', ret_type='int', **properties)
+            self.cpp_class.add_method(method)
+            with self.assertRaises(ValueError) as context:
+                render(method, 'render_to_string_declaration')
+            self.assertEqual(message, str(context.exception))
+
+    def test_variable_flag_errors(self):
+        variable = CppVariable(name='a', type='int', is_static=True, is_extern=True)
+        self.assertRaises(ValueError, render, variable)
+        variable.is_static = False
+        self.assertEqual('extern int a;\n', render(variable))
+
+    def test_never(self):
+        CppClass.CppMethod.set_validation_policy(VALIDATE_NEVER)
+        self.method.is_static = True
+        self.method.is_virtual = True
+        self.assertEqual('static virtual int Get();\n', render(self.method, 'render_to_string_declaration'))
+
+    def test_always(self):
+        calls = []
+
+        class CheckedMethod(CppClass.CppMethod):
+            __slots__ = ()
+
+            def _sanity_check(self):
+                calls.append(self.name)
+
+        method = CheckedMethod(name='Get', ret_type='int')
+        self.cpp_class.add_method(method)
+        render(method, 'render_to_string_declaration')
+        render(method, 'render_to_string_declaration')
+        self.assertEqual(1, len(calls))
+        CppClass.CppMethod.set_validation_policy(VALIDATE_ALWAYS)
+        render(method, 'render_to_string_declaration')
+        render(method, 'render_to_string_declaration')
+        self.assertEqual(3, len(calls))
+
+    def test_unknown_policy(self):
+        self.assertRaises(ValueError, CppVariable.set_validation_policy, 'sometimes')
+
+
+class TestArrayBulkData(unittest.TestCase):
+    """
+    Test CppArray rendering of buffers and NumPy arrays
+    """
+
+    def test_items_per_line(self):
+        cpp_array = CppArray(name='a', type='int', newline_align=True, items_per_line=3)
+        cpp_array.add_array_items(['x', 'y'])
+        cpp_array.add_array_items(array.array('i', [-1, 2, 3, 4]))
+        cpp_array.add_array_item('z')
+        self.assertEqual('int a[] = \n{\n\tx, y,\n\t-1, 2, 3,\n\t4,\n\tz\n};\n', render(cpp_array))
+
+    def test_hex(self):
+        cpp_array = CppArray(name='a', type='uint8_t', item_format='hex')
+        cpp_array.add_array_items(b'\x00\x7f\xff')
+        self.assertEqual('uint8_t a[] = {0x00, 0x7f, 0xff};\n', render(cpp_array))
+
+    def test_float(self):
+        cpp_array = CppArray(name='a', type='float', float_precision=2)
+        cpp_array.add_array_items(array.array('d', [0.5, 1]))
+        self.assertEqual('float a[] = {0.50f, 1.00f};\n', render(cpp_array))
+        cpp_array.type = 'double'
+        cpp_array.item_format = 'dec'
+        self.assertEqual('double a[] = {0, 1};\n', render(cpp_array))
+        cpp_array.item_format = 'oct'
+        self.assertRaises(ValueError, render, cpp_array)
+
+    def test_multidimensional(self):
+        cpp_array = CppArray(name='a', type='short')
+        cpp_array.add_array_items(memoryview(array.array('h', [1, 2, 3, 4])).cast('B').cast('h', [2, 2]))
+        self.assertEqual('short a[] = {1, 2, 3, 4};\n', render(cpp_array))
+
+    def test_large_data(self):
+        cpp_array = CppArray(name='a', type='int', newline_align=True, items_per_line=7)
+        cpp_array.add_array_items(array.array('i', range(100000)))
+        lines = render(cpp_array).splitlines()[2:-1]
+        self.assertEqual(100000 // 7 + 1, len(lines))
+        self.assertEqual('\t0, 1, 2, 3, 4, 5, 6,', lines[0])
+        self.assertEqual('\t99995, 99996, 99997, 99998, 99999', lines[-1])
+
+    def test_numpy(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest('NumPy is not installed')
+        cpp_array = CppArray(name='a', type='int', items_per_line=2)
+        cpp_array.add_array_items(numpy.arange(4, dtype='>i4').reshape(2, 2))
+        self.assertEqual('int a[] = {0, 1, 2, 3};\n', render(cpp_array))
+
+
+class TestCppBlob(unittest.TestCase):
+    """
+    Test embedding of binary files
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp.name, 'blob.bin')
+        self.data = bytes(range(256)) * 1000 + b'\x01\x02'
+        with open(self.filename, 'wb') as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_definition(self):
+        blob = CppBlob(name='blob', filename=self.filename, alignment=16, size_name='blob_size')
+        lines = render(blob).splitlines()
+        self.assertEqual(f'constexpr size_t blob_size = {len(self.data)};', lines[0])
+        self.assertEqual('alignas(16) const unsigned char blob[blob_size] = ', lines[1])
+        self.assertEqual('\t0x00, 0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, '
+                         '0x08, 0x09, 0x0a, 0x0b, 0x0c, 0x0d, 0x0e, 0x0f,', lines[3])
+        self.assertEqual('\t0x01, 0x02', lines[-2])
+        self.assertEqual('};', lines[-1])
+        values = ''.join(lines[3:-1]).replace('\t', '').split(',')
+        self.assertEqual(list(self.data), [int(value, 16) for value in values])
+
+    def test_decimal(self):
+        blob = CppBlob(name='blob', filename=self.filename, item_format='dec', items_per_line=1000)
+        lines = render(blob).splitlines()
+        self.assertEqual(f'const unsigned char blob[{len(self.data)}] = ', lines[0])
+        self.assertEqual(list(self.data), [int(value) for value in ''.join(lines[2:-1]).split(',')])
+
+    def test_class_member(self):
+        cpp_class = CppClass(name='A')
+        blob = CppBlob(name='blob', filename=self.filename, is_static=True, size_name='blob_size')
+        cpp_class.add_array(blob)
+        self.assertEqual(f'static constexpr size_t blob_size = {len(self.data)};\n'
+                         f'static const unsigned char blob[blob_size];\n',
+                         render(blob, 'render_to_string_declaration'))
+        self.assertRaises(RuntimeError, blob.add_array_item, '0')
+
+    def test_empty_file(self):
+        filename = os.path.join(self.tmp.name, 'empty.bin')
+        open(filename, 'wb').close()
+        self.assertRaises(ValueError, render, CppBlob(name='blob', filename=filename))
+        self.assertRaises(ValueError, render, CppBlob(name='blob', filename=filename, array_size=4))
+        self.assertEqual('const unsigned char blob[1] = "";\n',
+                         render(CppBlob(name='blob', filename=filename, literal_encoding=True)))
+
+
+class TestLiteralEncoding(unittest.TestCase):
+    """
+    Test byte arrays initialized by string literals
+    """
+
+    def test_escapes(self):
+        cpp_array = CppArray(name='a', type='unsigned char', is_const=True, literal_encoding=True, items_per_line=4)
+        cpp_array.add_array_items(b'ab?"\\\n\x00\x001\xff')
+        self.assertEqual('const unsigned char a[] =\n'
+                         '\t"ab\\?\\""\n'
+                         '\t"\\\\\\n\\000\\000"\n'
+                         '\t"1\\377";\n', render(cpp_array))
+
+    def test_invalid(self):
+        cpp_array = CppArray(name='a', type='int', literal_encoding=True)
+        cpp_array.add_array_items(b'abc')
+        self.assertRaises(ValueError, render, cpp_array)
+        cpp_array = CppArray(name='a', type='char', literal_encoding=True)
+        cpp_array.add_array_items(['1', '2'])
+        self.assertRaises(ValueError, render, cpp_array)
+        cpp_array = CppArray(name='a', type='char', literal_encoding=True, items_per_line=5000)
+        cpp_array.add_array_items(b'abc')
+        self.assertRaises(ValueError, render, cpp_array)
+
+    def test_array_size(self):
+        # the array has room for the terminating NUL
+        cpp_array = CppArray(name='a', type='char', literal_encoding=True, array_size=3)
+        cpp_array.add_array_items(b'abc')
+        self.assertEqual('char a[4] =\n\t"abc";\n', render(cpp_array))
+        cpp_array.add_array_items(b'd')
+        self.assertRaises(RuntimeError, render, cpp_array)
+
+    def test_literal_size_limit(self):
+        cpp_array = CppArray(name='a', type='char', literal_encoding=True)
+        cpp_array.add_array_items(bytes(65534))
+        self.assertTrue(render(cpp_array).startswith('char a[] =\n'))
+        cpp_array.add_array_items(b'a')
+        self.assertRaises(ValueError, render, cpp_array)
+        lazy_array = CppArray(name='a', type='char', literal_encoding=True, max_literal_size=16)
+        lazy_array.add_lazy_items(iter([b'0123456789'] * 2))
+        self.assertRaises(ValueError, render, lazy_array)
+        cpp_array.max_literal_size = None
+        self.assertTrue(render(cpp_array).endswith('\n\t"a";\n'))
+
+    def test_blob(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'blob.bin')
+            with open(filename, 'wb') as f:
+                f.write(bytes(range(256)) * 100)
+            blob = CppBlob(name='blob', filename=filename, literal_encoding=True,
+                           items_per_line=100, size_name='blob_size')
+            lines = render(blob).splitlines()
+        self.assertEqual(['constexpr size_t blob_size = 25600;', 'const unsigned char blob[blob_size + 1] ='],
+                         lines[:2])
+        self.assertEqual(256, len(lines) - 2)
+        self.assertTrue(lines[-1].endswith('";'))
+
+
+class TestLazyArrayItems(unittest.TestCase):
+    """
+    Test arrays rendered from iterables consumed on rendering
+    """
+
+    def test_generator(self):
+        cpp_array = CppArray(name='a', type='int', newline_align=True, items_per_line=2, size_name='a_size')
+        cpp_array.add_array_item('-1')
+        cpp_array.add_lazy_items(i * i for i in range(5))
+        self.assertIsNone(cpp_array.rendered_size())
+        self.assertEqual('int a[] = \n{\n\t-1,\n\t0, 1,\n\t4, 9,\n\t16\n};\n'
+                         'constexpr size_t a_size = 6;\n', render(cpp_array))
+        self.assertEqual(6, cpp_array.rendered_size())
+        self.assertRaises(RuntimeError, render, cpp_array)
+
+    def test_known_size(self):
+        cpp_array = CppArray(name='a', type='int', size_name='a_size')
+        cpp_array.add_array_items(['1', '2'])
+        cpp_array.add_array_items(array.array('i', [3, 4, 5]))
+        self.assertEqual('constexpr size_t a_size = 5;\nint a[a_size] = {1, 2, 3, 4, 5};\n', render(cpp_array))
+
+    def test_array_size(self):
+        cpp_array = CppArray(name='a', type='int', array_size=3)
+        cpp_array.add_lazy_items(iter(['1', '2', '3', '4']))
+        self.assertRaises(RuntimeError, render, cpp_array)
+
+    def test_streamed_lines(self):
+        cpp_array = CppArray(name='a', type='int', items_per_line=2)
+        cpp_array.add_lazy_items(range(3))
+        self.assertEqual('int a[] = \n{\n\t0, 1,\n\t2\n};\n', render(cpp_array))
+
+    def test_empty_source(self):
+        for properties in ({'type': 'int'}, {'type': 'int', 'newline_align': True},
+                           {'type': 'char', 'literal_encoding': True}):
+            cpp_array = CppArray(name='a', **properties)
+            cpp_array.add_lazy_items(iter([]))
+            self.assertRaises(RuntimeError, render, cpp_array)
+
+    def test_class_member(self):
+        cpp_class = CppClass(name='A')
+        cpp_array = CppArray(name='a', type='int', is_static=True, size_name='a_size')
+        cpp_array.add_lazy_items(range(3))
+        cpp_class.add_array(cpp_array)
+        self.assertRaises(RuntimeError, render, cpp_array, 'render_to_string_declaration')
+        cpp_array.array_size = 3
+        self.assertEqual('static constexpr size_t a_size = 3;\nstatic int a[a_size];\n',
+                         render(cpp_array, 'render_to_string_declaration'))
+
+    def test_literal(self):
+        cpp_array = CppArray(name='a', type='char', literal_encoding=True, size_name='a_size')
+        cpp_array.add_lazy_items([b'ab', b'c'])
+        self.assertEqual('char a[] =\n\t"ab"\n\t"c";\nconstexpr size_t a_size = 3;\n', render(cpp_array))
+
+
+class TestAutoIntegerType(unittest.TestCase):
+    """
+    Test automatic choice of the array items type
+    """
+
+    def test_narrowest_type(self):
+        for values, expected in [([0, 255], 'uint8_t'), ([-1, 127], 'int8_t'), ([0, 256], 'uint16_t'),
+                                 ([-40000, 0], 'int32_t'), ([0, 1 << 40], 'uint64_t')]:
+            cpp_array = CppArray(name='a', auto_type=True)
+            cpp_array.add_array_items(array.array('q', values))
+            self.assertEqual(expected, cpp_array.integer_encoding().type)
+
+    def test_typedef(self):
+        cpp_array = CppArray(name='a', is_const=True, auto_type=True, item_format='hex')
+        cpp_array.add_array_items(['1', '0x10'])
+        cpp_array.add_array_items(array.array('i', [300]))
+        self.assertEqual('typedef uint16_t a_type;\nconst a_type a[] = {1, 0x10, 0x012c};\n', render(cpp_array))
+
+    def test_bias(self):
+        cpp_array = CppArray(name='a', auto_type=True, bias_encoding=True, type_alias='value_t')
+        cpp_array.add_array_items(['1000', '1001'])
+        cpp_array.add_array_items(array.array('i', [1255]))
+        self.assertEqual(IntegerEncoding('uint8_t', 1, 1000), cpp_array.integer_encoding())
+        self.assertEqual('typedef uint8_t value_t;\nconstexpr int64_t a_bias = 1000;\nvalue_t a[] = {0, 1, 255};\n',
+                         render(cpp_array))
+
+    def test_class_member(self):
+        cpp_class = CppClass(name='A')
+        cpp_array = CppArray(name='a', is_static=True, auto_type=True, bias_encoding=True)
+        cpp_array.add_array_items(['-5', '5'])
+        cpp_class.add_array(cpp_array)
+        self.assertEqual('typedef uint8_t a_type;\nstatic constexpr int64_t a_bias = -5;\nstatic a_type a[];\n',
+                         render(cpp_array, 'render_to_string_declaration'))
+
+    def test_invalid(self):
+        cpp_array = CppArray(name='a', auto_type=True)
+        cpp_array.add_array_items(array.array('d', [0.5]))
+        self.assertRaises(ValueError, render, cpp_array)
+        cpp_array = CppArray(name='a', auto_type=True)
+        cpp_array.add_lazy_items(range(5))
+        self.assertRaises(RuntimeError, render, cpp_array)
+
+
+class TestPerfectHash(unittest.TestCase):
+    """
+    Test perfect hash lookup tables
+    """
+
+    def test_lookup(self):
+        table = CppPerfectHash(name='lookup', value_type='int', default_value='-1')
+        table.add_items({f'key{i}': i for i in range(2000)})
+        table.add_item(b'\x00\xff', 2000)
+        _, displacements, slots = table.tables()
+        self.assertEqual(list(range(2001)), sorted(slots))
+        self.assertIs(displacements, table.tables().displacements)
+        for i in range(2000):
+            self.assertEqual(i, table.lookup(f'key{i}'))
+        self.assertEqual(2000, table.lookup(b'\x00\xff'))
+        self.assertEqual('-1', table.lookup('key2000'))
+
+    def assert_perfect_hash(self, keys):
+        _, displacements, slots = perfect_hash(keys)
+        self.assertEqual(list(range(len(keys))), sorted(slots))
+        table = CppPerfectHash(name='lookup', value_type='int', default_value='-1')
+        table.add_items((key, i) for i, key in enumerate(keys))
+        for i, key in enumerate(keys):
+            self.assertEqual(i, table.lookup(key))
+
+    def test_short_keys(self):
+        self.assert_perfect_hash([b'aaa', b'aab', b'aac', b'aad'])
+        self.assert_perfect_hash([bytes([byte]) for byte in range(256)])
+        self.assert_perfect_hash([b'', b'a', b'b'])
+
+    def test_power_of_two_sizes(self):
+        for size in (2, 4, 8, 64, 1024):
+            self.assert_perfect_hash([b'MSG_%05d' % i for i in range(size)])
+
+    def test_seeded_hash(self):
+        self.assertTrue(all(0 <= seeded_hash(b'key', seed) < 1 << 32 for seed in range(1000)))
+        self.assertEqual(1000, len({seeded_hash(b'key', seed) for seed in range(1000)}))
+        self.assertEqual(1000, len({seeded_hash(b'', seed) for seed in range(1000)}))
+        self.assertNotEqual(seeded_hash(b'ab', 0), seeded_hash(b'ba', 0))
+
+    def test_seed_search_limit(self):
+        keys = [b'MSG_%05d' % i for i in range(64)]
+        self.assertRaises(ValueError, perfect_hash, keys, max_seeds=1, max_rehashes=1)
+        # keys are distributed to buckets with another seed if some bucket could not be placed
+        seed, displacements, slots = perfect_hash(keys, max_seeds=4, max_rehashes=64)
+        self.assertGreater(seed, 0)
+        for index, key in enumerate(keys):
+            displacement = displacements[seeded_hash(key, seed) % len(keys)]
+            slot = -displacement - 1 if displacement < 0 else seeded_hash(key, displacement) % len(keys)
+            self.assertEqual(index, slots[slot])
+
+    def test_render(self):
+        table = CppPerfectHash(name='color', value_type='int', default_value='-1')
+        self.assertRaises(RuntimeError, render, table)
+        table.add_items([('red', 1), ('green', 2)])
+        self.assertEqual('int color(const char* key, size_t length);\n',
+                         render(table, 'render_to_string_declaration'))
+        text = render(table)
+        self.assertTrue(text.startswith('namespace\n{\n'
+                                        '\tuint32_t color_hash(uint32_t seed, const char* key, size_t length)\n'))
+        self.assertIn('\tconstexpr int color_values[] = \n', text)
+        self.assertIn('\nint color(const char* key, size_t length)\n{\n', text)
+        table.add_item('red', 3)
+        self.assertRaises(ValueError, render, table)
+
+
+class TestEnumConversions(unittest.TestCase):
+    """
+    Test generation of enum to_string/from_string functions
+    """
+
+    def setUp(self):
+        self.enum = CppEnum(name='Color', add_to_string=True, add_from_string=True)
+        self.enum.add_items(['Red', 'Green'])
+
+    def test_declaration(self):
+        self.assertEqual('enum Color\n{\n\teRed = 0,\n\teGreen = 1,\n\teColorCount = 2\n};\n'
+                         'const char* ColorToString(Color value);\n'
+                         'bool ColorFromString(const char* name, size_t length, Color& value);\n',
+                         render(self.enum.declaration()))
+
+    def test_to_string(self):
+        self.enum.add_from_string = False
+        self.assertEqual('const char* ColorToString(Color value)\n{\n'
+                         '\tstatic const char names[] =\n\t\t"Red\\000Green";\n'
+                         '\ttypedef uint8_t offset_type;\n'
+                         '\tstatic const offset_type offsets[] = \n\t{\n\t\t0, 4, 10\n\t};\n'
+                         '\tconst size_t index = static_cast<size_t>(value);\n'
+                         '\tif (index >= 2)\n\t\treturn "";\n'
+                         '\treturn names + offsets[index];\n}\n', render(self.enum.definition()))
+
+    def test_from_string(self):
+        self.enum.add_to_string = False
+        self.enum.from_string_method = 'perfect_hash'
+        text = render(self.enum.definition())
+        self.assertIn('\nint ColorIndex(const char* key, size_t length)\n', text)
+        self.assertIn('\tconst int index = ColorIndex(name, length);\n', text)
+        self.enum.from_string_method = None
+        text = render(self.enum.definition())
+        self.assertTrue(text.startswith('bool ColorFromString(const char* name, size_t length, Color& value)\n'))
+        self.assertIn('\t\t"Green\\000Red";\n', text)
+        self.assertIn('\t\t\tvalue = static_cast<Color>(values[middle]);\n', text)
+        self.enum.from_string_method = 'linear'
+        self.assertRaises(ValueError, render, self.enum)
+
+    def test_power_of_two_items(self):
+        enum = CppEnum(name='Message', add_from_string=True)
+        enum.add_items([f'MSG_{i:05d}' for i in range(64)])
+        self.assertEqual('binary_search', enum.from_string_method)
+        self.assertNotIn('MessageIndex', render(enum.definition()))
+        enum.from_string_method = 'perfect_hash'
+        self.assertIn('\tconst int index = MessageIndex(name, length);\n', render(enum.definition()))
+        # binary search is used if the perfect hash could not be built
+        with mock.patch.object(cpp_perfect_hash, 'perfect_hash', side_effect=ValueError):
+            self.assertNotIn('MessageIndex', render(enum.definition()))
+
+    def test_nested(self):
+        cpp_class = CppClass(name='A')
+        cpp_class.add_enum(self.enum)
+        self.assertRaises(RuntimeError, render, self.enum)
+
+
+class TestDispatch(unittest.TestCase):
+    """
+    Test density-aware dispatch of integer keys
+    """
+
+    def dispatch(self, keys, **properties):
+        dispatch = CppDispatch(name='handle', ret_type='int', default_body='return -1;', **properties)
+        dispatch.add_argument('int id')
+        dispatch.add_argument('int x = 2')
+        dispatch.add_cases({key: f'return x + {key};' for key in keys})
+        return dispatch
+
+    def test_strategy(self):
+        self.assertEqual('switch', choose_strategy([1, 2, 3]))
+        self.assertEqual('jump_table', choose_strategy(list(range(0, 20, 2))))
+        self.assertEqual('switch', choose_strategy(list(range(0, 1000, 100))))
+        self.assertEqual('binary_search', choose_strategy(list(range(0, 10000, 100))))
+        self.assertEqual('switch', self.dispatch([]).dispatch_strategy())
+        self.assertEqual('jump_table', self.dispatch([1, 2], strategy='jump_table').dispatch_strategy())
+        self.assertRaises(ValueError, self.dispatch([1], strategy='hash').dispatch_strategy)
+
+    def test_argument_name(self):
+        self.assertEqual('s', argument_name('const string& s'))
+        self.assertEqual('sz', argument_name('size_t sz = 10'))
+        self.assertEqual('data', argument_name('int data[4]'))
+
+    def test_switch(self):
+        self.assertEqual('int handle(int id, int x = 2)\n{\n\tswitch (id)\n\t{\n'
+                         '\t\tcase 1:\n\t\t{\n\t\t\treturn x + 1;\n\t\t\tbreak;\n\t\t}\n'
+                         '\t\tdefault:\n\t\t{\n\t\t\treturn -1;\n\t\t\tbreak;\n\t\t}\n\t}\n}\n',
+                         render(self.dispatch([1])))
+
+    def test_jump_table(self):
+        dispatch = self.dispatch([10, 11, 13], strategy='jump_table')
+        self.assertEqual('int handle(int id, int x = 2);\n', render(dispatch, 'render_to_string_declaration'))
+        text = render(dispatch)
+        self.assertIn('\tint handle_case_2(int id, int x)\n\t{\n\t\treturn x + 13;\n\t}\n', text)
+        self.assertIn('\ttypedef int (*handle_handler)(int id, int x);\n', text)
+        self.assertIn('\t\thandle_case_0, handle_case_1, handle_default, handle_case_2\n', text)
+        self.assertTrue(text.endswith('\tif (id < 10 || id > 13)\n\t\treturn handle_default(id, x);\n'
+                                      '\treturn handle_handlers[id - 10](id, x);\n}\n'))
+
+    def test_binary_search(self):
+        dispatch = self.dispatch([-300, 5, 400], strategy='binary_search')
+        text = render(dispatch, 'render_to_string_implementation')
+        self.assertIn('\ttypedef int16_t handle_keys_type;\n', text)
+        self.assertIn('\t\t-300, 5, 400\n', text)
+        self.assertIn('\t\tif (static_cast<int64_t>(handle_keys[middle]) < static_cast<int64_t>(id))\n', text)
+        self.assertIn('\tif (low < 3 && static_cast<int64_t>(handle_keys[low]) == static_cast<int64_t>(id))\n'
+                      '\t\treturn handle_handlers[low](id, x);\n', text)
+        dispatch.add_case(5, 'return 0;')
+        self.assertRaises(ValueError, render, dispatch)
+
+    def test_invalid(self):
+        for strategy in ('jump_table', 'binary_search'):
+            self.assertRaises(ValueError, render, self.dispatch([], strategy=strategy))
+        dispatch = self.dispatch([1, 2])
+        dispatch.default_body = None
+        self.assertRaises(ValueError, render, dispatch)
+        self.assertRaises(ValueError, render, dispatch, 'render_to_string_implementation')
+        dispatch.ret_type = 'void'
+        dispatch.cases.clear()
+        dispatch.add_case(1, 'x = 1;')
+        self.assertTrue(render(dispatch).startswith('void handle(int id, int x = 2)\n'))
+
+
+class TestClassLayout(unittest.TestCase):
+    """
+    Test estimation and optimization of class members layout
+    """
+
+    def setUp(self):
+        self.cpp_class = CppClass(name='Packet', is_struct=True)
+        for name, member_type in [('flag', 'bool'), ('id', 'std::uint64_t'), ('port', 'const uint16_t')]:
+            self.cpp_class.add_variable(CppVariable(name=name, type=member_type))
+        self.cpp_class.add_variable(CppVariable(name='count', type='int', is_static=True))
+
+    def test_type_layout(self):
+        self.assertEqual(TypeLayout(8, 8), type_layout('const char *'))
+        self.assertEqual(TypeLayout(4, 4), type_layout('volatile std::int32_t'))
+        self.assertEqual(TypeLayout(2, 1), type_layout('Pair', {'Pair': (2, 1)}))
+        self.assertRaises(ValueError, type_layout, 'Pair')
+        self.assertEqual((1, 1), struct_size([]))
+        self.assertEqual((12, 4), struct_size([TypeLayout(1, 1), TypeLayout(4, 4), TypeLayout(2, 2)]))
+
+    def test_report(self):
+        report = self.cpp_class.layout_report()
+        self.assertEqual((24, 16, 8, ['id', 'port', 'flag']), report)
+        self.cpp_class.add_variable(CppVariable(name='header', type='Header'))
+        self.assertRaises(ValueError, self.cpp_class.layout_report)
+        self.cpp_class.type_layouts = {'Header': (16, 16)}
+        self.assertEqual((48, 32, 16, ['header', 'id', 'port', 'flag']), self.cpp_class.layout_report())
+
+    def test_polymorphic(self):
+        self.cpp_class.add_method(CppClass.CppMethod(name='f', ret_type='void', is_virtual=True))
+        self.assertEqual((32, 24), self.cpp_class.layout_report()[:2])
+        self.cpp_class.parent_class = 'Base'
+        self.assertRaises(ValueError, self.cpp_class.layout_report)
+
+    def test_render(self):
+        self.assertIn('\tbool flag;\n\t\n\tstd::uint64_t id;', render(self.cpp_class, 'render_to_string_declaration'))
+        self.cpp_class.optimize_layout = True
+        self.cpp_class.assert_size = True
+        self.assertEqual('struct Packet \n{\n\t\n\tstatic int count;\n\t\n\tstd::uint64_t id;\n\t\n'
+                         '\tconst uint16_t port;\n\t\n\tbool flag;\n\t\n};\n'
+                         'static_assert(sizeof(Packet) == 16, "Unexpected size of Packet");\n',
+                         render(self.cpp_class, 'render_to_string_declaration'))
+
+
+class TestCacheLineGroups(unittest.TestCase):
+    """
+    Test isolation of class members to separate cache lines
+    """
+
+    def setUp(self):
+        self.cpp_class = CppClass(name='Counters', is_struct=True, assert_size=True)
+        self.cpp_class.add_variable(CppVariable(name='id', type='uint32_t'))
+        self.cpp_class.add_variable(CppVariable(name='reads', type='uint64_t', cache_line_group='reader'))
+        self.cpp_class.add_variable(CppVariable(name='writes', type='uint64_t', cache_line_group='writer'))
+        self.cpp_class.add_variable(CppVariable(name='errors', type='uint16_t', cache_line_group='reader'))
+
+    def test_alignment(self):
+        variable = CppVariable(name='buffer', type='char', alignment=16, initialization_value='0')
+        self.assertEqual('alignas(16) char buffer = 0;\n', render(variable))
+        self.cpp_class.add_variable(variable)
+        self.assertEqual('alignas(16) char buffer;\n', render(variable, 'render_to_string_declaration'))
+        self.assertEqual(('buffer', 16, 1, 0), self.cpp_class.cache_line_report().members[1])
+
+    def test_report(self):
+        report = self.cpp_class.cache_line_report()
+        self.assertEqual((192, 64, 64), report[:3])
+        self.assertEqual([('id', 0, 4, 0), ('cache_line_padding_0', 4, 60, 0), ('reads', 64, 8, 1), ('errors', 72, 2, 1),
+                          ('cache_line_padding_1', 74, 54, 1), ('writes', 128, 8, 2), ('cache_line_padding_2', 136, 56, 2)],
+                         report.members)
+        self.cpp_class.cache_line_size = 128
+        self.assertEqual(384, self.cpp_class.cache_line_report().size)
+
+    def test_render(self):
+        self.assertEqual('struct Counters \n{\n\t\n\tuint32_t id;\n\t\n\tchar cache_line_padding_0[60];\n\t\n'
+                         '\talignas(64) uint64_t reads;\n\t\n\tuint16_t errors;\n\t\n\tchar cache_line_padding_1[54];\n\t\n'
+                         '\talignas(64) uint64_t writes;\n\t\n\tchar cache_line_padding_2[56];\n\t\n};\n'
+                         'static_assert(sizeof(Counters) == 192, "Unexpected size of Counters");\n',
+                         render(self.cpp_class, 'render_to_string_declaration'))
+
+    def test_parent_class(self):
+        self.cpp_class.assert_size = False
+        self.cpp_class.parent_class = 'Base'
+        self.assertEqual('struct Counters  : public Base\n{\n\t\n\tuint32_t id;\n\t\n'
+                         '\talignas(64) uint64_t reads;\n\t\n\tuint16_t errors;\n\t\n\tchar cache_line_padding_1[54];\n\t\n'
+                         '\talignas(64) uint64_t writes;\n\t\n\tchar cache_line_padding_2[56];\n\t\n};\n',
+                         render(self.cpp_class, 'render_to_string_declaration'))
+        self.assertRaises(ValueError, self.cpp_class.cache_line_report)
+
+    def test_reserved_name(self):
+        self.cpp_class.add_variable(CppVariable(name='cache_line_padding_0', type='char'))
+        self.assertRaises(ValueError, render, self.cpp_class, 'render_to_string_declaration')
+
+
+class TestSoaCompanion(unittest.TestCase):
+    """
+    Test generation of struct-of-arrays companion classes
+    """
+
+    def setUp(self):
+        self.cpp_class = CppClass(name='Packet', is_struct=True)
+        self.cpp_class.add_variable(CppVariable(name='id', type='const uint32_t'))
+        self.cpp_class.add_variable(CppVariable(name='value', type='const char*'))
+        self.cpp_class.add_variable(CppVariable(name='count', type='int', is_static=True))
+
+    def test_storage_type(self):
+        self.assertEqual('uint32_t', storage_type('const uint32_t'))
+        self.assertEqual('const char*', storage_type('const char* const'))
+        self.assertEqual('std::string', storage_type('mutable std::string'))
+
+    def test_declaration(self):
+        companion = self.cpp_class.soa_companion()
+        self.assertEqual('PacketArray', companion.name)
+        text = render(companion, 'render_to_string_declaration')
+        self.assertIn('\tstruct Reference \n\t{\n\t\t\n\t\tuint32_t& id;\n\t\t\n\t\tconst char*& value;\n', text)
+        self.assertIn('\t\tuint32_t const& id;\n\t\t\n\t\tconst char* const& value;\n', text)
+        self.assertIn('\tvoid push_back(const Packet& value);\n', text)
+        self.assertIn('\tPacketArray::ConstReference operator[](size_t index) const;\n', text)
+        self.assertTrue(text.endswith('\tstd::vector<uint32_t> id;\n\t\n\tstd::vector<const char*> value;\n\t\n};\n'))
+
+    def test_implementation(self):
+        text = render(self.cpp_class.soa_companion('Packets'), 'render_to_string_implementation')
+        self.assertIn('size_t Packets::size() const\n{\n\treturn this->id.size();\n}\n', text)
+        self.assertIn('void Packets::reserve(size_t capacity)\n{\n\tthis->id.reserve(capacity);\n'
+                      '\tthis->value.reserve(capacity);\n}\n', text)
+        self.assertIn('Packet Packets::get(size_t index) const\n{\n\tPacket value;\n\tvalue.id = this->id[index];\n'
+                      '\tvalue.value = this->value[index];\n\treturn value;\n}\n', text)
+        self.assertIn('Packets::Reference Packets::operator[](size_t index)\n{\n'
+                      '\treturn {this->id[index], this->value[index]};\n}\n', text)
+
+    def test_bool_member(self):
+        self.assertEqual('uint8_t', soa_column_type('const bool'))
+        self.cpp_class.add_variable(CppVariable(name='valid', type='bool'))
+        text = render(self.cpp_class.soa_companion(), 'render_to_string_declaration')
+        self.assertIn('\t\tuint8_t& valid;\n', text)
+        self.assertIn('\t\tuint8_t const& valid;\n', text)
+        self.assertIn('\tstd::vector<uint8_t> valid;\n', text)
+
+    def test_reserved_names(self):
+        self.cpp_class.add_variable(CppVariable(name='size', type='size_t'))
+        self.assertRaises(ValueError, self.cpp_class.soa_companion)
+
+
+class TestSerializationMethods(unittest.TestCase):
+    """
+    Test generation of binary serialization methods
+    """
+
+    def setUp(self):
+        self.cpp_class = CppClass(name='Packet')
+        for name, member_type in [('id', 'uint32_t'), ('kind', 'uint16_t'), ('value', 'double'),
+                                  ('name', 'std::string'), ('header', 'Header'), ('count', 'int'), ('flag', 'bool')]:
+            self.cpp_class.add_variable(CppVariable(name=name, type=member_type))
+        self.cpp_class.add_variable(CppVariable(name='instances', type='int', is_static=True))
+        self.cpp_class.add_serialization_methods()
+
+    def test_runs(self):
+        self.assertEqual([('copy', ['id', 'kind']), ('copy', ['value']), ('string', ['name']),
+                          ('nested', ['header']), ('copy', ['count', 'flag'])], self.cpp_class.serialized_runs())
+        self.cpp_class.type_layouts = {'Header': (4, 4)}
+        self.assertEqual(('copy', ['header', 'count', 'flag']), self.cpp_class.serialized_runs()[-1])
+        self.cpp_class.add_variable(CppVariable(name='next', type='Packet*'))
+        self.assertRaises(ValueError, self.cpp_class.serialized_runs)
+
+    def test_declaration(self):
+        text = render(self.cpp_class, 'render_to_string_declaration')
+        self.assertIn('\tsize_t serialized_size() const;\n\t\n\tsize_t serialize(uint8_t* data) const;\n\t\n'
+                      '\tsize_t deserialize(const uint8_t* data);\n', text)
+
+    def test_implementation(self):
+        text = render(self.cpp_class, 'render_to_string_implementation')
+        self.assertIn('\tsize += sizeof(Packet::id) + sizeof(Packet::kind);\n\tsize += sizeof(Packet::value);\n'
+                      '\tsize += sizeof(uint32_t) + this->name.size();\n'
+                      '\tsize += this->header.serialized_size();\n', text)
+        self.assertIn('\tstatic_assert(offsetof(Packet, kind) + sizeof(Packet::kind) - offsetof(Packet, id) == '
+                      'sizeof(Packet::id) + sizeof(Packet::kind), "Unexpected padding between serialized members");\n'
+                      '\tstd::memcpy(cursor, &this->id, sizeof(Packet::id) + sizeof(Packet::kind));\n', text)
+        self.assertIn('\tthis->name.assign(reinterpret_cast<const char*>(cursor), length);\n', text)
+        self.assertIn('\tcursor += this->header.deserialize(cursor);\n', text)
+
+
+def return_zero(_, cpp):
+    cpp('return 0;')
+
+
+class TestSinglePassRendering(unittest.TestCase):
+    """
+    Test rendering of several outputs in a single traversal
+    """
+
+    def setUp(self):
+        self.cpp_class = CppClass(name='Widget', documentation='/// Widget\n/// of the window')
+        enum = CppEnum(name='Mode')
+        enum.add_items(['Fast', 'Slow'])
+        self.cpp_class.add_enum(enum)
+        self.cpp_class.add_method(CppClass.CppMethod(name='Get', ret_type='int', is_const=True,
+                                                     implementation_handle=return_zero))
+        self.cpp_class.add_method(CppClass.CppMethod(name='Draw', ret_type='void', is_virtual=True,
+                                                     is_pure_virtual=True))
+        self.cpp_class.add_variable(CppVariable(name='m_x', type='int'))
+        self.cpp_class.add_variable(CppVariable(name='s_count', type='int', is_static=True,
+                                                initialization_value='0'))
+        self.function = CppFunction(name='Create', ret_type='int', documentation='/** Factory */',
+                                    implementation_handle=return_zero)
+
+    def outputs(self, elements):
+        writers = [io.StringIO() for _ in range(4)]
+        header, source, docs, symbols = [CppFile(None, writer=writer) for writer in writers]
+        render_outputs(elements, header=header, source=source, docs=docs, symbols=symbols)
+        return [writer.getvalue() for writer in writers]
+
+    def test_same_output(self):
+        header, source, _, _ = self.outputs([self.cpp_class, self.function])
+        self.assertEqual(render(self.cpp_class, 'render_to_string_declaration') +
+                         render(self.function, 'render_to_string_declaration'), header)
+        self.assertEqual(render(self.cpp_class, 'render_to_string_implementation') +
+                         render(self.function, 'render_to_string_implementation'), source)
+
+    def test_nested_class(self):
+        nested = CppClass(name='Part', is_struct=True)
+        nested.add_variable(CppVariable(name='s_size', type='int', is_static=True, initialization_value='1'))
+        nested.add_method(CppClass.CppMethod(name='Size', ret_type='int', implementation_handle=return_zero))
+        self.cpp_class.add_internal_class(nested)
+        header, source, _, _ = self.outputs([self.cpp_class])
+        self.assertEqual(render(self.cpp_class, 'render_to_string_declaration'), header)
+        self.assertEqual(1, source.count('int Widget::Part::s_size = 1;'))
+        self.assertEqual(1, source.count('int Widget::Part::Size()'))
+
+    def test_top_level_variables(self):
+        elements = [CppVariable(name='counter', type='int', initialization_value='0'),
+                    CppVariable(name='limit', type='int', is_constexpr=True, initialization_value='10'),
+                    CppVariable(name='local', type='int', is_static=True, initialization_value='1')]
+        table = CppArray(name='table', type='int', is_static=True, is_const=True)
+        table.add_array_items(['1', '2'])
+        header, source, _, _ = self.outputs(elements + [table])
+        self.assertEqual('extern int counter;\nconstexpr int limit = 10;\n', header)
+        self.assertEqual('int counter = 0;\nstatic int local = 1;\nstatic const int table[] = {1, 2};\n', source)
+        table.is_static = False
+        writer = io.StringIO()
+        self.assertRaises(ValueError, render_outputs, [self.function, table], header=CppFile(None, writer=writer))
+        self.assertEqual('', writer.getvalue())
+
+    def test_docs_and_symbols(self):
+        _, _, docs, symbols = self.outputs([self.cpp_class, self.function])
+        self.assertEqual('## Widget\n\nWidget\nof the window\n\n## Create\n\nFactory\n\n', docs)
+        self.assertEqual('class Widget\nenum Widget::Mode\nmethod Widget::Get\nmethod Widget::Draw\n'
+                         'variable Widget::m_x\nvariable Widget::s_count\nfunction Create\n', symbols)
+        self.assertEqual(['Example', '', 'text'], documentation_lines('/**\n * Example\n *\n * text\n */'))
+
+    def test_events(self):
+        class MethodCounter(CppVisitor):
+            def __init__(self):
+                self.methods = []
+
+            def visit_method(self, method, parent):
+                self.methods.append((parent.name, method.name))
+
+        counter = MethodCounter()
+        walk([self.cpp_class, self.function], counter)
+        self.assertEqual([('Widget', 'Get'), ('Widget', 'Draw')], counter.methods)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import pickle
+import unittest
+import tempfile
+
+from code_generation.cpp.cpp_class import CppClass
+from code_generation.cpp.cpp_function import CppFunction
+from code_generation.cpp.cpp_handles import register_handle, NamedHandle
+from code_generation.cpp.cpp_project import CppProject
+
+__doc__ = """
+Unit tests for parallel rendering of C++ elements
+"""
+
+
+@register_handle(name='test_cpp_project.return_zero')
+def return_zero(_, cpp):
+    cpp('return 0;')
+
+
+def make_class(name):
+    cpp_class = CppClass(name=name)
+    cpp_class.add_method(CppClass.CppMethod(name='Get', ret_type='int', is_const=True,
+                                            implementation_handle=NamedHandle('test_cpp_project.return_zero')))
+    return cpp_class
+
+
+class TestCppProject(unittest.TestCase):
+    """
+    Test rendering C++ elements across worker processes
+    """
+
+    def test_named_handle_pickling(self):
+        func = CppFunction(name='f', ret_type='int', implementation_handle=return_zero)
+        func = pickle.loads(pickle.dumps(func))
+        self.assertEqual(NamedHandle('test_cpp_project.return_zero'), func.implementation_handle)
+
+    def test_parallel_render(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            results = {}
+            for processes in (1, 2):
+                out_dir = os.path.join(tmp, str(processes))
+                os.mkdir(out_dir)
+                project = CppProject(processes=processes)
+                for name in ('A', 'B', 'C'):
+                    project.add(make_class(name),
+                                header=os.path.join(out_dir, f'{name}.h'),
+                                source=os.path.join(out_dir, f'{name}.cpp'),
+                                header_preamble=['#pragma once'],
+                                source_preamble=[f'#include "{name}.h"'])
+                project.add(CppFunction(name='f', ret_type='int', implementation_handle=return_zero),
+                            header=os.path.join(out_dir, 'f.h'))
+                self.assertEqual(4, len(project.render()))
+                results[processes] = {}
+                for filename in sorted(os.listdir(out_dir)):
+                    with open(os.path.join(out_dir, filename)) as f:
+                        results[processes][filename] = f.read()
+            self.assertEqual(results[1], results[2])
+            self.assertIn('int B::Get() const\n{\n\treturn 0;\n}', results[2]['B.cpp'])
+            self.assertTrue(results[2]['A.h'].startswith('#pragma once\nclass A'))
+
+    def test_write_if_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for changed in (True, False):
+                project = CppProject(processes=1, write_if_changed=True)
+                project.add(make_class('A'), os.path.join(tmp, 'A.h'), os.path.join(tmp, 'A.cpp'))
+                result = project.render()[0]
+                self.assertEqual(changed, result.header_changed)
+                self.assertEqual(changed, result.source_changed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import io
+import os
+import unittest
+import tempfile
+from unittest import mock
+
+from code_generation.core.code_generator import CppFile
+from code_generation.cpp.cpp_class import CppClass
+from code_generation.cpp.cpp_enum import CppEnum
+from code_generation.cpp.cpp_variable import CppVariable
+from code_generation.cpp.cpp_render_cache import RenderCache, fingerprint, render_version
+
+__doc__ = """
+Unit tests for the persistent render cache
+"""
+
+
+@render_version('1')
+def return_zero(_, cpp):
+    cpp('return 0;')
+
+
+def unversioned(_, cpp):
+    cpp('return 0;')
+
+
+def make_class(handle=return_zero):
+    cpp_class = CppClass(name='A')
+    cpp_class.add_variable(CppVariable(name='m_a', type='int', is_static=True, initialization_value='1'))
+    cpp_class.add_method(CppClass.CppMethod(name='Get', ret_type='int', implementation_handle=handle))
+    return cpp_class
+
+
+def render(element, cache=None, indent=0):
+    writer = io.StringIO()
+    cpp = CppFile(None, writer=writer)
+    cpp.current_indent = indent
+    if cache is None:
+        element.render_to_string(cpp)
+        hit = None
+    else:
+        hit = cache.render(element, cpp)
+    return writer.getvalue(), hit
+
+
+class TestRenderCache(unittest.TestCase):
+    """
+    Test content-addressed render cache
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hit_across_instances(self):
+        expected, _ = render(make_class())
+        text, hit = render(make_class(), RenderCache(self.directory))
+        self.assertEqual((expected, False), (text, hit))
+        text, hit = render(make_class(), RenderCache(self.directory))
+        self.assertEqual((expected, True), (text, hit))
+
+    def test_indentation(self):
+        cache = RenderCache(self.directory)
+        enum = CppEnum(name='E')
+        enum.add_item('A')
+        for indent in (0, 2):
+            expected, _ = render(enum, indent=indent)
+            self.assertEqual(expected, render(enum, cache, indent)[0])
+            self.assertEqual((expected, True), render(enum, cache, indent))
+
+    def test_fingerprint_changes(self):
+        cpp = CppFile(None, writer=io.StringIO())
+        cpp_class = make_class()
+        original = fingerprint(cpp_class, cpp)
+        self.assertEqual(original, fingerprint(make_class(), cpp))
+        cpp_class.internal_variable_elements[0].initialization_value = '2'
+        self.assertNotEqual(original, fingerprint(cpp_class, cpp))
+        self.assertNotEqual(original, fingerprint(cpp_class.declaration(), cpp))
+
+    def test_handle_constants(self):
+        cpp = CppFile(None, writer=io.StringIO())
+        return_one = render_version('1')(lambda _, cpp: cpp('return 1;'))
+        return_two = render_version('1')(lambda _, cpp: cpp('return 2;'))
+        self.assertNotEqual(fingerprint(make_class(return_one), cpp), fingerprint(make_class(return_two), cpp))
+
+    def test_library_version(self):
+        cpp = CppFile(None, writer=io.StringIO())
+        original = fingerprint(make_class(), cpp)
+        with mock.patch('code_generation.cpp.cpp_render_cache.VERSION', 'upgraded'):
+            self.assertNotEqual(original, fingerprint(make_class(), cpp))
+
+    def test_unversioned_handle(self):
+        cache = RenderCache(self.directory)
+        cpp = CppFile(None, writer=io.StringIO())
+        self.assertIsNone(fingerprint(make_class(unversioned), cpp))
+        self.assertEqual((False, False), (render(make_class(unversioned), cache)[1],
+                                          render(make_class(unversioned), cache)[1]))
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_lru_eviction(self):
+        cache = RenderCache(self.directory, max_size=100)
+        for i in range(3):
+            cache.put(f'key{i}', 'x' * 40)
+        self.assertIsNone(cache.get('key0'))
+        self.assertEqual('x' * 40, cache.get('key1'))
+        cache.put('key3', 'y' * 40)
+        self.assertIsNone(cache.get('key2'))
+        self.assertEqual(['key1', 'key3'], list(RenderCache(self.directory, max_size=100).entries))
+
+
+if __name__ == "__main__":
+    unittest.main()